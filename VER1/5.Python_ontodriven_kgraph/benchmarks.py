@@ -0,0 +1,265 @@
+"""
+Performance Benchmarks for the Lung Cancer Knowledge Graph Pipeline
+
+Usage:
+    python benchmarks.py etl --scale 20000 --workers 1 2 4 8
+    python benchmarks.py nlp --repeat 200
+    python benchmarks.py shacl --scale 50 --workers 2 4 --inference closure
+    python benchmarks.py inference --scale 50 --owl-rl
+"""
+
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+from rdflib import Graph
+
+import lung_cancer_etl_engine as etl
+from etl_writers import NTriplesStreamWriter
+from nlp_processor import EntityExtractor
+
+SCRIPT_DIR = Path(__file__).parent
+
+
+########################################
+# Synthetic data
+########################################
+
+def make_scaled_config(out_dir, scale):
+    """
+    Replicate the sample CSVs `scale` times with unique patient IDs and
+    return a mapping_config pointing at the copies.
+    """
+    config = etl.load_mapping()
+    written = {}
+
+    for section in config.values():
+        source = SCRIPT_DIR / section["file"]
+        if source not in written:
+            df = pd.read_csv(source)
+            big = pd.concat([df] * scale, ignore_index=True)
+            copy_no = (big.index // len(df)).astype(str)
+            if "patient_id" in big.columns:
+                big["patient_id"] = big["patient_id"] + "_" + copy_no
+            if "uri" in big.columns:
+                big["uri"] = big["uri"] + "?copy=" + copy_no
+            target = Path(out_dir) / source.name
+            big.to_csv(target, index=False)
+            written[source] = (target, len(big))
+        # Absolute paths survive SCRIPT_DIR / path in the engine
+        section["file"] = str(written[source][0])
+
+    total_rows = sum(rows for _, rows in written.values())
+    return config, total_rows
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+########################################
+# ETL scaling
+########################################
+
+def bench_etl(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        config, total_rows = make_scaled_config(tmp, args.scale)
+        print(f"ETL benchmark: {total_rows} CSV rows, chunksize {args.chunksize}\n")
+        print(f"{'workers':>8} {'seconds':>9} {'rows/s':>11} {'speedup':>8}")
+
+        baseline = None
+        for workers in args.workers:
+            writer = NTriplesStreamWriter(Path(tmp) / f"out_{workers}")
+            _, elapsed = timed(etl.run_etl, config, mode=args.mode, writer=writer,
+                               chunksize=args.chunksize, workers=workers)
+            with contextlib.redirect_stdout(io.StringIO()):
+                writer.close()
+
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {total_rows / elapsed:>11.0f} "
+                  f"{baseline / elapsed:>7.2f}x")
+
+
+########################################
+# NLP entity extraction
+########################################
+
+def _sorted_entities(entities):
+    return {concept_type: sorted(found) for concept_type, found in entities.items()}
+
+
+def bench_nlp(args):
+    articles = pd.read_csv(SCRIPT_DIR / "ttl_shacl_data" / "LungcancerArticle.csv")
+    bodies = [str(body) for body in articles["body"].dropna()]
+    extractor = EntityExtractor(None, etl.ONT, etl.BASE)
+
+    mismatches = sum(
+        _sorted_entities(extractor.extract_entities(body))
+        != _sorted_entities(extractor.extract_entities_multipass(body))
+        for body in bodies
+    )
+    print(f"NLP benchmark: {len(bodies)} articles x {args.repeat} repeats "
+          f"({'identical results' if not mismatches else f'{mismatches} MISMATCHES'})\n")
+
+    timings = {}
+    for name, extract in [("multipass", extractor.extract_entities_multipass),
+                          ("single-pass", extractor.extract_entities)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for body in bodies:
+                extract(body)
+        timings[name] = time.perf_counter() - start
+        docs_per_s = args.repeat * len(bodies) / timings[name]
+        print(f"  {name:<12} {timings[name]:>7.3f}s  {docs_per_s:>10.0f} docs/s")
+
+    print(f"\n  speedup: {timings['multipass'] / timings['single-pass']:.2f}x")
+
+
+########################################
+# SHACL validation
+########################################
+
+def scaled_graph(scale):
+    """
+    Instance graph of an ETL run over the sample CSVs repeated `scale` times.
+
+    Returns:
+        (Graph, total CSV rows)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        config, total_rows = make_scaled_config(tmp, scale)
+        writer = NTriplesStreamWriter(Path(tmp), cypher=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            etl.run_etl(config, writer=writer)
+            writer.close()
+        data_graph = Graph()
+        data_graph.parse(writer.nt_path, format="nt")
+    return data_graph, total_rows
+
+
+def bench_shacl(args):
+    from pyshacl import validate
+    from shacl_inference import RdfsClosure, run_validation
+    from shacl_parallel import merged_equals_single, report_signature, validate_parallel
+    import validate_shacl
+
+    data_graph, total_rows = scaled_graph(args.scale)
+    shapes_graph = Graph().parse(validate_shacl.SHACL_FILE)
+    ontology_graph = Graph().parse(validate_shacl.ONTOLOGY_FILE)
+    print(f"SHACL benchmark: {len(data_graph)} triples from {total_rows} CSV rows\n")
+
+    (conforms, single_graph, _), single = timed(
+        validate, data_graph, shacl_graph=shapes_graph, ont_graph=ontology_graph,
+        inference='rdfs', abort_on_first=False, meta_shacl=False, advanced=True, js=False)
+    print(f"{'run':>12} {'seconds':>9} {'speedup':>8}  report")
+    print(f"{'rdfs':>12} {single:>9.2f} {1:>7.2f}x  {sum(report_signature(single_graph).values())} results")
+
+    def compare(name, elapsed, other_conforms, other_graph, note=""):
+        equal, message = merged_equals_single(other_graph, single_graph)
+        equal = equal and other_conforms == conforms
+        print(f"{name:>12} {elapsed:>9.2f} {single / elapsed:>7.2f}x  {'✓' if equal else '✗'} {message}{note}")
+
+    closure = RdfsClosure.from_graph(ontology_graph)
+    (closure_conforms, closure_graph, _), elapsed = timed(
+        run_validation, data_graph, shapes_graph, ontology_graph, "closure", closure)
+    compare("closure", elapsed, closure_conforms, closure_graph)
+
+    for workers in args.workers:
+        (merged_conforms, merged_graph, _, stats), elapsed = timed(
+            validate_parallel, data_graph, shapes_graph, ontology_graph, workers, args.partition_size,
+            args.inference, closure)
+        note = (f" ({len(stats['partitions'])} partitions)" if stats["partitions"]
+                else f" (one process: {stats['focus_nodes']} focus nodes < {workers} x --partition-size)")
+        compare(f"{args.inference} x{workers}", elapsed, merged_conforms, merged_graph, note)
+
+
+def bench_inference(args):
+    import owlrl
+    from rdflib import Literal
+    from rdflib.namespace import RDF, RDFS
+    from etl_inference import Reasoner
+
+    data_graph, total_rows = scaled_graph(args.scale)
+    ontology_graph = Graph().parse(etl.ONTOLOGY)
+    print(f"Inference benchmark: {len(data_graph)} triples from {total_rows} CSV rows\n")
+
+    def reasoner_run(semi_naive):
+        reasoner = Reasoner(ontology_graph)
+        reasoner.add_data(data_graph)
+        stats = reasoner.run(semi_naive)
+        return stats, set(reasoner.inferred())
+
+    # seconds include encoding the graphs; fixpoint is the rule evaluation alone
+    (stats, inferred), semi_naive = timed(reasoner_run, True)
+    print(f"{'run':>14} {'seconds':>9} {'fixpoint':>9} {'vs semi':>8}  inferred")
+    print(f"{'semi-naive':>14} {semi_naive:>9.2f} {stats['seconds']:>9.3f} {1:>7.2f}x  "
+          f"{len(inferred)} triples, {stats['rounds']} rounds")
+    (naive_stats, naive_inferred), naive = timed(reasoner_run, False)
+    print(f"{'naive':>14} {naive:>9.2f} {naive_stats['seconds']:>9.3f} {naive / semi_naive:>7.2f}x  "
+          f"{'✓' if naive_inferred == inferred else '✗'} {len(naive_inferred)} triples")
+
+    # owlrl on ontology + data; its instance-level results minus the trivial
+    # (x rdf:type rdfs:Resource) must equal ours
+    instances = {s for s in data_graph.subjects()} | {
+        o for p, o in data_graph.predicate_objects() if p != RDF.type and not isinstance(o, Literal)}
+    profiles = [("owlrl RDFS", owlrl.RDFS_Semantics)]
+    if args.owl_rl:
+        profiles.append(("owlrl OWL-RL", owlrl.OWLRL_Semantics))
+    for name, semantics in profiles:
+        graph = Graph()
+        graph += ontology_graph
+        graph += data_graph
+        asserted = len(graph)
+        _, elapsed = timed(owlrl.DeductiveClosure(semantics).expand, graph)
+        note = f"{len(graph) - asserted} triples"
+        if semantics is owlrl.RDFS_Semantics:
+            theirs = {t for t in graph if t[0] in instances and t not in data_graph
+                      and t not in ontology_graph and t[1:] != (RDF.type, RDFS.Resource)}
+            note = f"{'✓' if theirs == inferred else '✗'} {len(theirs)} instance triples ({note} in total)"
+        print(f"{name:>14} {elapsed:>9.2f} {'':>9} {elapsed / semi_naive:>7.2f}x  {note}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline performance benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("etl", help="ETL throughput vs number of worker processes")
+    p.add_argument("--scale", type=int, default=20000,
+                   help="number of copies of each sample CSV")
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--chunksize", type=int, default=etl.DEFAULT_CHUNKSIZE)
+    p.add_argument("--mode", choices=sorted(etl.SECTION_PROCESSORS), default="columnar")
+    p.set_defaults(func=bench_etl)
+
+    p = sub.add_parser("nlp", help="single-pass vs multipass entity extraction")
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=bench_nlp)
+
+    p = sub.add_parser("shacl", help="closure / partitioned parallel vs single-process SHACL validation")
+    p.add_argument("--scale", type=int, default=50,
+                   help="number of copies of each sample CSV")
+    p.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    p.add_argument("--partition-size", type=int, default=500)
+    p.add_argument("--inference", choices=["rdfs", "closure"], default="rdfs",
+                   help="inference used by the partitioned runs")
+    p.set_defaults(func=bench_shacl)
+
+    p = sub.add_parser("inference", help="semi-naive forward chaining vs naive fixpoint and owlrl")
+    p.add_argument("--scale", type=int, default=50,
+                   help="number of copies of each sample CSV")
+    p.add_argument("--owl-rl", action="store_true",
+                   help="also time owlrl's full OWL-RL closure (no parity check: different profile)")
+    p.set_defaults(func=bench_inference)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
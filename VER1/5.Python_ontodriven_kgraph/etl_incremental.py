@@ -0,0 +1,314 @@
+"""
+Incremental ETL for the Lung Cancer Knowledge Graph
+
+Instead of rebuilding lung_cancer_instances_out.ttl and auto_generated.cypher
+from scratch, an incremental run compares every source row with a manifest
+from the previous run and emits only what changed:
+
+- ouput/delta_added.nt / delta_removed.nt: triples to add / remove
+- ouput/delta.cypher: the matching Cypher statements
+
+The manifest (SQLite) stores each row under its section, subject key (the
+section's subject template, e.g. Patient_P001) and a content hash, plus a
+reference count per triple. A triple is only reported as removed when no
+remaining row produces it, so shared nodes such as Stage_IV survive the
+deletion of one patient.
+"""
+
+import json
+import hashlib
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+from rdflib import Graph, Literal
+from rdflib.namespace import RDF
+
+import lung_cancer_etl_engine as etl
+from etl_writers import (UNINFERRED_LABEL, PropertyGraphWriter, local_name, nt_lines, property_name,
+                         relationship_type)
+
+MANIFEST = etl.OUTPUT_DIR / "etl_manifest.sqlite"
+
+# Rows / keys per SQLite batch
+BATCH_SIZE = 500
+
+
+########################################
+# Manifest
+########################################
+
+class Manifest:
+    """Source rows and triple reference counts from the previous run"""
+
+    def __init__(self, path=MANIFEST):
+        Path(path).parent.mkdir(exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                section  TEXT NOT NULL,
+                row_key  TEXT NOT NULL,
+                row_hash TEXT NOT NULL,
+                n        INTEGER NOT NULL,
+                row_json TEXT NOT NULL,
+                PRIMARY KEY (section, row_key, row_hash)
+            );
+            CREATE TABLE IF NOT EXISTS triples (
+                line TEXT PRIMARY KEY,
+                refs INTEGER NOT NULL
+            );
+            DROP TABLE IF EXISTS current_rows;
+            CREATE TEMP TABLE current_rows (
+                section  TEXT NOT NULL,
+                row_key  TEXT NOT NULL,
+                row_hash TEXT NOT NULL,
+                n        INTEGER NOT NULL,
+                row_json TEXT NOT NULL,
+                PRIMARY KEY (section, row_key, row_hash)
+            );
+        """)
+
+    def record_rows(self, section_name, keys, row_jsons):
+        """Add one chunk of current source rows"""
+        self.conn.executemany("""
+            INSERT INTO current_rows (section, row_key, row_hash, n, row_json)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (section, row_key, row_hash) DO UPDATE SET n = n + 1
+        """, [
+            (section_name, key, hashlib.sha1(row_json.encode("utf-8")).hexdigest(), row_json)
+            for key, row_json in zip(keys, row_jsons)
+        ])
+
+    def changed_rows(self, section_name):
+        """
+        Rows of one section that differ from the previous run.
+
+        Yields:
+            (sign, row_json, count): +1 rows are new, -1 rows are gone
+        """
+        added = self.conn.execute("""
+            SELECT c.row_json, c.n - COALESCE(r.n, 0) FROM current_rows c
+            LEFT JOIN rows r USING (section, row_key, row_hash)
+            WHERE c.section = ? AND c.n > COALESCE(r.n, 0)
+        """, (section_name,)).fetchall()
+        removed = self.conn.execute("""
+            SELECT r.row_json, r.n - COALESCE(c.n, 0) FROM rows r
+            LEFT JOIN current_rows c USING (section, row_key, row_hash)
+            WHERE r.section = ? AND r.n > COALESCE(c.n, 0)
+        """, (section_name,)).fetchall()
+
+        for row_json, count in added:
+            yield 1, row_json, count
+        for row_json, count in removed:
+            yield -1, row_json, count
+
+    def changed_keys(self):
+        """Number of distinct subject keys with added or removed rows"""
+        return self.conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT section, row_key FROM current_rows EXCEPT SELECT section, row_key FROM rows
+                UNION
+                SELECT section, row_key FROM rows EXCEPT SELECT section, row_key FROM current_rows
+                UNION
+                SELECT c.section, c.row_key FROM current_rows c
+                LEFT JOIN rows r USING (section, row_key, row_hash)
+                WHERE r.n IS NULL OR r.n != c.n
+            )
+        """).fetchone()[0]
+
+    def apply_refcounts(self, deltas):
+        """
+        Apply per-triple reference count changes.
+
+        Returns:
+            (added_lines, removed_lines): triples whose count left / reached zero
+        """
+        added, removed = [], []
+        lines = [line for line, delta in deltas.items() if delta]
+
+        for i in range(0, len(lines), BATCH_SIZE):
+            batch = lines[i:i + BATCH_SIZE]
+            current = dict(self.conn.execute(
+                f"SELECT line, refs FROM triples WHERE line IN ({','.join('?' * len(batch))})",
+                batch,
+            ))
+            upserts, deletes = [], []
+            for line in batch:
+                before = current.get(line, 0)
+                after = max(before + deltas[line], 0)
+                if before == 0 and after > 0:
+                    added.append(line)
+                elif before > 0 and after == 0:
+                    removed.append(line)
+                if after:
+                    upserts.append((line, after))
+                else:
+                    deletes.append((line,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO triples (line, refs) VALUES (?, ?)", upserts)
+            self.conn.executemany("DELETE FROM triples WHERE line = ?", deletes)
+
+        return added, removed
+
+    def commit_rows(self):
+        """Make the current rows the baseline for the next run"""
+        self.conn.execute("DELETE FROM rows")
+        self.conn.execute("INSERT INTO rows SELECT * FROM current_rows")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+########################################
+# Delta Cypher
+########################################
+
+def _cypher_str(value):
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def delta_cypher(added, removed):
+    """
+    Cypher statements turning the previous graph into the current one.
+
+    Every node pattern carries its label (from the delta's rdf:type triples,
+    else the id prefix, as in PropertyGraphWriter) so statements use the
+    :Label(id) index and MERGE never creates unlabelled duplicates.
+    Removals run first so a changed property is removed and then set again.
+    Added nodes, properties and relationship ends get the :_Uninferred mark
+    for neo4j_inference.py --incremental. Statements are self-contained and
+    ';'-terminated.
+    """
+    labels = PropertyGraphWriter()
+    labels.group_triples([(s, p, o) for s, p, o in list(removed) + list(added) if p == RDF.type])
+
+    def node(var, uri):
+        return f"({var}:{labels.node_label(uri)} {{id:{_cypher_str(local_name(uri))}}})"
+
+    lines = []
+
+    # Properties and relationships before labels, so the nodes still match
+    for s, p, o in removed:
+        if p == RDF.type:
+            continue
+        if isinstance(o, Literal):
+            lines.append(f"MATCH {node('n', s)} REMOVE n.{property_name(p)};")
+        else:
+            lines.append(f"MATCH {node('n', s)}-[r:{relationship_type(p)}]->{node('o', o)} DELETE r;")
+
+    # Removed labels; nodes left without labels or relationships are deleted
+    for s, p, o in removed:
+        if p == RDF.type:
+            lines.append(
+                f"MATCH (n:{local_name(o)} {{id:{_cypher_str(local_name(s))}}}) REMOVE n:{local_name(o)} "
+                f"WITH n WHERE all(label IN labels(n) WHERE label = '{UNINFERRED_LABEL}') AND NOT (n)--() DELETE n;"
+            )
+
+    # Nodes first, then properties, then relationships
+    marker = UNINFERRED_LABEL
+    for s, p, o in added:
+        if p == RDF.type:
+            lines.append(f"MERGE (n:{local_name(o)} {{id:{_cypher_str(local_name(s))}}}) SET n:{marker};")
+    for s, p, o in added:
+        if p != RDF.type and isinstance(o, Literal):
+            lines.append(f"MERGE {node('n', s)} SET n.{property_name(p)}={_cypher_str(o)}, n:{marker};")
+    for s, p, o in added:
+        if p != RDF.type and not isinstance(o, Literal):
+            lines.append(f"MERGE {node('n', s)} MERGE {node('o', o)} MERGE (n)-[:{relationship_type(p)}]->(o) "
+                         f"SET n:{marker}, o:{marker};")
+
+    return lines
+
+
+########################################
+# Incremental run
+########################################
+
+def _row_jsons(df):
+    """Canonical JSON text of every row (native Python values)"""
+    return [json.dumps(record) for record in df.to_dict("records")]
+
+
+def _parse_nt_lines(lines):
+    """rdflib triples for N-Triples lines (used to build delta Cypher)"""
+    g = Graph()
+    if lines:
+        g.parse(data="".join(lines), format="nt")
+    return sorted(g)
+
+
+def run_incremental(config, manifest_path=MANIFEST, output_dir=etl.OUTPUT_DIR,
+                    chunksize=etl.DEFAULT_CHUNKSIZE, nlp_cache=None):
+    """
+    Diff the source CSVs against the manifest and write delta outputs.
+
+    Only rows that were added or removed since the last run are mapped
+    (through the columnar section processor): new rows add a reference to
+    each triple they produce, vanished rows drop one.
+
+    Returns:
+        (added_lines, removed_lines) as N-Triples lines
+    """
+    manifest = Manifest(manifest_path)
+    try:
+        # 1. Record current rows, reading each file once
+        for sections, df in etl.iter_file_chunks(config, chunksize):
+            row_jsons = _row_jsons(df)
+            for section_name, section in sections:
+                keys = etl.subject_local_column(df, section["subject"]).tolist()
+                manifest.record_rows(section_name, keys, row_jsons)
+
+        # 2. Map only the changed rows and accumulate triple refcount changes
+        deltas = Counter()
+        with etl.make_entity_extractor(nlp_cache) as entity_extractor:
+            for section_name, section in config.items():
+                batch = []
+                for change in manifest.changed_rows(section_name):
+                    batch.append(change)
+                    if len(batch) >= (chunksize or BATCH_SIZE):
+                        _count_triples(section, batch, entity_extractor, deltas)
+                        batch = []
+                if batch:
+                    _count_triples(section, batch, entity_extractor, deltas)
+
+        # 3. Triples whose reference count crossed zero form the delta
+        changed_keys = manifest.changed_keys()
+        added, removed = manifest.apply_refcounts(deltas)
+        manifest.commit_rows()
+    finally:
+        manifest.close()
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+    with open(output_dir / "delta_added.nt", "w", encoding="utf-8") as f:
+        f.write("".join(sorted(added)))
+    with open(output_dir / "delta_removed.nt", "w", encoding="utf-8") as f:
+        f.write("".join(sorted(removed)))
+    with open(output_dir / "delta.cypher", "w", encoding="utf-8") as f:
+        f.write("\n".join(delta_cypher(_parse_nt_lines(added), _parse_nt_lines(removed))))
+
+    print(f"✓ Incremental run: {changed_keys} changed subject keys")
+    print(f"✓ Delta saved: +{len(added)} / -{len(removed)} triples")
+    return added, removed
+
+
+def _count_triples(section, changes, entity_extractor, deltas):
+    """Map changed rows (one sign at a time) and add their triple refcount changes"""
+    for sign in (1, -1):
+        records, counts = [], []
+        for change_sign, row_json, count in changes:
+            if change_sign == sign:
+                records.append(json.loads(row_json))
+                counts.append(count)
+        if not records:
+            continue
+
+        # Duplicate rows contribute once per occurrence
+        df = pd.DataFrame.from_records(records).loc[
+            [i for i, count in enumerate(counts) for _ in range(count)]
+        ].reset_index(drop=True)
+        triples, _ = etl.process_section_columnar(section, df, entity_extractor)
+        for line in nt_lines(triples):
+            deltas[line] += sign
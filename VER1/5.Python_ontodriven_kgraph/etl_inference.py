@@ -0,0 +1,362 @@
+"""
+Forward-Chaining RDFS / OWL-RL Materialization for the ETL
+
+SPARQL queries over lung_cancer_instances_out.ttl only see asserted
+triples: a :Chemotherapy instance is not a :Therapy unless something
+infers it. This optional ETL stage (lung_cancer_etl_engine.py
+--materialize) adds the entailed triples to the instance output.
+
+Rules (from lung_cancer_kg_schema.ttl plus the data itself):
+
+    rdfs2   (s p o) (p domain c)                 => (s type c)
+    rdfs3   (s p o) (p range c), o not a literal => (o type c)
+    rdfs5   (p subPropertyOf q) (q subPropertyOf r) => (p subPropertyOf r)
+    rdfs7   (s p o) (p subPropertyOf q)          => (s q o)
+    rdfs9   (s type c) (c subClassOf d)          => (s type d)
+    rdfs11  (c subClassOf d) (d subClassOf e)    => (c subClassOf e)
+    inverse     (p inverseOf q) (s p o)          => (o q s), and from (s q o)
+    transitive  (p type TransitiveProperty) (x p y) (y p z) => (x p z)
+    symmetric   (p type SymmetricProperty) (s p o)          => (o p s)
+    equivalent  (c equivalentClass d) / (p equivalentProperty q)
+                => subClassOf / subPropertyOf both ways
+
+Triples are integer-encoded (TermDictionary) and kept in two indexes,
+predicate -> subject -> objects and predicate -> object -> subjects. Every
+rule is a join on those indexes. The fixpoint is semi-naive: each round
+joins only the facts that were new in the previous round against the
+whole store, so no rule re-derives what an earlier round already found.
+Axiomatic triples and the trivial rdfs4/rdfs8-style consequences
+(everything is an rdfs:Resource) are not generated.
+"""
+
+import time
+from collections import defaultdict
+
+from rdflib import Graph, Literal
+from rdflib.namespace import OWL, RDF, RDFS
+
+from etl_writers import (NON_LABEL_TYPES, PropertyGraphWriter, cypher_literal, local_name, property_name,
+                         property_value, relationship_type)
+
+RDFS_RULES = ("rdfs2", "rdfs3", "rdfs5", "rdfs7", "rdfs9", "rdfs11")
+OWL_RULES = ("inverse", "transitive", "symmetric", "equivalent")
+RULES = RDFS_RULES + OWL_RULES
+
+
+class TermDictionary:
+    """rdflib terms <-> dense integer ids"""
+
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+        self.literal = []
+
+    def encode(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+            self.literal.append(isinstance(term, Literal))
+        return term_id
+
+    def decode(self, term_id):
+        return self.terms[term_id]
+
+
+class TripleStore:
+    """Integer triples indexed by predicate -> subject -> objects and predicate -> object -> subjects"""
+
+    def __init__(self):
+        self.spo = defaultdict(lambda: defaultdict(set))
+        self.pos = defaultdict(lambda: defaultdict(set))
+        self.size = 0
+
+    def add(self, s, p, o):
+        """Returns True when the triple was not in the store yet"""
+        objects = self.spo[p][s]
+        if o in objects:
+            return False
+        objects.add(o)
+        self.pos[p][o].add(s)
+        self.size += 1
+        return True
+
+    def __contains__(self, triple):
+        s, p, o = triple
+        by_subject = self.spo.get(p)
+        return by_subject is not None and o in by_subject.get(s, ())
+
+    def objects(self, s, p):
+        by_subject = self.spo.get(p)
+        return by_subject.get(s, ()) if by_subject else ()
+
+    def subjects(self, p, o):
+        by_object = self.pos.get(p)
+        return by_object.get(o, ()) if by_object else ()
+
+    def pairs(self, p):
+        """(s, o) for every triple with predicate p"""
+        by_subject = self.spo.get(p)
+        if by_subject:
+            for s, objects in list(by_subject.items()):
+                for o in list(objects):
+                    yield s, o
+
+    def __iter__(self):
+        for p in list(self.spo):
+            for s, o in self.pairs(p):
+                yield s, p, o
+
+
+class Reasoner:
+    """
+    Semi-naive forward chaining over an integer-encoded triple store.
+
+    Usage:
+        reasoner = Reasoner(ontology_graph)
+        reasoner.add_data(triples)      # any number of times
+        stats = reasoner.run()
+        for triple in reasoner.inferred(): ...
+    """
+
+    def __init__(self, ontology_graph=None, rules=RULES):
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"Unknown rules: {', '.join(sorted(unknown))}")
+        self.rules = set(rules)
+        self.dictionary = TermDictionary()
+        self.store = TripleStore()
+        self._asserted = 0
+        self._delta = []
+        self._derived = []
+        # Instance nodes: data subjects and non-class objects, for inferred()
+        self._instances = set()
+
+        encode = self.dictionary.encode
+        self.TYPE, self.SUBCLASS, self.SUBPROPERTY = encode(RDF.type), encode(RDFS.subClassOf), encode(RDFS.subPropertyOf)
+        self.DOMAIN, self.RANGE, self.INVERSE = encode(RDFS.domain), encode(RDFS.range), encode(OWL.inverseOf)
+        self.TRANSITIVE, self.SYMMETRIC = encode(OWL.TransitiveProperty), encode(OWL.SymmetricProperty)
+        self.EQUIVALENT_CLASS, self.EQUIVALENT_PROPERTY = encode(OWL.equivalentClass), encode(OWL.equivalentProperty)
+
+        if ontology_graph is not None:
+            self.add(ontology_graph)
+
+    def add(self, triples):
+        """Add asserted triples (rdflib terms), e.g. the ontology"""
+        encode, store, delta = self.dictionary.encode, self.store, self._delta
+        for s, p, o in triples:
+            triple = (encode(s), encode(p), encode(o))
+            if store.add(*triple):
+                delta.append(triple)
+                self._asserted += 1
+
+    def add_data(self, triples):
+        """Add asserted instance triples; their inferences are returned by inferred()"""
+        encode, instances, type_id = self.dictionary.encode, self._instances, self.TYPE
+        triples = list(triples)
+        self.add(triples)
+        for s, p, o in triples:
+            instances.add(encode(s))
+            if not isinstance(o, Literal) and encode(p) != type_id:
+                instances.add(encode(o))
+
+    ########################################
+    # Rules
+    ########################################
+
+    def consequences(self, s, p, o):
+        """Everything derivable from (s p o) joined with the current store"""
+        store, literal = self.store, self.dictionary.literal
+        rules = self.rules
+        TYPE, SUBCLASS, SUBPROPERTY = self.TYPE, self.SUBCLASS, self.SUBPROPERTY
+
+        # (s p o) as the data premise
+        if "rdfs2" in rules:
+            for cls_ in store.objects(p, self.DOMAIN):
+                yield s, TYPE, cls_
+        if "rdfs3" in rules and not literal[o]:
+            for cls_ in store.objects(p, self.RANGE):
+                yield o, TYPE, cls_
+        if "rdfs7" in rules:
+            for super_property in store.objects(p, SUBPROPERTY):
+                yield s, super_property, o
+        if "inverse" in rules and not literal[o]:
+            for inverse in store.objects(p, self.INVERSE):
+                yield o, inverse, s
+            for inverse in store.subjects(self.INVERSE, p):
+                yield o, inverse, s
+        if "symmetric" in rules and not literal[o] and (p, TYPE, self.SYMMETRIC) in store:
+            yield o, p, s
+        if ("transitive" in rules and (p, TYPE, self.TRANSITIVE) in store) \
+                or (p == SUBCLASS and "rdfs11" in rules) or (p == SUBPROPERTY and "rdfs5" in rules):
+            for z in store.objects(o, p):
+                yield s, p, z
+            for w in store.subjects(p, s):
+                yield w, p, o
+
+        # (s p o) as the schema premise
+        if p == TYPE:
+            if "rdfs9" in rules:
+                for super_class in store.objects(o, SUBCLASS):
+                    yield s, TYPE, super_class
+            if o == self.SYMMETRIC and "symmetric" in rules:
+                for x, y in store.pairs(s):
+                    if not literal[y]:
+                        yield y, s, x
+            if o == self.TRANSITIVE and "transitive" in rules:
+                for x, y in store.pairs(s):
+                    for z in store.objects(y, s):
+                        yield x, s, z
+        elif p == SUBCLASS and "rdfs9" in rules:
+            for instance in store.subjects(TYPE, s):
+                yield instance, TYPE, o
+        elif p == self.DOMAIN and "rdfs2" in rules:
+            for x, _ in store.pairs(s):
+                yield x, TYPE, o
+        elif p == self.RANGE and "rdfs3" in rules:
+            for _, y in store.pairs(s):
+                if not literal[y]:
+                    yield y, TYPE, o
+        elif p == SUBPROPERTY and "rdfs7" in rules:
+            for x, y in store.pairs(s):
+                yield x, o, y
+        elif p == self.INVERSE and "inverse" in rules:
+            for x, y in store.pairs(s):
+                if not literal[y]:
+                    yield y, o, x
+            for x, y in store.pairs(o):
+                if not literal[y]:
+                    yield y, s, x
+        elif p == self.EQUIVALENT_CLASS and "equivalent" in rules:
+            yield s, SUBCLASS, o
+            yield o, SUBCLASS, s
+        elif p == self.EQUIVALENT_PROPERTY and "equivalent" in rules:
+            yield s, SUBPROPERTY, o
+            yield o, SUBPROPERTY, s
+
+    def run(self, semi_naive=True):
+        """
+        Apply the rules until no new triple appears.
+
+        Args:
+            semi_naive: False re-joins every triple in every round (the naive
+                fixpoint, for benchmarking)
+
+        Returns:
+            {"asserted", "inferred", "rounds", "seconds"}
+        """
+        start = time.perf_counter()
+        store = self.store
+        delta, self._delta = self._delta, []
+        rounds = 0
+        while delta:
+            rounds += 1
+            premises = delta if semi_naive else list(store)
+            new = []
+            for triple in premises:
+                # Materialize the joins before adding: the index sets are live
+                for consequence in list(self.consequences(*triple)):
+                    if store.add(*consequence):
+                        new.append(consequence)
+            self._derived.extend(new)
+            delta = new
+        return {"asserted": self._asserted, "inferred": len(self._derived), "rounds": rounds,
+                "seconds": time.perf_counter() - start}
+
+    def inferred(self, instances_only=True):
+        """
+        Inferred triples as rdflib terms.
+
+        Args:
+            instances_only: Only triples about instance nodes (skip the
+                ontology's own subClassOf/subPropertyOf closure)
+        """
+        decode = self.dictionary.decode
+        for s, p, o in self._derived:
+            if not instances_only or s in self._instances:
+                yield decode(s), decode(p), decode(o)
+
+
+def materialize_graph(graph, ontology_graph, rules=RULES):
+    """
+    Add the entailments of ontology_graph to graph in place.
+
+    Returns:
+        (stats, inferred triples)
+    """
+    reasoner = Reasoner(ontology_graph, rules)
+    reasoner.add_data(graph)
+    stats = reasoner.run()
+    inferred = list(reasoner.inferred())
+    for triple in inferred:
+        graph.add(triple)
+    return stats, inferred
+
+
+########################################
+# ETL stage
+########################################
+
+def inferred_cypher_lines(triples, labels):
+    """
+    auto_generated.cypher lines for inferred triples: extra labels,
+    properties and relationships on the nodes the ETL already created.
+
+    Args:
+        labels: PropertyGraphWriter that has seen the asserted rdf:type triples
+    """
+    def node(var, uri):
+        return f"MERGE ({var}:{labels.node_label(uri)} {{id:{cypher_literal(local_name(uri))}}})"
+
+    lines = []
+    for s, p, o in triples:
+        if p == RDF.type:
+            if o not in NON_LABEL_TYPES and local_name(o) != labels.node_label(s):
+                lines += [node("n", s), f"SET n:{local_name(o)}"]
+        elif isinstance(o, Literal):
+            value = property_value(o)
+            if value is not None:
+                lines += [node("n", s), f"SET n.{property_name(p)}={cypher_literal(value)}"]
+        else:
+            lines += [node("n", s), node("o", o), f"MERGE (n)-[:{relationship_type(p)}]->(o)"]
+    return lines
+
+
+class MaterializingWriter:
+    """
+    Writer wrapper for lung_cancer_etl_engine: passes every section on to
+    the wrapped writer and feeds it to a Reasoner. On close() the inferred
+    triples are written as a final "inferred" section, with their
+    auto_generated.cypher lines, before the wrapped writer is closed. The
+    property-graph writers turn inferred types into extra labels and
+    inferred object triples into relationships.
+    """
+
+    def __init__(self, writer, ontology_graph, rules=RULES):
+        self.writer = writer
+        self.reasoner = Reasoner(ontology_graph, rules)
+        self.labels = PropertyGraphWriter()
+
+    def _add(self, triples):
+        self.reasoner.add_data(triples)
+        self.labels.group_triples([(s, p, o) for s, p, o in triples if p == RDF.type])
+
+    def write_section(self, section_name, triples, cypher_lines):
+        triples = list(triples)
+        self.writer.write_section(section_name, triples, cypher_lines)
+        self._add(triples)
+
+    def write_fragment(self, section_name, lines, cypher_lines):
+        self.writer.write_fragment(section_name, lines, cypher_lines)
+        if lines:
+            g = Graph()
+            g.parse(data="".join(lines), format="nt")
+            self._add(list(g))
+
+    def close(self):
+        stats = self.reasoner.run()
+        inferred = list(self.reasoner.inferred())
+        self.writer.write_section("inferred", inferred, inferred_cypher_lines(inferred, self.labels))
+        print(f"✓ Materialized {len(inferred)} inferred triples over {stats['asserted']} asserted "
+              f"({stats['rounds']} rounds, {stats['seconds']:.3f}s)")
+        self.writer.close()
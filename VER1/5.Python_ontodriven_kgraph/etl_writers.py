@@ -0,0 +1,629 @@
+"""
+Output writers for the Lung Cancer ETL engine
+
+A writer receives each mapping_config section's triples and Cypher lines as
+they are produced and decides how they reach disk:
+
+- GraphWriter: the original behaviour - one in-memory rdflib Graph,
+  serialized to Turtle when the run finishes
+- NTriplesStreamWriter: streams N-Triples straight to disk with a bounded
+  dedup window, so memory no longer scales with the size of the graph
+- UnwindCypherWriter: parameterized, batched UNWIND ... MERGE Cypher grouped
+  by node label / relationship type, with typed property values
+- AdminImportCsvWriter: header-annotated node/relationship CSVs for offline
+  neo4j-admin database import
+- MultiWriter: fans every section out to several writers
+"""
+
+import csv
+import json
+import math
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from rdflib import Graph, URIRef, Literal, BNode
+from rdflib.namespace import OWL, RDF, RDFS
+
+DEFAULT_DEDUP_CAPACITY = 500_000
+
+# Rows per UNWIND statement
+DEFAULT_BATCH_SIZE = 1000
+
+# Relationship types that do not follow the prop.upper() convention
+RELATIONSHIP_TYPES = {"refersTo": "REFERS_TO"}
+
+# Types every resource has; never node labels
+NON_LABEL_TYPES = {OWL.Thing, RDFS.Resource}
+
+# Set on every node a load writes (and both ends of its relationships) so
+# neo4j_inference.py --incremental finds them by label scan
+UNINFERRED_LABEL = "_Uninferred"
+
+
+def nt_term(term):
+    """Serialize one RDF term in N-Triples syntax"""
+    if isinstance(term, URIRef):
+        return f"<{term}>"
+    if isinstance(term, Literal):
+        lexical = (
+            str(term)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+        if term.language:
+            return f'"{lexical}"@{term.language}'
+        if term.datatype:
+            return f'"{lexical}"^^<{term.datatype}>'
+        return f'"{lexical}"'
+    if isinstance(term, BNode):
+        return f"_:{term}"
+    raise TypeError(f"Cannot serialize {term!r} as N-Triples")
+
+
+def nt_lines(triples):
+    """N-Triples lines (newline-terminated) for a sequence of triples"""
+    return [f"{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n" for s, p, o in triples]
+
+
+class GraphWriter:
+    """Accumulate every triple in one rdflib Graph and serialize at the end"""
+
+    def __init__(self, output_dir: Path, namespaces=None, cypher=True):
+        self.output_dir = Path(output_dir)
+        self.cypher = cypher
+        self.graph = Graph()
+        for prefix, namespace in (namespaces or {}).items():
+            self.graph.bind(prefix, namespace)
+        self.cypher_lines = []
+
+    def write_section(self, section_name, triples, cypher_lines):
+        self.graph.addN((s, p, o, self.graph) for s, p, o in triples)
+        self.cypher_lines.extend(cypher_lines)
+
+    def write_fragment(self, section_name, lines, cypher_lines):
+        """Add a section already serialized as N-Triples lines (e.g. by a worker process)"""
+        if lines:
+            self.graph.parse(data="".join(lines), format="nt")
+        self.cypher_lines.extend(cypher_lines)
+
+    def close(self):
+        # Create output directory if it doesn't exist
+        self.output_dir.mkdir(exist_ok=True)
+
+        self.graph.serialize(self.output_dir / "lung_cancer_instances_out.ttl")
+        print("✓ RDF saved")
+
+        if self.cypher:
+            with open(self.output_dir / "auto_generated.cypher", "w") as f:
+                f.write("\n".join(self.cypher_lines))
+            print("✓ Cypher saved")
+
+
+class NTriplesStreamWriter:
+    """
+    Stream triples to an N-Triples file as each section produces them.
+
+    Instead of a full graph, duplicates are suppressed with a bounded LRU
+    window of line hashes. Repeated triples that are far apart (further than
+    dedup_capacity distinct triples) may be written twice; that is harmless
+    since RDF loaders treat the file as a set. N-Triples is also valid
+    Turtle, so every tool that reads the .ttl output can read this file.
+    """
+
+    def __init__(self, output_dir: Path, dedup_capacity: int = DEFAULT_DEDUP_CAPACITY, cypher=True):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.nt_path = self.output_dir / "lung_cancer_instances_out.nt"
+        self.cypher_path = self.output_dir / "auto_generated.cypher"
+
+        self.dedup_capacity = dedup_capacity
+        self._seen = OrderedDict()
+        self.triples_written = 0
+        self.duplicates_skipped = 0
+
+        self._nt = open(self.nt_path, "w", encoding="utf-8", buffering=1 << 20)
+        self._cypher = open(self.cypher_path, "w", buffering=1 << 20) if cypher else None
+        self._cypher_started = False
+
+    def write_section(self, section_name, triples, cypher_lines):
+        self.write_fragment(section_name, nt_lines(triples), cypher_lines)
+
+    def write_fragment(self, section_name, lines, cypher_lines):
+        """Write a section already serialized as N-Triples lines"""
+        seen = self._seen
+        new_lines = []
+        for line in lines:
+            key = hash(line)
+            if key in seen:
+                seen.move_to_end(key)
+                self.duplicates_skipped += 1
+                continue
+            seen[key] = None
+            if len(seen) > self.dedup_capacity:
+                seen.popitem(last=False)
+            new_lines.append(line)
+
+        self._nt.write("".join(new_lines))
+        self.triples_written += len(new_lines)
+
+        if cypher_lines and self._cypher:
+            if self._cypher_started:
+                self._cypher.write("\n")
+            self._cypher.write("\n".join(cypher_lines))
+            self._cypher_started = True
+
+    def close(self):
+        self._nt.close()
+        print(f"✓ RDF streamed to {self.nt_path.name} "
+              f"({self.triples_written} triples, {self.duplicates_skipped} duplicates skipped)")
+
+        if self._cypher:
+            self._cypher.close()
+            print("✓ Cypher saved")
+
+
+########################################
+# Batched UNWIND Cypher
+########################################
+
+def local_name(uri):
+    """Node id / label / property name for a URI (last / or # segment)"""
+    return str(uri).split('/')[-1].split('#')[-1]
+
+def property_name(predicate):
+    return "label" if predicate == RDFS.label else local_name(predicate)
+
+def relationship_type(predicate):
+    name = local_name(predicate)
+    return RELATIONSHIP_TYPES.get(name, name.upper())
+
+def property_value(literal):
+    """Typed Python value for a Literal (None for values Neo4j cannot store)"""
+    value = literal.toPython()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bool, int, float, str, date, datetime)):
+        return value
+    return str(literal)
+
+def cypher_name(name):
+    """Backtick-quote a label, type or key"""
+    return "`" + str(name).replace("`", "``") + "`"
+
+def cypher_literal(value):
+    """Cypher literal for a parameter value (for cypher-shell :param)"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        return f"datetime('{value.isoformat()}')"
+    if isinstance(value, date):
+        return f"date('{value.isoformat()}')"
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{cypher_name(k)}: {cypher_literal(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(cypher_literal(v) for v in value) + "]"
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def _json_default(value):
+    # Tagged so read_unwind_batches can hand the driver real temporal values
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot encode {value!r} as JSON")
+
+def _json_object_hook(obj):
+    if len(obj) == 1:
+        if "$date" in obj:
+            return date.fromisoformat(obj["$date"])
+        if "$datetime" in obj:
+            return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+def read_unwind_batches(path):
+    """
+    Stream (statement, rows) pairs from an unwind_batches.jsonl file,
+    with date/datetime property values decoded back to Python objects.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch = json.loads(line, object_hook=_json_object_hook)
+                yield batch["statement"], batch["rows"]
+
+
+class PropertyGraphWriter:
+    """
+    Base for writers that map triples onto labelled property-graph nodes
+    and relationships.
+
+    Node labels come from rdf:type triples; nodes not typed yet (e.g. the
+    Patient subject of the untyped mutations section) fall back to the id
+    prefix, following the Type_key naming of mapping_config templates. The
+    first type of a node is its label (the one its id is keyed on); further
+    types, such as those added by etl_inference, become extra labels.
+    """
+
+    def __init__(self):
+        self._labels = {}
+
+    def node_label(self, uri):
+        node_id = local_name(uri)
+        return self._labels.get(node_id) or node_id.split("_")[0]
+
+    def group_triples(self, triples):
+        """
+        Group one section's triples into node and relationship rows.
+
+        Returns:
+            (nodes, relationships, extra_labels): {label: {id: props}},
+            {(type, source_label, target_label): {(source, target)}} and
+            {(label, extra_label): {id}}
+        """
+        props = defaultdict(dict)
+        links = []
+        types = []
+        for s, p, o in triples:
+            if p == RDF.type:
+                if o in NON_LABEL_TYPES:
+                    continue
+                self._labels.setdefault(local_name(s), local_name(o))
+                types.append((s, local_name(o)))
+            elif isinstance(o, Literal):
+                value = property_value(o)
+                if value is not None:
+                    props[s][property_name(p)] = value
+            else:
+                links.append((s, p, o))
+
+        extra_labels = defaultdict(set)
+        for s, type_label in types:
+            label = self.node_label(s)
+            if type_label == label:
+                props[s]
+            else:
+                extra_labels[(label, type_label)].add(local_name(s))
+
+        nodes = defaultdict(dict)
+        for s, node_props in props.items():
+            nodes[self.node_label(s)].setdefault(local_name(s), {}).update(node_props)
+
+        relationships = defaultdict(set)
+        for s, p, o in links:
+            key = (relationship_type(p), self.node_label(s), self.node_label(o))
+            relationships[key].add((local_name(s), local_name(o)))
+
+        return nodes, relationships, extra_labels
+
+    def write_fragment(self, section_name, lines, cypher_lines):
+        g = Graph()
+        if lines:
+            g.parse(data="".join(lines), format="nt")
+        self.write_section(section_name, list(g), cypher_lines)
+
+
+class UnwindCypherWriter(PropertyGraphWriter):
+    """
+    Batched, parameterized Cypher instead of one MERGE/SET line per value.
+
+    Nodes are grouped by label and relationships by (type, source label,
+    target label); every batch_size rows become one
+    UNWIND $rows AS row MERGE ... statement, so Neo4j plans each statement
+    shape once. Property values keep their RDF datatype (integers, floats,
+    dates) instead of being stringified. Written nodes get the
+    :_Uninferred mark (UNINFERRED_LABEL).
+
+    Outputs:
+        unwind_schema.cypher   uniqueness constraints on :Label(id)
+        unwind_load.cypher     :param + statement pairs for cypher-shell
+        unwind_batches.jsonl   {"statement", "rows"} per batch for drivers
+                               (see read_unwind_batches)
+    """
+
+    def __init__(self, output_dir: Path, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__()
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.batch_size = batch_size
+
+        self._buffers = defaultdict(list)
+        self.batches_written = 0
+        self.rows_written = 0
+
+        self._script = open(self.output_dir / "unwind_load.cypher", "w", encoding="utf-8",
+                            buffering=1 << 20)
+        self._jsonl = open(self.output_dir / "unwind_batches.jsonl", "w", encoding="utf-8",
+                           buffering=1 << 20)
+
+    @staticmethod
+    def node_statement(label):
+        return (f"UNWIND $rows AS row "
+                f"MERGE (n:{cypher_name(label)} {{id: row.id}}) "
+                f"SET n += row.props, n:{cypher_name(UNINFERRED_LABEL)}")
+
+    @staticmethod
+    def extra_label_statement(label, extra_label):
+        return (f"UNWIND $rows AS row "
+                f"MERGE (n:{cypher_name(label)} {{id: row.id}}) SET n:{cypher_name(extra_label)}")
+
+    @staticmethod
+    def relationship_statement(rel_type, source_label, target_label):
+        marker = cypher_name(UNINFERRED_LABEL)
+        return (f"UNWIND $rows AS row "
+                f"MERGE (a:{cypher_name(source_label)} {{id: row.source}}) "
+                f"MERGE (b:{cypher_name(target_label)} {{id: row.target}}) "
+                f"MERGE (a)-[:{cypher_name(rel_type)}]->(b) "
+                f"SET a:{marker}, b:{marker}")
+
+    def write_section(self, section_name, triples, cypher_lines):
+        nodes, relationships, extra_labels = self.group_triples(triples)
+
+        # Nodes before relationships so endpoints usually already exist
+        for label, rows in nodes.items():
+            self._buffer(self.node_statement(label),
+                         [{"id": node_id, "props": node_props} for node_id, node_props in rows.items()])
+        for key, node_ids in extra_labels.items():
+            self._buffer(self.extra_label_statement(*key), [{"id": node_id} for node_id in sorted(node_ids)])
+        for key, pairs in relationships.items():
+            self._buffer(self.relationship_statement(*key),
+                         [{"source": source, "target": target} for source, target in sorted(pairs)])
+
+    def _buffer(self, statement, rows):
+        buffer = self._buffers[statement]
+        buffer.extend(rows)
+        while len(buffer) >= self.batch_size:
+            self._flush(statement, buffer[:self.batch_size])
+            del buffer[:self.batch_size]
+
+    def _flush(self, statement, rows):
+        self._script.write(f":param {{rows: {cypher_literal(rows)}}};\n{statement};\n\n")
+        self._jsonl.write(json.dumps({"statement": statement, "rows": rows},
+                                     default=_json_default) + "\n")
+        self.batches_written += 1
+        self.rows_written += len(rows)
+
+    def close(self):
+        for statement, rows in self._buffers.items():
+            if rows:
+                self._flush(statement, rows)
+        self._buffers.clear()
+        self._script.close()
+        self._jsonl.close()
+
+        labels = sorted(set(self._labels.values()))
+        with open(self.output_dir / "unwind_schema.cypher", "w", encoding="utf-8") as f:
+            for label in labels:
+                f.write(f"CREATE CONSTRAINT {cypher_name(label.lower() + '_id')} IF NOT EXISTS "
+                        f"FOR (n:{cypher_name(label)}) REQUIRE n.id IS UNIQUE;\n")
+
+        print(f"✓ UNWIND Cypher saved ({self.batches_written} batches, {self.rows_written} rows)")
+
+
+########################################
+# neo4j-admin import CSVs
+########################################
+
+# neo4j-admin header type for each Python property type (anything else is a string)
+ADMIN_IMPORT_TYPES = [(bool, "boolean"), (int, "long"), (float, "double"),
+                      (datetime, "datetime"), (date, "date")]
+
+def admin_import_type(value):
+    for python_type, admin_type in ADMIN_IMPORT_TYPES:
+        if isinstance(value, python_type):
+            return admin_type
+    return "string"
+
+def admin_import_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def _merge_admin_types(seen):
+    if len(seen) == 1:
+        return next(iter(seen))
+    if seen <= {"long", "double"}:
+        return "double"
+    return "string"
+
+
+class AdminImportCsvWriter(PropertyGraphWriter):
+    """
+    Node and relationship CSVs for `neo4j-admin database import full`.
+
+    One data file per node label (nodes_<Label>.csv) and relationship type
+    (rels_<TYPE>.csv), each with a separate header file written at close,
+    so rows stream to disk while the header types (long, double, date, ...)
+    are taken from the values actually seen. Node ids are written once,
+    with the properties of the first row for the id; properties a later
+    section adds are kept aside and merged into that row at close (a later
+    value for a property the row already has is dropped with a warning).
+    Ids referenced only as relationship endpoints get a bare node row at
+    close so the import never has dangling ends. Extra labels (further
+    rdf:types, e.g. inferred ones) usually arrive after the node row, so
+    files with any are rewritten at close with a :LABEL column.
+
+    Args:
+        output_dir: Directory for the CSVs and import.sh
+        node_columns: {label: [property, ...]} column order per label
+            (see lung_cancer_etl_engine.admin_import_columns); properties
+            not listed are dropped with a warning
+    """
+
+    def __init__(self, output_dir: Path, node_columns=None):
+        super().__init__()
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.node_columns = {label: list(columns) for label, columns in (node_columns or {}).items()}
+
+        self._node_files = {}
+        self._rel_files = {}
+        self._column_types = defaultdict(lambda: defaultdict(set))
+        self._node_ids = set()
+        self._relationships = set()
+        self._endpoints = {}
+        self._extra_labels = defaultdict(lambda: defaultdict(set))
+        self._late_props = defaultdict(dict)
+        self._dropped = set()
+        self.nodes_written = 0
+        self.relationships_written = 0
+
+    def _open(self, files, name, key):
+        if key not in files:
+            f = open(self.output_dir / f"{name}.csv", "w", newline="", encoding="utf-8")
+            files[key] = (f, csv.writer(f))
+        return files[key][1]
+
+    def _columns(self, label):
+        return self.node_columns.setdefault(label, ["label"])
+
+    def _warn_once(self, key, message):
+        if key not in self._dropped:
+            self._dropped.add(key)
+            print(f"⚠ {message}")
+
+    def _known_props(self, label, props):
+        """Properties that have a column, recording their import types"""
+        columns = self._columns(label)
+        known = {}
+        for name, value in props.items():
+            if name not in columns:
+                self._warn_once((label, name), f"{label}.{name} is not a mapping_config column, not exported")
+            elif value is not None:
+                self._column_types[label][name].add(admin_import_type(value))
+                known[name] = value
+        return known
+
+    def _write_node(self, label, node_id, props):
+        props = self._known_props(label, props)
+        row = [node_id] + [admin_import_value(props.get(name)) for name in self._columns(label)]
+        self._open(self._node_files, f"nodes_{label}", label).writerow(row)
+        self._node_ids.add(node_id)
+        self._endpoints.pop(node_id, None)
+        self.nodes_written += 1
+
+    def write_section(self, section_name, triples, cypher_lines):
+        nodes, relationships, extra_labels = self.group_triples(triples)
+
+        for label, rows in nodes.items():
+            for node_id, props in rows.items():
+                if node_id not in self._node_ids:
+                    self._write_node(label, node_id, props)
+                elif props:
+                    late = self._late_props[label].setdefault(node_id, {})
+                    for name, value in self._known_props(label, props).items():
+                        late.setdefault(name, value)
+        for (label, extra_label), node_ids in extra_labels.items():
+            for node_id in node_ids:
+                self._extra_labels[label][node_id].add(extra_label)
+                if node_id not in self._node_ids:
+                    self._endpoints.setdefault(node_id, label)
+
+        for (rel_type, source_label, target_label), pairs in relationships.items():
+            writer = self._open(self._rel_files, f"rels_{rel_type}", rel_type)
+            for source, target in sorted(pairs):
+                if (rel_type, source, target) in self._relationships:
+                    continue
+                self._relationships.add((rel_type, source, target))
+                writer.writerow([source, target])
+                self.relationships_written += 1
+                for node_id, label in ((source, source_label), (target, target_label)):
+                    if node_id not in self._node_ids:
+                        self._endpoints.setdefault(node_id, label)
+
+    def _rewrite_nodes(self, label, extra_labels):
+        """
+        Rewrite nodes_<label>.csv with the properties later sections added
+        and, if extra_labels, a trailing :LABEL column (';'-separated).
+        """
+        late = self._late_props.get(label, {})
+        extra = self._extra_labels[label]
+        columns = self._columns(label)
+        path = self.output_dir / f"nodes_{label}.csv"
+        tmp_path = path.with_suffix(".csv.tmp")
+        with open(path, newline="", encoding="utf-8") as src, \
+                open(tmp_path, "w", newline="", encoding="utf-8") as dst:
+            writer = csv.writer(dst)
+            for row in csv.reader(src):
+                for name, value in late.get(row[0], {}).items():
+                    i = columns.index(name) + 1
+                    if row[i] == "":
+                        row[i] = admin_import_value(value)
+                    elif row[i] != admin_import_value(value):
+                        self._warn_once((label, name, "conflict"),
+                                        f"{label}.{name} has several values for one node, keeping the first")
+                if extra_labels:
+                    row.append(";".join(sorted(extra.get(row[0], ()))))
+                writer.writerow(row)
+        tmp_path.replace(path)
+
+    def _write_header(self, name, fields):
+        with open(self.output_dir / f"{name}_header.csv", "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(fields)
+
+    def close(self):
+        for node_id, label in list(self._endpoints.items()):
+            self._write_node(label, node_id, {})
+
+        args = []
+        for label, (f, _) in sorted(self._node_files.items()):
+            f.close()
+            types = self._column_types[label]
+            fields = ["id:ID"]
+            for name in self._columns(label):
+                admin_type = _merge_admin_types(types[name]) if types[name] else "string"
+                fields.append(name if admin_type == "string" else f"{name}:{admin_type}")
+            extra_labels = bool(self._extra_labels.get(label))
+            if extra_labels or self._late_props.get(label):
+                self._rewrite_nodes(label, extra_labels)
+            if extra_labels:
+                fields.append(":LABEL")
+            self._write_header(f"nodes_{label}", fields)
+            args.append(f"--nodes={label}=nodes_{label}_header.csv,nodes_{label}.csv")
+
+        for rel_type, (f, _) in sorted(self._rel_files.items()):
+            f.close()
+            self._write_header(f"rels_{rel_type}", [":START_ID", ":END_ID"])
+            args.append(f"--relationships={rel_type}=rels_{rel_type}_header.csv,rels_{rel_type}.csv")
+
+        with open(self.output_dir / "import.sh", "w", encoding="utf-8") as f:
+            f.write("#!/bin/sh\n"
+                    "# Offline bulk load into an empty database (stop Neo4j first)\n"
+                    'cd "$(dirname "$0")"\n'
+                    'neo4j-admin database import full "${1:-neo4j}" --overwrite-destination \\\n'
+                    "    --multiline-fields=true \\\n"
+                    + " \\\n".join(f"    {arg}" for arg in args) + "\n")
+
+        print(f"✓ neo4j-admin CSVs saved to {self.output_dir} "
+              f"({self.nodes_written} nodes, {self.relationships_written} relationships)")
+
+
+class MultiWriter:
+    """Send every section to several writers (e.g. N-Triples + UNWIND Cypher)"""
+
+    def __init__(self, writers):
+        self.writers = list(writers)
+
+    def write_section(self, section_name, triples, cypher_lines):
+        for writer in self.writers:
+            writer.write_section(section_name, triples, cypher_lines)
+
+    def write_fragment(self, section_name, lines, cypher_lines):
+        for writer in self.writers:
+            writer.write_fragment(section_name, lines, cypher_lines)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
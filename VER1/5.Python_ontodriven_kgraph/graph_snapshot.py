@@ -0,0 +1,151 @@
+"""
+Persistent Pre-Parsed Graph Snapshots
+
+Parsing Turtle with rdflib dominates the startup of run_sparql_queries.py
+and validate_shacl.py. This module keeps a pickled copy of the parsed
+in-memory graph next to the outputs and only re-parses the source files
+when they change:
+
+- a small JSON sidecar records each source's path, mtime, size and sha256
+- unchanged mtime + size -> snapshot reused without reading the source
+- changed mtime -> source re-hashed; same hash (e.g. a touch or a
+  checkout) -> snapshot reused and the sidecar refreshed
+- anything else -> sources re-parsed and the snapshot rewritten atomically
+
+The combined source hashes are also returned as a graph-version
+fingerprint for callers that cache query results.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+from rdflib import Graph
+
+SCRIPT_DIR = Path(__file__).parent
+SNAPSHOT_DIR = SCRIPT_DIR / "ouput" / "graph_snapshots"
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+
+def file_hash(path):
+    """sha256 of a file, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_entry(path):
+    stat = Path(path).stat()
+    return {
+        "path": str(Path(path).resolve()),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": file_hash(path),
+    }
+
+
+def fingerprint(entries):
+    """Graph-version fingerprint from the sources' content hashes"""
+    digest = hashlib.sha256()
+    for entry in entries:
+        digest.update(f"{entry['path']}\0{entry['sha256']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def sources_fingerprint(sources):
+    """Fingerprint of files loaded without a snapshot"""
+    return fingerprint([_source_entry(source) for source in sources])
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _fresh_entries(meta, sources):
+    """
+    Check a snapshot's sidecar against the current sources.
+
+    Returns:
+        Updated source entries if the snapshot is still valid, else None
+    """
+    if not meta or meta.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    recorded = meta.get("sources", [])
+    if [entry["path"] for entry in recorded] != [str(Path(p).resolve()) for p in sources]:
+        return None
+
+    entries = []
+    for entry, source in zip(recorded, sources):
+        stat = Path(source).stat()
+        if stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]:
+            entries.append(entry)
+            continue
+        current = _source_entry(source)
+        if current["sha256"] != entry["sha256"]:
+            return None
+        entries.append(current)
+    return entries
+
+
+def load_graph_snapshot(sources, name, namespaces=None, snapshot_dir=SNAPSHOT_DIR, rebuild=False):
+    """
+    Load the union of `sources` from a snapshot, re-parsing only if a source changed.
+
+    Args:
+        sources: RDF files to parse (any format rdflib can guess)
+        name: Snapshot name, one per distinct source list (e.g. "sparql")
+        namespaces: Prefixes bound on a freshly parsed graph
+        snapshot_dir: Where <name>.pickle and <name>.json live
+        rebuild: Ignore any existing snapshot
+
+    Returns:
+        (graph, fingerprint, from_snapshot)
+    """
+    sources = [Path(source) for source in sources]
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_path = snapshot_dir / f"{name}.pickle"
+    meta_path = snapshot_dir / f"{name}.json"
+
+    meta = None if rebuild else _read_meta(meta_path)
+    entries = _fresh_entries(meta, sources)
+    if entries is not None and snapshot_path.exists():
+        try:
+            with open(snapshot_path, "rb") as f:
+                graph = pickle.load(f)
+            if entries != meta["sources"]:
+                _write_atomic(meta_path, lambda f: f.write(json.dumps(
+                    {"version": SNAPSHOT_VERSION, "sources": entries}, indent=2).encode()))
+            return graph, fingerprint(entries), True
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # unreadable snapshot: fall through and rebuild it
+
+    # Hash before parsing: a source edited mid-parse then fails the next check
+    entries = [_source_entry(source) for source in sources]
+    graph = Graph()
+    for prefix, namespace in (namespaces or {}).items():
+        graph.bind(prefix, namespace)
+    for source in sources:
+        graph.parse(source)
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    _write_atomic(snapshot_path, lambda f: pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL))
+    _write_atomic(meta_path, lambda f: f.write(json.dumps(
+        {"version": SNAPSHOT_VERSION, "sources": entries}, indent=2).encode()))
+    return graph, fingerprint(entries), False
@@ -1,10 +1,21 @@
 import pandas as pd
+import numpy as np
 import json
 import hashlib
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
+from string import Formatter
 from pathlib import Path
 from rdflib import Graph, Namespace, URIRef, Literal
 from rdflib.namespace import RDF, RDFS, XSD
-from nlp_processor import EntityExtractor, process_article_text
+from nlp_processor import EntityExtractor, ExtractionCache, process_article_text
+import etl_inference
+from etl_writers import (GraphWriter, NTriplesStreamWriter, UnwindCypherWriter, AdminImportCsvWriter,
+                         MultiWriter,
+                         DEFAULT_DEDUP_CAPACITY, DEFAULT_BATCH_SIZE, nt_lines)
 
 BASE = Namespace("http://lungkg.org/resource/")
 ONT  = Namespace("http://lungkg.org/ontology#")
@@ -13,11 +24,14 @@ ONT  = Namespace("http://lungkg.org/ontology#")
 SCRIPT_DIR = Path(__file__).parent
 
 MAPPING  = SCRIPT_DIR / "ttl_shacl_data" / "mapping_config.json"
+ONTOLOGY = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_kg_schema.ttl"
+OUTPUT_DIR = SCRIPT_DIR / "ouput"
+
+# Rows read per CSV chunk
+DEFAULT_CHUNKSIZE = 100_000
 
-# Create a new graph for instances only (don't parse schema)
-g = Graph()
-g.bind("ont", ONT)
-g.bind("res", BASE)
+# NLP extraction results reused across runs
+NLP_CACHE = OUTPUT_DIR / "nlp_extraction_cache.sqlite"
 
 
 ########################################
@@ -61,26 +75,63 @@ def get_entity_label(type_name, row, template):
         filled = template.format(**row)
         return make_label(filled)
 
-cypher_lines = []
-
-# Initialize NLP entity extractor
-entity_extractor = None  # Will be initialized after processing
+def load_mapping(mapping_path=MAPPING):
+    """Load the CSV-to-RDF mapping configuration"""
+    with open(mapping_path, 'r') as f:
+        return json.load(f)
 
 
 ########################################
-# Engine
+# Row-by-row section processing (reference)
 ########################################
 
-config = json.load(open(MAPPING, 'r'))
+def is_extractable(article_body):
+    """Only article bodies with some real text are sent to NLP extraction"""
+    return pd.notna(article_body) and len(str(article_body)) > 50
+
+def entity_output(subj, entities, entity_extractor):
+    """Triples and Cypher lines linking one article to its extracted entities"""
+    # Create triples for extracted entities
+    triples = entity_extractor.create_entity_triples(subj, entities)
+    cypher_lines = []
+
+    # Add cypher for entity linking
+    for concept_type, entity_list in entities.items():
+        for entity_text, canonical_name in entity_list:
+            entity_id = f"{concept_type}_{canonical_name}"
+            cypher_lines.append(
+                f"MERGE (e:{concept_type} {{id:'{entity_id}'}})"
+            )
+            cypher_lines.append(
+                f"SET e.label='{concept_type} {canonical_name}'"
+            )
+            cypher_lines.append(
+                f"MERGE (n)-[:REFERS_TO]->(e)"
+            )
+
+    return triples, cypher_lines
+
+def nlp_section_output(subj, article_body, entity_extractor):
+    """Triples and Cypher lines for the entities mentioned in one article body"""
+    if not is_extractable(article_body):
+        return [], []
+    # Extract entities from article text
+    entities = entity_extractor.extract_entities(str(article_body))
+    return entity_output(subj, entities, entity_extractor)
+
 
-# Initialize entity extractor for NLP processing
-entity_extractor = EntityExtractor(g, ONT, BASE)
+def process_section_rows(section, df, entity_extractor):
+    """
+    Map one mapping_config section row by row.
 
-for section_name, section in config.items():
+    This is the original iterrows() implementation, kept as the reference
+    that the columnar path is checked against.
 
-    # Resolve CSV file path relative to script directory
-    csv_path = SCRIPT_DIR / section["file"]
-    df = pd.read_csv(csv_path)
+    Returns:
+        (triples, cypher_lines) for the whole section
+    """
+    triples = []
+    cypher_lines = []
 
     for _, r in df.iterrows():
         row = r.to_dict()
@@ -89,23 +140,23 @@ for section_name, section in config.items():
 
         # type
         if "type" in section:
-            g.add((subj, RDF.type, ONT[section["type"]]))
-            
+            triples.append((subj, RDF.type, ONT[section["type"]]))
+
             # Add rdfs:label for the subject
             subj_label = get_entity_label(section["type"], row, section["subject"])
-            g.add((subj, RDFS.label, Literal(subj_label)))
-            
+            triples.append((subj, RDFS.label, Literal(subj_label)))
+
             # Special handling for articles: add original URI as property
             if section["type"] == "Article" and "uri" in row:
-                g.add((subj, ONT["sourceUrl"], Literal(row["uri"])))
-            
+                triples.append((subj, ONT["sourceUrl"], Literal(row["uri"])))
+
             cypher_lines.append(
                 f"MERGE (n:{section['type']} {{id:'{subj.split('/')[-1]}'}})"
             )
             cypher_lines.append(
                 f"SET n.label='{subj_label}'"
             )
-            
+
             # Add source URL to cypher for articles
             if section["type"] == "Article" and "uri" in row:
                 cypher_lines.append(
@@ -117,9 +168,9 @@ for section_name, section in config.items():
             value = row[col]
             # Handle date types
             if prop == "publicationDate":
-                g.add((subj, ONT[prop], Literal(value, datatype=XSD.date)))
+                triples.append((subj, ONT[prop], Literal(value, datatype=XSD.date)))
             else:
-                g.add((subj, ONT[prop], Literal(value)))
+                triples.append((subj, ONT[prop], Literal(value)))
             cypher_lines.append(
                 f"SET n.{prop}='{value}'"
             )
@@ -136,19 +187,19 @@ for section_name, section in config.items():
                 # Fixed class reference: "LungCancer"
                 obj = ONT[tmpl]  # Create URI in ontology namespace
                 obj_type = tmpl
-            
-            g.add((subj, ONT[prop], obj))
-            
+
+            triples.append((subj, ONT[prop], obj))
+
             # Add rdf:type for the linked object (CRITICAL for Neo4j!)
-            g.add((obj, RDF.type, ONT[obj_type]))
-            
+            triples.append((obj, RDF.type, ONT[obj_type]))
+
             # Add rdfs:label for linked objects
             obj_label = make_label(str(obj))
-            g.add((obj, RDFS.label, Literal(obj_label)))
+            triples.append((obj, RDFS.label, Literal(obj_label)))
 
             # Get URI fragment for Cypher ID
             obj_id = str(obj).split('/')[-1].split('#')[-1]
-            
+
             cypher_lines.append(
                 f"MERGE (o:{obj_type} {{id:'{obj_id}'}})"
             )
@@ -158,46 +209,508 @@ for section_name, section in config.items():
             cypher_lines.append(
                 f"MERGE (n)-[:{prop.upper()}]->(o)"
             )
-        
+
         # NLP entity extraction for articles
         if section.get("nlp_extraction", False) and "body" in row:
-            article_body = row["body"]
-            if pd.notna(article_body) and len(str(article_body)) > 50:
-                # Extract entities from article text
-                entities = entity_extractor.extract_entities(str(article_body))
-                
-                # Create triples for extracted entities
-                entity_triples = entity_extractor.create_entity_triples(subj, entities)
-                for triple in entity_triples:
-                    g.add(triple)
-                
-                # Add cypher for entity linking
-                for concept_type, entity_list in entities.items():
-                    for entity_text, canonical_name in entity_list:
-                        entity_id = f"{concept_type}_{canonical_name}"
-                        cypher_lines.append(
-                            f"MERGE (e:{concept_type} {{id:'{entity_id}'}})"
-                        )
-                        cypher_lines.append(
-                            f"SET e.label='{concept_type} {canonical_name}'"
-                        )
-                        cypher_lines.append(
-                            f"MERGE (n)-[:REFERS_TO]->(e)"
-                        )
+            nlp_triples, nlp_cypher = nlp_section_output(subj, row["body"], entity_extractor)
+            triples.extend(nlp_triples)
+            cypher_lines.extend(nlp_cypher)
+
+    return triples, cypher_lines
 
 
 ########################################
-# Save outputs
+# Columnar section processing
 ########################################
 
-# Create output directory if it doesn't exist
-OUTPUT_DIR = SCRIPT_DIR / "ouput"
-OUTPUT_DIR.mkdir(exist_ok=True)
+def _str_column(df, col):
+    """str() of every value in a column, matching template.format() output"""
+    return df[col].astype(str).fillna("nan")
+
+def _format_column(df, template):
+    """Vectorised template.format(**row) over every row of the frame"""
+    result = pd.Series("", index=df.index, dtype=object)
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if spec or conversion:
+            # Format specs are rare in mapping templates - fall back to Python
+            return pd.Series(
+                [template.format(**row) for row in df.to_dict("records")],
+                index=df.index, dtype=object,
+            )
+        if literal:
+            result = result + literal
+        if field is not None:
+            result = result + _str_column(df, field)
+    return result
+
+def _local_name_column(uris):
+    """Vectorised uri.split('/')[-1].split('#')[-1]"""
+    return uris.str.rsplit('/', n=1).str[-1].str.rsplit('#', n=1).str[-1]
+
+def _label_column(uris):
+    """Vectorised make_label()"""
+    return _local_name_column(uris).str.replace('_', ' ', regex=False)
+
+def subject_local_column(df, template):
+    """Vectorised make_uri() local names, including the article URI special case"""
+    if 'Article_{uri}' in template and 'uri' in df.columns:
+        uris = _str_column(df, 'uri')
+        article_ids = uris.str.extract(r'(PMC\d+)', expand=False)
+        missing = article_ids.isna()
+        if missing.any():
+            article_ids[missing] = uris[missing].map(extract_article_id)
+        return "Article_" + article_ids
+    return _format_column(df, template)
+
+def _map_unique(values, func):
+    """Apply func once per distinct value and broadcast the results back"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    mapped = np.empty(len(uniques), dtype=object)
+    mapped[:] = [func(value) for value in uniques.tolist()]
+    return mapped[codes].tolist()
+
+def _uri_list(local_names):
+    """Resource URIRefs for a column of local names"""
+    return _map_unique(local_names, lambda name: URIRef(BASE[name]))
+
+def _literal_list(values, datatype=None):
+    """Literals for a column of native values"""
+    return _map_unique(values, lambda value: Literal(value, datatype=datatype))
+
+
+def process_section_columnar(section, df, entity_extractor, nlp_workers=1):
+    """
+    Map one mapping_config section a whole column at a time.
+
+    Subject/object URIs, labels and Cypher statements are built with pandas
+    string operations over the full frame and the triples are emitted in
+    bulk. Output is identical to process_section_rows() (same triples, same
+    Cypher lines in the same order); values are taken per column, so the
+    iterrows() int-to-float upcast of all-numeric frames does not apply.
+    Article bodies are extracted with EntityExtractor.extract_many, using a
+    process pool when nlp_workers > 1.
+
+    Returns:
+        (triples, cypher_lines) for the whole section
+    """
+    triples = []
+    # One entry per Cypher statement position; each is a column of strings
+    cypher_columns = []
+    n = len(df)
+    if n == 0:
+        return triples, []
+
+    subj_local = subject_local_column(df, section["subject"])
+    subjects = _uri_list(subj_local)
+
+    # type
+    if "type" in section:
+        type_name = section["type"]
+        triples.extend(zip(subjects, repeat(RDF.type), repeat(ONT[type_name])))
+
+        # Add rdfs:label for the subject
+        if type_name == "Patient":
+            if 'patient_id' in df.columns:
+                subj_labels = "Patient " + _str_column(df, 'patient_id')
+            else:
+                subj_labels = pd.Series("Patient ", index=df.index, dtype=object)
+        else:
+            subj_labels = _label_column(_format_column(df, section["subject"]))
+        triples.extend(zip(subjects, repeat(RDFS.label), _literal_list(subj_labels)))
+
+        has_source = type_name == "Article" and "uri" in df.columns
+        if has_source:
+            triples.extend(zip(subjects, repeat(ONT["sourceUrl"]), _literal_list(df["uri"].tolist())))
+
+        cypher_columns.append(
+            f"MERGE (n:{type_name} {{id:'" + subj_local.str.rsplit('/', n=1).str[-1] + "'})"
+        )
+        cypher_columns.append("SET n.label='" + subj_labels + "'")
+        if has_source:
+            cypher_columns.append("SET n.sourceUrl='" + _str_column(df, 'uri') + "'")
+
+    # datatype properties
+    for prop, col in section.get("datatype_props", {}).items():
+        datatype = XSD.date if prop == "publicationDate" else None
+        triples.extend(zip(subjects, repeat(ONT[prop]), _literal_list(df[col].tolist(), datatype)))
+        cypher_columns.append(f"SET n.{prop}='" + _str_column(df, col) + "'")
+
+    # object links
+    for prop, tmpl in section.get("object_links", {}).items():
+        if "{" in tmpl:
+            obj_local = subject_local_column(df, tmpl)
+            obj_type = tmpl.split("_")[0]
+            objects = _uri_list(obj_local)
+            obj_ids = _local_name_column(obj_local)
+            obj_labels = obj_ids.str.replace('_', ' ', regex=False)
+            label_literals = _literal_list(obj_labels)
+        else:
+            obj = ONT[tmpl]
+            obj_type = tmpl
+            objects = [obj] * n
+            obj_ids = str(obj).split('/')[-1].split('#')[-1]
+            obj_labels = make_label(str(obj))
+            label_literals = repeat(Literal(obj_labels), n)
+
+        triples.extend(zip(subjects, repeat(ONT[prop]), objects))
+        triples.extend(zip(objects, repeat(RDF.type), repeat(ONT[obj_type])))
+        triples.extend(zip(objects, repeat(RDFS.label), label_literals))
+
+        cypher_columns.append(f"MERGE (o:{obj_type} {{id:'" + obj_ids + "'})")
+        cypher_columns.append("SET o.label='" + obj_labels + "'")
+        cypher_columns.append(f"MERGE (n)-[:{prop.upper()}]->(o)")
+
+    # Broadcast constant statements and assemble rows in statement order
+    cypher_columns = [
+        repeat(col, n) if isinstance(col, str) else col.tolist()
+        for col in cypher_columns
+    ]
+    rows = zip(*cypher_columns) if cypher_columns else repeat((), n)
+
+    # NLP entity extraction for articles, batched (optionally across processes)
+    if section.get("nlp_extraction", False) and "body" in df.columns:
+        bodies = df["body"].tolist()
+        extractable = [is_extractable(body) for body in bodies]
+        extracted = entity_extractor.extract_many(
+            (str(body) for body, ok in zip(bodies, extractable) if ok),
+            workers=nlp_workers,
+        )
+
+        cypher_lines = []
+        for subj, ok, fixed in zip(subjects, extractable, rows):
+            cypher_lines.extend(fixed)
+            if ok:
+                nlp_triples, nlp_cypher = entity_output(subj, next(extracted), entity_extractor)
+                triples.extend(nlp_triples)
+                cypher_lines.extend(nlp_cypher)
+    else:
+        cypher_lines = [line for fixed in rows for line in fixed]
+
+    return triples, cypher_lines
+
+
+SECTION_PROCESSORS = {
+    "row": process_section_rows,
+    "columnar": process_section_columnar,
+}
+
+
+########################################
+# Engine
+########################################
+
+def admin_import_columns(config):
+    """
+    Node CSV columns per label from mapping_config: label first, then the
+    datatype_props of every section typed with that label.
+    """
+    columns = {}
+    for section in config.values():
+        if section.get("type"):
+            label_columns = columns.setdefault(section["type"], ["label"])
+            props = list(section.get("datatype_props", {}))
+            if section["type"] == "Article":
+                props.insert(0, "sourceUrl")  # added by the article special case
+            for prop in props:
+                if prop not in label_columns:
+                    label_columns.append(prop)
+    return columns
+
+
+def make_writer(output_format="ttl", output_dir=OUTPUT_DIR, dedup_capacity=DEFAULT_DEDUP_CAPACITY,
+                cypher_format="lines", batch_size=DEFAULT_BATCH_SIZE, admin_import_dir=None,
+                config=None):
+    """
+    Create the output writer for a run.
+
+    cypher_format "lines" writes auto_generated.cypher alongside the RDF;
+    "unwind" writes batched UNWIND statements instead. admin_import_dir
+    additionally writes neo4j-admin import CSVs (columns from config).
+    """
+    line_cypher = cypher_format == "lines"
+    if output_format == "nt":
+        writer = NTriplesStreamWriter(output_dir, dedup_capacity=dedup_capacity, cypher=line_cypher)
+    else:
+        writer = GraphWriter(output_dir, namespaces={"ont": ONT, "res": BASE}, cypher=line_cypher)
+
+    writers = [writer]
+    if cypher_format == "unwind":
+        writers.append(UnwindCypherWriter(output_dir, batch_size=batch_size))
+    if admin_import_dir:
+        writers.append(AdminImportCsvWriter(admin_import_dir,
+                                            node_columns=admin_import_columns(config or load_mapping())))
+    return MultiWriter(writers) if len(writers) > 1 else writer
+
+
+def group_sections_by_file(config):
+    """
+    Group mapping_config sections by their source CSV.
+
+    Several sections map the same file (patients/tumors, mutations/
+    genomic_tests/biomarkers, treatments/therapies); grouping lets each
+    file be read once. Files and sections keep their config order.
+
+    Returns:
+        Dict mapping CSV path to a list of (section_name, section) pairs
+    """
+    groups = {}
+    for section_name, section in config.items():
+        # Resolve CSV file path relative to script directory
+        csv_path = SCRIPT_DIR / section["file"]
+        groups.setdefault(csv_path, []).append((section_name, section))
+    return groups
+
+
+def _merge_dtypes(a, b):
+    """dtype pandas infers for a column whose parts were inferred as a and b"""
+    if a == b:
+        return a
+    if all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in (a, b)):
+        return np.dtype("float64")
+    return np.dtype("object")
+
+
+def file_dtypes(csv_path, chunksize):
+    """
+    Column dtypes of a whole CSV, merged from a chunked first pass.
+
+    Returns:
+        (dtypes, chunk): chunk is the only chunk if the file fits in one, else None
+    """
+    dtypes, chunks, chunk = {}, 0, None
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunks += 1
+        for name, dtype in chunk.dtypes.items():
+            dtypes[name] = _merge_dtypes(dtypes[name], dtype) if name in dtypes else dtype
+    return dtypes, chunk if chunks == 1 else None
+
+
+def iter_file_chunks(config, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Read every source CSV once, in chunks, and pair each chunk with all
+    sections that map that file.
+
+    Memory is bounded by chunksize rows per file (None reads whole files).
+    Files larger than one chunk get a first pass that fixes the dtypes for
+    the whole file, so a blank cell in one chunk cannot turn 45 into 45.0
+    there only: chunked output is identical to unchunked output.
+
+    Yields:
+        (sections, chunk_df) where sections is a list of (section_name, section)
+    """
+    for csv_path, sections in group_sections_by_file(config).items():
+        if not chunksize:
+            chunks = [pd.read_csv(csv_path)]
+        else:
+            dtypes, chunk = file_dtypes(csv_path, chunksize)
+            chunks = [chunk] if chunk is not None else pd.read_csv(csv_path, chunksize=chunksize, dtype=dtypes)
+
+        for chunk in chunks:
+            yield sections, chunk
+
+
+########################################
+# Parallel workers
+########################################
+
+def make_entity_extractor(nlp_cache=None):
+    """
+    Entity extractor for NLP processing, optionally backed by an on-disk
+    result cache (it only uses the namespaces, so the instance graph is
+    not needed).
+    """
+    cache = None
+    if nlp_cache:
+        Path(nlp_cache).parent.mkdir(exist_ok=True)
+        cache = ExtractionCache(nlp_cache)
+    return EntityExtractor(Graph(), ONT, BASE, cache=cache)
+
+
+# Per-process entity extractor, created by the pool initializer
+_worker_extractor = None
+
+def _init_worker(nlp_cache=None):
+    global _worker_extractor
+    _worker_extractor = make_entity_extractor(nlp_cache)
+
+def _map_chunk_to_fragments(mode, sections, df):
+    """
+    Worker task: map one chunk for every section that reads it.
+
+    Returns N-Triples lines rather than rdflib terms, which are much cheaper
+    to send back to the parent process.
+
+    Returns:
+        List of (section_name, nt_lines, cypher_lines)
+    """
+    process_section = SECTION_PROCESSORS[mode]
+    fragments = []
+    for section_name, section in sections:
+        triples, section_cypher = process_section(section, df, _worker_extractor)
+        fragments.append((section_name, nt_lines(triples), section_cypher))
+    return fragments
+
+
+def _run_parallel(config, mode, writer, chunksize, workers, nlp_cache=None):
+    """
+    Fan chunks out to a process pool and merge results in submission order.
+
+    At most 2 * workers chunks are in flight, so memory stays bounded and
+    the merged output is identical to a sequential run.
+    """
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(nlp_cache,)) as pool:
+        for sections, df in iter_file_chunks(config, chunksize):
+            pending.append(pool.submit(_map_chunk_to_fragments, mode, sections, df))
+            if len(pending) >= 2 * workers:
+                for fragment in pending.popleft().result():
+                    writer.write_fragment(*fragment)
+
+        while pending:
+            for fragment in pending.popleft().result():
+                writer.write_fragment(*fragment)
+
+
+def run_etl(config, mode="columnar", writer=None, chunksize=DEFAULT_CHUNKSIZE, workers=1,
+            nlp_workers=1, nlp_cache=None):
+    """
+    Convert every mapping_config section and hand the output to a writer.
+
+    Each chunk's output is passed to the writer as soon as it is mapped, so
+    a streaming writer never holds more than a few chunks in memory. With
+    workers > 1 chunks are mapped in a process pool; otherwise nlp_workers > 1
+    runs article entity extraction (columnar mode) in its own process pool.
+    With an nlp_cache path, articles whose body was already extracted by the
+    same extractor version are served from that SQLite cache (columnar mode).
+
+    Returns:
+        The writer (a GraphWriter with .graph and .cypher_lines by default)
+    """
+    if writer is None:
+        writer = GraphWriter(OUTPUT_DIR, namespaces={"ont": ONT, "res": BASE})
+
+    if workers > 1:
+        _run_parallel(config, mode, writer, chunksize, workers, nlp_cache)
+        return writer
+
+    process_section = SECTION_PROCESSORS[mode]
+    if mode == "columnar":
+        process_section = partial(process_section, nlp_workers=nlp_workers)
+
+    with make_entity_extractor(nlp_cache) as entity_extractor:
+        for sections, df in iter_file_chunks(config, chunksize):
+            for section_name, section in sections:
+                triples, section_cypher = process_section(section, df, entity_extractor)
+                writer.write_section(section_name, triples, section_cypher)
+
+    return writer
+
+
+def _compare_runs(name_a, a, name_b, b):
+    """Print whether two ETL runs produced the same triples and Cypher"""
+    a_triples = set(a.graph)
+    b_triples = set(b.graph)
+    ok = True
+
+    if a_triples != b_triples:
+        ok = False
+        print(f"✗ Triples differ: {len(a_triples - b_triples)} only in {name_a}, "
+              f"{len(b_triples - a_triples)} only in {name_b}")
+    else:
+        print(f"✓ Triples identical ({len(a_triples)}, {name_a} vs {name_b})")
+
+    if a.cypher_lines != b.cypher_lines:
+        ok = False
+        print(f"✗ Cypher differs ({len(a.cypher_lines)} {name_a} lines vs "
+              f"{len(b.cypher_lines)} {name_b} lines)")
+    else:
+        print(f"✓ Cypher identical ({len(a.cypher_lines)} lines, {name_a} vs {name_b})")
+
+    return ok
+
+
+def check_parity(config, chunksize=DEFAULT_CHUNKSIZE, workers=1, nlp_workers=1):
+    """
+    Compare columnar (optionally parallel) output against the sequential
+    row-by-row reference, and chunked against whole-file reads.
+    """
+    row = run_etl(config, mode="row", chunksize=chunksize)
+    col = run_etl(config, mode="columnar", chunksize=chunksize, workers=workers,
+                  nlp_workers=nlp_workers)
+    ok = _compare_runs("row mode", row, "columnar mode", col)
+
+    if chunksize:
+        whole = run_etl(config, mode="columnar", chunksize=None)
+        ok = _compare_runs("unchunked", whole, "chunked", col) and ok
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ontology-driven lung cancer ETL")
+    parser.add_argument("--mode", choices=sorted(SECTION_PROCESSORS), default="columnar",
+                        help="columnar (vectorised, default) or row (iterrows reference)")
+    parser.add_argument("--check-parity", action="store_true",
+                        help="run both modes and compare their output instead of saving")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="rows read per CSV chunk (0 reads whole files)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="map chunks in a pool of N worker processes")
+    parser.add_argument("--nlp-workers", type=int, default=1,
+                        help="extract article entities in a pool of N processes (single-worker runs)")
+    parser.add_argument("--nlp-cache", type=Path, default=NLP_CACHE,
+                        help="SQLite cache of NLP extraction results reused across runs")
+    parser.add_argument("--no-nlp-cache", action="store_true",
+                        help="always re-extract article entities")
+    parser.add_argument("--incremental", action="store_true",
+                        help="diff against the previous run's manifest and write only delta outputs")
+    parser.add_argument("--manifest", type=Path, default=OUTPUT_DIR / "etl_manifest.sqlite",
+                        help="row/triple manifest used by --incremental")
+    parser.add_argument("--output-format", choices=["ttl", "nt"], default="ttl",
+                        help="ttl (in-memory graph, default) or nt (stream N-Triples to disk)")
+    parser.add_argument("--cypher-format", choices=["lines", "unwind"], default="lines",
+                        help="lines (auto_generated.cypher, default) or unwind (batched, parameterized)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per UNWIND statement with --cypher-format unwind")
+    parser.add_argument("--admin-import-csv", type=Path, nargs="?", const=OUTPUT_DIR / "neo4j_admin_import",
+                        default=None, metavar="DIR",
+                        help="also write neo4j-admin import CSVs (default dir: ouput/neo4j_admin_import)")
+    parser.add_argument("--dedup-capacity", type=int, default=DEFAULT_DEDUP_CAPACITY,
+                        help="size of the duplicate-triple window when streaming N-Triples")
+    parser.add_argument("--materialize", action="store_true",
+                        help="add RDFS / OWL-RL entailments from the ontology to the outputs (etl_inference.py)")
+    parser.add_argument("--materialize-rules", nargs="+", choices=etl_inference.RULES, default=None,
+                        metavar="RULE", help=f"rules for --materialize (default: all of {', '.join(etl_inference.RULES)})")
+    args = parser.parse_args()
+
+    config = load_mapping()
+
+    if args.check_parity:
+        raise SystemExit(0 if check_parity(config, args.chunksize, args.workers,
+                                          args.nlp_workers) else 1)
+
+    if args.incremental:
+        if args.materialize:
+            parser.error("--materialize needs the full graph and does not apply to --incremental runs")
+        from etl_incremental import run_incremental
+        run_incremental(config, manifest_path=args.manifest, chunksize=args.chunksize,
+                        nlp_cache=None if args.no_nlp_cache else args.nlp_cache)
+        return
 
-g.serialize(OUTPUT_DIR / "lung_cancer_instances_out.ttl")
+    writer = make_writer(args.output_format, dedup_capacity=args.dedup_capacity,
+                         cypher_format=args.cypher_format, batch_size=args.batch_size,
+                         admin_import_dir=args.admin_import_csv, config=config)
+    if args.materialize:
+        ontology_graph = Graph()
+        ontology_graph.parse(ONTOLOGY)
+        writer = etl_inference.MaterializingWriter(writer, ontology_graph,
+                                                   args.materialize_rules or etl_inference.RULES)
+    run_etl(config, mode=args.mode, writer=writer, chunksize=args.chunksize,
+            workers=args.workers, nlp_workers=args.nlp_workers,
+            nlp_cache=None if args.no_nlp_cache else args.nlp_cache)
+    writer.close()
 
-with open(OUTPUT_DIR / "auto_generated.cypher", "w") as f:
-    f.write("\n".join(cypher_lines))
 
-print("✓ RDF saved")
-print("✓ Cypher saved")
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,66 @@
 """
 Neo4j Import Script with Neosemantics (n10s)
 This script imports the lung cancer knowledge graph into Neo4j with proper label handling
+
+Bulk mode (--bulk) skips n10s and writes the ETL's UNWIND batches
+(lung_cancer_etl_engine.py --cypher-format unwind) over bolt in managed
+write transactions, with label partitions loaded by concurrent sessions.
 """
+import argparse
+import queue
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
 from pathlib import Path
 
+from etl_writers import read_unwind_batches, DEFAULT_BATCH_SIZE
+
 # Neo4j connection details
 NEO4J_URI = "bolt://localhost:7687"
 NEO4J_USER = "neo4j"
 NEO4J_PASSWORD = "your_password_here"  # UPDATE THIS
 
 SCRIPT_DIR = Path(__file__).parent
+UNWIND_BATCHES = SCRIPT_DIR / "ouput" / "unwind_batches.jsonl"
+UNWIND_SCHEMA = SCRIPT_DIR / "ouput" / "unwind_schema.cypher"
+
+# Bulk loading
+DEFAULT_BULK_WORKERS = 4
+LANE_QUEUE_SIZE = 4  # batches waiting per worker
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.2  # seconds, doubled per attempt
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+# First label in an UNWIND statement: the node label, or the source label of a relationship
+STATEMENT_LABEL = re.compile(r"MERGE \((n|a):`((?:[^`]|``)*)`")
+
+
+def statement_partition(statement):
+    """
+    Partition key for an UNWIND statement from etl_writers.UnwindCypherWriter.
+
+    Returns:
+        ("nodes", label) or ("relationships", source_label)
+    """
+    match = STATEMENT_LABEL.search(statement)
+    if not match:
+        raise ValueError(f"Not an UNWIND node/relationship statement: {statement[:80]}")
+    kind = "nodes" if match.group(1) == "n" else "relationships"
+    return kind, match.group(2).replace("``", "`")
+
 
 class Neo4jImporter:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, driver=None, database=None):
+        """
+        Args:
+            driver: Pre-built driver (e.g. a fake one in tests); uri/user/password are then ignored
+            database: Target database for bulk sessions (server default if None)
+        """
+        self.driver = driver or GraphDatabase.driver(uri, auth=(user, password))
+        self.database = database
     
     def close(self):
         self.driver.close()
@@ -69,6 +115,140 @@ class Neo4jImporter:
             print(f"✓ {description} imported successfully")
             print(f"  Triples: {summary}")
     
+    ########################################
+    # Bulk UNWIND loading
+    ########################################
+
+    def create_constraints(self, schema_file=UNWIND_SCHEMA):
+        """Run the id uniqueness constraints written next to the UNWIND batches"""
+        statements = [stmt.strip() for stmt in Path(schema_file).read_text().split(";") if stmt.strip()]
+        with self.driver.session(database=self.database) as session:
+            for statement in statements:
+                session.run(statement).consume()
+        print(f"✓ Created {len(statements)} id constraints")
+
+    @staticmethod
+    def _write_rows(tx, statement, rows):
+        tx.run(statement, rows=rows).consume()
+
+    def _write_batch(self, session, statement, rows, max_retries=MAX_RETRIES):
+        """
+        Write one batch in a managed write transaction.
+
+        execute_write already retries transient failures for a while; this
+        loop additionally backs off and retries errors that escape it
+        (deadlocks between concurrent relationship partitions, leader
+        switches), so one unlucky batch does not abort the whole load.
+
+        Returns:
+            Number of retries needed
+        """
+        for attempt in range(max_retries + 1):
+            try:
+                session.execute_write(self._write_rows, statement, rows)
+                return attempt
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                delay = RETRY_BACKOFF * 2 ** attempt
+                print(f"  ⚠ {type(e).__name__} on {len(rows)} rows, retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _drain_lane(self, lane, counts, errors):
+        """Write the batches queued on one lane, in order, through a single session"""
+        with self.driver.session(database=self.database) as session:
+            while True:
+                item = lane.get()
+                if item is None:
+                    return
+                if errors:
+                    continue  # keep draining so the reader never blocks on a full queue
+                kind, statement, rows = item
+                try:
+                    counts[kind]["retries"] += self._write_batch(session, statement, rows)
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                counts[kind]["rows"] += len(rows)
+                counts[kind]["batches"] += 1
+
+    def bulk_load(self, batches, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_BULK_WORKERS):
+        """
+        Stream (statement, rows) batches into Neo4j with UNWIND in managed
+        write transactions.
+
+        Rows are regrouped per statement and re-sliced to batch_size as they
+        are read, so the transaction size does not depend on how the ETL
+        batched them. Each full batch goes straight to the worker lane of its
+        partition (node label, or source label of a relationship); a lane
+        writes through one session in file order, so one label is never
+        MERGEd by two sessions at once and nodes precede the relationships
+        the ETL wrote after them. Relationship statements MERGE their
+        endpoints, so order across lanes does not change the result; lock
+        conflicts on shared target nodes are what the retry in _write_batch
+        is for. Lane queues are bounded: memory holds at most
+        workers * LANE_QUEUE_SIZE batches plus one partial batch per
+        statement, whatever the size of the load.
+
+        Args:
+            batches: Iterable of (statement, rows), e.g. read_unwind_batches(path)
+            batch_size: Rows per transaction
+            workers: Concurrent sessions
+
+        Returns:
+            Dict with rows, batches, retries and partitions per kind, and seconds
+        """
+        lanes = [queue.Queue(maxsize=LANE_QUEUE_SIZE) for _ in range(max(workers, 1))]
+        counts = [defaultdict(Counter) for _ in lanes]
+        errors = []
+        lane_of = {}
+        buffers = defaultdict(list)
+
+        def submit(partition, statement, rows):
+            if partition not in lane_of:
+                lane_of[partition] = len(lane_of) % len(lanes)
+            lanes[lane_of[partition]].put((partition[0], statement, rows))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(lanes)) as pool:
+            for lane, lane_counts in zip(lanes, counts):
+                pool.submit(self._drain_lane, lane, lane_counts, errors)
+            try:
+                for statement, rows in batches:
+                    if errors:
+                        break
+                    buffer = buffers[statement]
+                    buffer.extend(rows)
+                    while len(buffer) >= batch_size:
+                        submit(statement_partition(statement), statement, buffer[:batch_size])
+                        del buffer[:batch_size]
+                if not errors:
+                    for statement, rows in buffers.items():
+                        if rows:
+                            submit(statement_partition(statement), statement, rows)
+            finally:
+                for lane in lanes:
+                    lane.put(None)
+        elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+
+        stats = {"seconds": elapsed}
+        for kind in ("nodes", "relationships"):
+            stats[kind] = {
+                "partitions": sum(1 for partition in lane_of if partition[0] == kind),
+                "rows": sum(c[kind]["rows"] for c in counts),
+                "batches": sum(c[kind]["batches"] for c in counts),
+                "retries": sum(c[kind]["retries"] for c in counts),
+            }
+            print(f"✓ {kind}: {stats[kind]['rows']} rows in {stats[kind]['batches']} transactions "
+                  f"across {stats[kind]['partitions']} partitions ({stats[kind]['retries']} retries)")
+
+        total_rows = stats["nodes"]["rows"] + stats["relationships"]["rows"]
+        rate = total_rows / elapsed if elapsed else 0.0
+        print(f"✓ Bulk load: {total_rows} rows, {elapsed:.2f}s ({rate:.0f} rows/s)")
+        return stats
+
     def verify_labels(self):
         """Verify that labels are properly imported"""
         with self.driver.session() as session:
@@ -111,7 +291,56 @@ class Neo4jImporter:
                 print(f"  {record['PatientLabel']} - Age: {record['Age']}, Sex: {record['Sex']}")
 
 
+def bulk_main(args):
+    """Load the ETL's UNWIND batches instead of importing Turtle through n10s"""
+    if args.run_etl:
+        import lung_cancer_etl_engine as etl
+        writer = etl.make_writer(cypher_format="unwind", batch_size=args.batch_size)
+        etl.run_etl(etl.load_mapping(), writer=writer)
+        writer.close()
+
+    if not args.batches.exists():
+        print(f"ERROR: UNWIND batches not found: {args.batches}")
+        print("  Run: python lung_cancer_etl_engine.py --cypher-format unwind (or pass --run-etl)")
+        return
+
+    importer = Neo4jImporter(args.uri, args.user, args.password, database=args.database)
+    try:
+        schema_file = args.batches.with_name(UNWIND_SCHEMA.name)
+        if schema_file.exists():
+            importer.create_constraints(schema_file)
+        importer.bulk_load(read_unwind_batches(args.batches),
+                           batch_size=args.batch_size, workers=args.workers)
+        print("\n✓ Bulk import completed successfully!")
+    except Exception as e:
+        print(f"\n✗ Error during bulk import: {e}")
+    finally:
+        importer.close()
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Import the lung cancer knowledge graph into Neo4j")
+    parser.add_argument("--uri", default=NEO4J_URI)
+    parser.add_argument("--user", default=NEO4J_USER)
+    parser.add_argument("--password", default=NEO4J_PASSWORD)
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--bulk", action="store_true",
+                        help="load the ETL's UNWIND batches over bolt instead of n10s Turtle import")
+    parser.add_argument("--batches", type=Path, default=UNWIND_BATCHES,
+                        help="unwind_batches.jsonl written by the ETL")
+    parser.add_argument("--run-etl", action="store_true",
+                        help="regenerate the UNWIND batches before loading")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per write transaction")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BULK_WORKERS,
+                        help="concurrent sessions (one label partition each)")
+    args = parser.parse_args()
+
+    if args.bulk:
+        print("=== Neo4j Bulk UNWIND Import ===\n")
+        bulk_main(args)
+        return
+
     print("=== Neo4j Knowledge Graph Import ===\n")
     
     # File paths
@@ -128,7 +357,7 @@ def main():
         return
     
     # Import into Neo4j
-    importer = Neo4jImporter(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    importer = Neo4jImporter(args.uri, args.user, args.password)
     
     try:
         # Initialize n10s
@@ -0,0 +1,379 @@
+"""
+Ontology-Driven Inference Materializer for Neo4j
+
+`4. inferencing_on_the_fly/reasoning.md` derives labels such as
+:CancerPatient from hand-built _Category/_Relationship metadata. This
+module reads the same kind of knowledge from lung_cancer_kg_schema.ttl and
+writes the entailed labels and relationships into Neo4j:
+
+- inverse:  (a)-[:R]->(b) with R owl:inverseOf S     =>  (b)-[:S]->(a)
+- domain:   (a)-[:R]->() or a.p set, R/p rdfs:domain D  =>  a:D
+- range:    ()-[:R]->(b), R rdfs:range C             =>  b:C
+- subclass: n:C, C rdfs:subClassOf+ A                =>  n:A
+
+Domains and ranges come lifted through the class hierarchy (see
+shacl_inference.RdfsClosure), so one ordered sweep (inverse, domain,
+range, subclass) reaches the fixpoint of these rules.
+
+Each pass streams its matches once and applies them in batches of
+--batch-size rows, each batch in its own transaction (CALL { ... } IN
+TRANSACTIONS, or apoc.periodic.iterate with --apoc). Passes only match
+work that is still missing (WHERE NOT n:A, NOT EXISTS { (b)-[:S]->(a) }) and
+write with SET / MERGE, so a rerun is idempotent and an interrupted run
+resumes where it stopped.
+
+Incremental mode: the ETL's loaders (UNWIND batches, delta.cypher) mark
+every node they write, and both ends of every relationship, with the
+:_Uninferred label. --incremental only matches marked nodes, through the
+label scan, and a completed run removes the marks. Relationships created
+by the inverse pass mark their start node so its domain is applied in the
+same run, and carry `_inferred` = the run number. The run counter, and the
+ontology hash, rules and mapping of the last completed run, live on an
+(:_InferenceState) node. If any of those change, or an interrupted full
+run is being resumed, the run is full. Deletions are not tracked.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from rdflib import Graph, URIRef
+from rdflib.namespace import OWL, RDFS, XSD
+
+from etl_writers import UNINFERRED_LABEL, cypher_name
+from graph_snapshot import file_hash
+from shacl_cypher import (EtlMapping, MAPPINGS, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER,
+                          is_relationship, make_mapping)
+from shacl_inference import load_closure
+
+SCRIPT_DIR = Path(__file__).parent
+ONTOLOGY_FILE = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_kg_schema.ttl"
+PASSES_FILE = SCRIPT_DIR / "ouput" / "inference_passes.cypher"
+
+DEFAULT_BATCH_SIZE = 1000
+
+RULES = ("inverse", "domain", "range", "subclass")
+
+# Run bookkeeping
+STATE_LABEL = "_InferenceState"
+STATE_NAME = "lung_cancer_kg"
+STAMP = "_inferred"  # run number on relationships created by the inverse pass
+
+# Classes every resource belongs to; never materialized as labels
+TOP_CLASSES = {OWL.Thing, RDFS.Resource, RDFS.Class, OWL.Class, RDFS.Literal}
+
+
+def is_label_class(cls_):
+    return isinstance(cls_, URIRef) and cls_ not in TOP_CLASSES and not str(cls_).startswith(str(XSD))
+
+
+class InferencePass:
+    """
+    One rule instance: a match producing `columns` and a write applied per row.
+
+    match must only produce rows whose write is still missing, so rerunning
+    a pass (or the rest of an interrupted one) does no duplicate work.
+    """
+
+    def __init__(self, rule, description, match, columns, write):
+        self.rule = rule
+        self.description = description
+        self.match = match
+        self.columns = columns
+        self.write = write
+
+    def statement(self, apoc=False):
+        """Batched statement; parameters $batchSize and $run"""
+        if apoc:
+            outer = f"{self.match} RETURN DISTINCT {self.columns}"
+            return (f"CALL apoc.periodic.iterate({_quote(outer)}, {_quote(self.write)}, "
+                    f"{{batchSize: $batchSize, parallel: false, params: {{run: $run}}}})\n"
+                    f"YIELD total, failedBatches, errorMessages\n"
+                    f"RETURN total AS updated, failedBatches, errorMessages")
+        return (f"{self.match}\n"
+                f"WITH DISTINCT {self.columns}\n"
+                f"CALL {{ WITH {self.columns} {self.write} }} IN TRANSACTIONS OF $batchSize ROWS\n"
+                f"RETURN count(*) AS updated")
+
+
+def _quote(cypher):
+    return "'" + cypher.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+########################################
+# Compiling the ontology into passes
+########################################
+
+def inverse_pairs(ontology_graph):
+    """(R, S) for every owl:inverseOf axiom, in both directions"""
+    pairs = set()
+    for p, q in ontology_graph.subject_objects(OWL.inverseOf):
+        if isinstance(p, URIRef) and isinstance(q, URIRef):
+            pairs.add((p, q))
+            pairs.add((q, p))
+    return sorted(pairs)
+
+
+def compile_passes(ontology_graph, closure, mapping=None, rules=RULES, incremental=False):
+    """
+    Ordered InferencePasses for the selected rules.
+
+    With incremental=True every pattern is anchored on a :_Uninferred node
+    (the rule's subject: the node gaining a label, or the start node of an
+    inverse), so passes read the marked nodes instead of scanning the graph.
+    """
+    mapping = mapping or EtlMapping()
+    stamp = cypher_name(STAMP)
+    marker = f":{cypher_name(UNINFERRED_LABEL)}" if incremental else ""
+    base = f":{cypher_name(mapping.base_label)}" if mapping.base_label else ""
+
+    def labels(classes):
+        return sorted({mapping.label(cls_) for cls_ in classes if is_label_class(cls_)})
+
+    def add_labels(label_list):
+        return "SET n" + "".join(f":{cypher_name(label)}" for label in label_list)
+
+    def missing(label_list):
+        return "NOT (" + " AND ".join(f"n:{cypher_name(label)}" for label in label_list) + ")"
+
+    passes = []
+
+    if "inverse" in rules:
+        for p, q in inverse_pairs(ontology_graph):
+            rel, inverse = cypher_name(mapping.relationship(p)), cypher_name(mapping.relationship(q))
+            passes.append(InferencePass(
+                "inverse", f"{mapping.relationship(p)} => inverse {mapping.relationship(q)}",
+                f"MATCH (a{marker})-[r:{rel}]->(b) WHERE NOT EXISTS {{ (b)-[:{inverse}]->(a) }}",
+                "a, b",
+                f"MERGE (b)-[s:{inverse}]->(a) ON CREATE SET s.{stamp} = $run, b:{cypher_name(UNINFERRED_LABEL)}"))
+
+    for rule, lifted in (("domain", closure.domains), ("range", closure.ranges)):
+        if rule not in rules:
+            continue
+        for prop in sorted(lifted):
+            label_list = labels(lifted[prop])
+            if not label_list:
+                continue
+            if is_relationship(prop, ontology_graph, None, None):
+                name = mapping.relationship(prop)
+                pattern = f"(n{marker}{base})-[r:{cypher_name(name)}]->()" if rule == "domain" \
+                    else f"()-[r:{cypher_name(name)}]->(n{marker}{base})"
+                match = f"MATCH {pattern} WHERE {missing(label_list)}"
+            elif rule == "domain":
+                name = mapping.property(prop)
+                match = f"MATCH (n{marker}{base}) WHERE n.{cypher_name(name)} IS NOT NULL AND {missing(label_list)}"
+            else:
+                continue  # range of a datatype property: a literal type
+            passes.append(InferencePass(rule, f"{rule} of {name} => {':'.join(label_list)}",
+                                        match, "n", add_labels(label_list)))
+
+    if "subclass" in rules:
+        for cls_ in sorted(closure.ancestors):
+            if not is_label_class(cls_):
+                continue
+            label_list = [label for label in labels(closure.ancestors[cls_]) if label != mapping.label(cls_)]
+            if not label_list:
+                continue
+            passes.append(InferencePass(
+                "subclass", f"{mapping.label(cls_)} => {':'.join(label_list)}",
+                f"MATCH (n{marker}:{cypher_name(mapping.label(cls_))}) WHERE {missing(label_list)}",
+                "n", add_labels(label_list)))
+    return passes
+
+
+def unmark_passes():
+    """Remove the :_Uninferred marks once every rule has run"""
+    marker = cypher_name(UNINFERRED_LABEL)
+    return [InferencePass("unmark", "nodes", f"MATCH (n:{marker})", "n", f"REMOVE n:{marker}")]
+
+
+def write_passes(passes, output=PASSES_FILE, batch_size=DEFAULT_BATCH_SIZE, apoc=False):
+    """Write the passes as a cypher-shell script (full mode, without run bookkeeping)"""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(f"// Inference passes compiled from {ONTOLOGY_FILE.name}\n")
+        f.write(f":param {{batchSize: {batch_size}, run: null}};\n\n")
+        for inference_pass in passes:
+            f.write(f"// [{inference_pass.rule}] {inference_pass.description}\n")
+            if not apoc:
+                f.write(":auto ")
+            f.write(inference_pass.statement(apoc) + ";\n\n")
+
+
+########################################
+# Running the passes
+########################################
+
+class Neo4jMaterializer:
+    def __init__(self, uri, user, password, driver=None, database=None):
+        """
+        Args:
+            driver: Pre-built driver (e.g. a fake one in tests); uri/user/password are then ignored
+            database: Target database (server default if None)
+        """
+        if driver is None:
+            from neo4j import GraphDatabase
+            driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driver
+        self.database = database
+
+    def close(self):
+        self.driver.close()
+
+    def begin_run(self, settings, incremental):
+        """
+        Start (or resume) a run on the state node.
+
+        Args:
+            settings: run_settings() of this run
+
+        Returns:
+            (run number, incremental) where incremental is False when there
+            is no completed run with the same settings, or an interrupted
+            full run is being resumed
+        """
+        with self.driver.session(database=self.database) as session:
+            state = session.run(
+                f"MERGE (s:{cypher_name(STATE_LABEL)} {{name: $name}}) "
+                f"RETURN coalesce(s.run, 0) AS run, coalesce(s.completed, 0) AS completed, "
+                f"s.ontology AS ontology, s.rules AS rules, s.mapping AS mapping, "
+                f"coalesce(s.full, false) AS full",
+                name=STATE_NAME).single()
+            interrupted = state["run"] > state["completed"]
+            if incremental:
+                reason = None
+                if not state["completed"]:
+                    reason = "No completed run"
+                elif any(state[key] != value for key, value in settings.items()):
+                    changed = ", ".join(key for key, value in settings.items() if state[key] != value)
+                    reason = f"Changed since the last completed run: {changed}"
+                elif interrupted and state["full"]:
+                    reason = "Resuming an interrupted full run"
+                if reason:
+                    print(f"⚠ {reason}, running a full materialization")
+                    incremental = False
+            # An interrupted run is resumed under its own number
+            run = state["run"] if interrupted else state["run"] + 1
+            session.run(f"MATCH (s:{cypher_name(STATE_LABEL)} {{name: $name}}) "
+                        f"SET s.run = $run, s.full = $full",
+                        name=STATE_NAME, run=run, full=not incremental).consume()
+        return run, incremental
+
+    def finish_run(self, run, settings):
+        with self.driver.session(database=self.database) as session:
+            session.run(f"MATCH (s:{cypher_name(STATE_LABEL)} {{name: $name}}) "
+                        f"SET s.completed = $run, s += $settings, s.finishedAt = datetime()",
+                        name=STATE_NAME, run=run, settings=settings).consume()
+
+    def run_pass(self, inference_pass, run, batch_size=DEFAULT_BATCH_SIZE, apoc=False):
+        """
+        Run one pass in an auto-commit session (required by IN TRANSACTIONS).
+
+        Returns:
+            Rows updated
+        """
+        with self.driver.session(database=self.database) as session:
+            record = session.run(inference_pass.statement(apoc), batchSize=batch_size, run=run).single()
+        if record is None:
+            return 0
+        if apoc and record["failedBatches"]:
+            raise RuntimeError(f"{inference_pass.description}: {record['errorMessages']}")
+        return record["updated"]
+
+    def materialize(self, passes, run, batch_size=DEFAULT_BATCH_SIZE, apoc=False):
+        """
+        Returns:
+            [(pass, rows updated, seconds)]
+        """
+        stats = []
+        for inference_pass in passes:
+            start = time.perf_counter()
+            updated = self.run_pass(inference_pass, run, batch_size, apoc)
+            stats.append((inference_pass, updated, time.perf_counter() - start))
+            if updated:
+                print(f"  ✓ [{inference_pass.rule}] {inference_pass.description}: {updated}")
+        return stats
+
+
+def run_settings(ontology_sha256, rules, mapping_name, n10s_prefix):
+    """What a completed run is recorded under; incremental runs need the same settings"""
+    return {"ontology": ontology_sha256, "rules": sorted(rules),
+            "mapping": f"n10s:{n10s_prefix}" if mapping_name == "n10s" else mapping_name}
+
+
+def print_stats(stats):
+    by_rule = {}
+    for inference_pass, updated, seconds in stats:
+        rows, total = by_rule.get(inference_pass.rule, (0, 0.0))
+        by_rule[inference_pass.rule] = (rows + updated, total + seconds)
+    print(f"\n📊 Materialized:")
+    for rule, (rows, seconds) in by_rule.items():
+        print(f"  {rows:>8}  {rule:<9} ({seconds:.3f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize ontology entailments (labels, inverse relationships) in Neo4j")
+    parser.add_argument("--uri", default=NEO4J_URI)
+    parser.add_argument("--user", default=NEO4J_USER)
+    parser.add_argument("--password", default=NEO4J_PASSWORD)
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--ontology", type=Path, default=ONTOLOGY_FILE)
+    parser.add_argument("--mapping", choices=MAPPINGS, default="etl",
+                        help="etl: layout written by the ETL's UNWIND/admin-import writers; n10s: neosemantics import")
+    parser.add_argument("--n10s-prefix", default="ns0",
+                        help="namespace prefix n10s assigned to the ontology namespace")
+    parser.add_argument("--rules", nargs="+", choices=RULES, default=list(RULES),
+                        help="rules to materialize (default: all)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="rows per write transaction")
+    parser.add_argument("--apoc", action="store_true",
+                        help="batch with apoc.periodic.iterate instead of CALL { } IN TRANSACTIONS")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process nodes marked :_Uninferred by loads since the last completed run")
+    parser.add_argument("--output", type=Path, default=PASSES_FILE,
+                        help="where to write the compiled passes")
+    parser.add_argument("--compile-only", action="store_true",
+                        help="write the passes without connecting to Neo4j")
+    args = parser.parse_args()
+
+    print("=== Neo4j Ontology Inference ===\n")
+    if not args.ontology.exists():
+        print(f"❌ Error: Ontology file not found: {args.ontology}")
+        sys.exit(1)
+
+    ontology_graph = Graph()
+    ontology_graph.parse(args.ontology)
+    closure, from_cache = load_closure(args.ontology, ontology_graph)
+    mapping = make_mapping(args.mapping, args.n10s_prefix)
+    print(f"  ✓ RDFS closure: {len(closure.ancestors)} classes in subClassOf chains, {len(closure.domains)} properties "
+          f"with domains, {len(inverse_pairs(ontology_graph)) // 2} inverse pairs "
+          f"({'cached' if from_cache else 'computed, cached'})")
+
+    write_passes(compile_passes(ontology_graph, closure, mapping, args.rules), args.output,
+                 args.batch_size, args.apoc)
+    print(f"💾 Inference passes saved to: {args.output}")
+    if args.compile_only:
+        return
+
+    settings = run_settings(file_hash(args.ontology), args.rules, args.mapping, args.n10s_prefix)
+    materializer = Neo4jMaterializer(args.uri, args.user, args.password, database=args.database)
+    try:
+        start = time.perf_counter()
+        run, incremental = materializer.begin_run(settings, args.incremental)
+        passes = compile_passes(ontology_graph, closure, mapping, args.rules, incremental)
+        print(f"\n{'Incremental' if incremental else 'Full'} run {run}: {len(passes)} passes")
+        stats = materializer.materialize(passes + unmark_passes(), run, args.batch_size, args.apoc)
+        materializer.finish_run(run, settings)
+        print_stats(stats)
+        print(f"\n⏱ Completed in {time.perf_counter() - start:.3f}s")
+    except Exception as e:
+        print(f"\n✗ Error during inference (rerun to resume): {e}")
+        sys.exit(1)
+    finally:
+        materializer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,107 @@ Extracts entities from biomedical text and links to ontology concepts
 """
 
 import re
-from typing import List, Dict, Tuple, Optional
+import json
+import hashlib
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Tuple, Optional
 from rdflib import Graph, Namespace, URIRef, Literal
 from rdflib.namespace import RDF, RDFS
 
+STAGE_PATTERN = re.compile(r'stage\s+([I1234]{1,3}[AB]?)', re.IGNORECASE)
+
+# Texts sent to a worker process per task by EntityExtractor.extract_many
+DEFAULT_EXTRACT_BATCH_SIZE = 64
+
+# Bump when extraction logic outside the patterns (e.g. canonicalization)
+# changes, so cached results from older code are discarded
+EXTRACTOR_VERSION = 1
+
+
+class ExtractionCache:
+    """
+    On-disk SQLite cache of entity extraction results.
+    
+    Entries are keyed by a SHA-256 of the text and the extractor version
+    (a hash of the concept patterns), so unchanged articles skip extraction
+    across runs and editing a pattern invalidates every stale entry.
+    """
+    
+    # Keys per SELECT ... IN (...) query, below SQLite's parameter limit
+    LOOKUP_BATCH = 500
+    
+    def __init__(self, path):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entities (
+                version   TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                result    TEXT NOT NULL,
+                PRIMARY KEY (version, text_hash)
+            )
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def purge_stale(self, version: str):
+        """Drop entries written by other extractor versions"""
+        self.conn.execute("DELETE FROM entities WHERE version != ?", (version,))
+        self.conn.commit()
+    
+    def get_many(self, version: str, keys: List[str]) -> Dict[str, Dict[str, List[Tuple[str, str]]]]:
+        """Cached results for the given text keys (missing keys are omitted)"""
+        found = {}
+        for i in range(0, len(keys), self.LOOKUP_BATCH):
+            batch = keys[i:i + self.LOOKUP_BATCH]
+            rows = self.conn.execute(
+                f"SELECT text_hash, result FROM entities WHERE version = ? "
+                f"AND text_hash IN ({','.join('?' * len(batch))})",
+                (version, *batch),
+            )
+            for key, result in rows:
+                found[key] = {
+                    concept_type: [tuple(entity) for entity in entity_list]
+                    for concept_type, entity_list in json.loads(result).items()
+                }
+        return found
+    
+    def put_many(self, version: str, items: List[Tuple[str, Dict]]):
+        """Store (text_key, result) pairs"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO entities (version, text_hash, result) VALUES (?, ?, ?)",
+            [(version, key, json.dumps(result)) for key, result in items],
+        )
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+
 
 class EntityExtractor:
     """Extract medical entities from text using pattern matching and NLP"""
     
-    def __init__(self, ontology_graph: Graph, ont_namespace: Namespace, res_namespace: Namespace):
+    def __init__(self, ontology_graph: Graph, ont_namespace: Namespace, res_namespace: Namespace,
+                 cache: Optional[ExtractionCache] = None):
         self.g = ontology_graph
         self.ONT = ont_namespace
         self.RES = res_namespace
         self.concept_patterns = self._build_concept_patterns()
+        self._matcher, self._group_types = self._compile_matcher(self.concept_patterns)
+        self._pool = None
+        self._pool_workers = 0
+        self.cache = cache
+        if cache is not None:
+            cache.purge_stale(self.version)
     
     def _build_concept_patterns(self) -> Dict[str, List[str]]:
         """Build regex patterns for ontology concepts"""
@@ -55,14 +143,186 @@ class EntityExtractor:
             ]
         }
     
+    @property
+    def version(self) -> str:
+        """Hash identifying this extractor's patterns and extraction logic"""
+        payload = json.dumps([EXTRACTOR_VERSION, self.concept_patterns], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    
+    @staticmethod
+    def _lowercase_pattern(pattern: str) -> str:
+        """Lowercase a regex's literals, leaving escapes such as \\b or \\S intact"""
+        return re.sub(r'\\.|[^\\]+', lambda m: m.group(0) if m.group(0).startswith('\\') else m.group(0).lower(), pattern)
+    
+    def _compile_matcher(self, concept_patterns: Dict[str, List[str]]):
+        """
+        Compile every concept pattern into one single-pass regex.
+        
+        Each pattern becomes a named lookahead group, so one scan reports
+        every pattern matching at a position - including overlapping matches
+        of different concept types, as the per-type scans did. The input is
+        lowercased, so the patterns are lowercased and matched
+        case-sensitively, which is much cheaper than re.IGNORECASE.
+        
+        Returns:
+            (compiled regex, dict mapping group name to concept type)
+        """
+        group_types = {}
+        alternatives = []
+        for concept_type, patterns in concept_patterns.items():
+            for pattern in patterns:
+                name = f"g{len(group_types)}"
+                group_types[name] = concept_type
+                alternatives.append((name, self._lowercase_pattern(pattern)))
+        
+        # Cheap gate: some pattern must match here before the groups are tried
+        any_match = "|".join(f"(?:{pattern})" for _, pattern in alternatives)
+        captures = "".join(f"(?:(?=(?P<{name}>{pattern}))|)" for name, pattern in alternatives)
+        return re.compile(f"(?=(?:{any_match})){captures}"), group_types
+    
     def extract_entities(self, text: str) -> Dict[str, List[Tuple[str, str]]]:
         """
         Extract entities from text using pattern matching
         
+        Single pass over the text with the compiled matcher. Per pattern,
+        matches are leftmost and non-overlapping, exactly like one
+        re.finditer per pattern (see extract_entities_multipass).
+        
         Returns:
             Dict mapping concept type to list of (entity_text, canonical_name) tuples
         """
         text_lower = text.lower()
+        group_types = self._group_types
+        found = {}
+        # End of the last accepted match per pattern group
+        last_end = {}
+        
+        for match in self._matcher.finditer(text_lower):
+            start = match.start()
+            for name, entity_text in match.groupdict().items():
+                if entity_text is None or start < last_end.get(name, 0):
+                    continue
+                last_end[name] = match.end(name)
+                concept_type = group_types[name]
+                # Canonicalize the entity name
+                canonical = self._canonicalize_entity(entity_text, concept_type)
+                if canonical:
+                    found.setdefault(concept_type, set()).add((entity_text, canonical))
+        
+        # Remove duplicates, keeping concept types in pattern order; sorted so
+        # results do not depend on the process's string hash seed
+        return {
+            concept_type: sorted(found[concept_type])
+            for concept_type in self.concept_patterns
+            if concept_type in found
+        }
+    
+    def extract_many(self, texts: Iterable[str], workers: int = 1,
+                     batch_size: int = DEFAULT_EXTRACT_BATCH_SIZE) -> Iterator[Dict[str, List[Tuple[str, str]]]]:
+        """
+        Extract entities from many texts, optionally in a process pool.
+        
+        Regex matching is CPU-bound and holds the GIL, so workers > 1 uses
+        processes. Texts are sent in batches with at most 2 * workers batches
+        in flight, and results are yielded lazily in input order. The pool is
+        kept for later calls until close() is called.
+        
+        If the extractor has a cache, texts already extracted by this
+        extractor version are served from it and only misses are extracted.
+        
+        Yields:
+            One extract_entities() result per input text
+        """
+        if self.cache is not None:
+            yield from self._extract_many_cached(texts, workers, batch_size)
+            return
+        
+        yield from self._extract_many_uncached(texts, workers, batch_size)
+    
+    def _extract_many_cached(self, texts, workers, batch_size):
+        """Look texts up in the cache block by block, extracting only the misses"""
+        cache = self.cache
+        version = self.version
+        texts = iter(texts)
+        block_size = batch_size * max(workers, 1) * 2
+        
+        while True:
+            block = list(islice(texts, block_size))
+            if not block:
+                return
+            keys = [cache.text_key(text) for text in block]
+            results = cache.get_many(version, keys)
+            
+            missing = [(key, text) for key, text in zip(keys, block) if key not in results]
+            cache.hits += len(block) - len(missing)
+            cache.misses += len(missing)
+            if missing:
+                extracted = list(self._extract_many_uncached(
+                    (text for _, text in missing), workers, batch_size))
+                new_items = [(key, result) for (key, _), result in zip(missing, extracted)]
+                cache.put_many(version, new_items)
+                results.update(new_items)
+            
+            for key in keys:
+                yield results[key]
+    
+    def _extract_many_uncached(self, texts, workers, batch_size):
+        if workers <= 1:
+            for text in texts:
+                yield self.extract_entities(text)
+            return
+        
+        pool = self._get_pool(workers)
+        texts = iter(texts)
+        pending = deque()
+        
+        while True:
+            batch = list(islice(texts, batch_size))
+            if batch:
+                pending.append(pool.submit(_extract_batch, batch))
+            if pending and (not batch or len(pending) >= 2 * workers):
+                yield from pending.popleft().result()
+            elif not batch:
+                return
+    
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        """Process pool whose workers hold a copy of this extractor's patterns"""
+        if self._pool is None or self._pool_workers != workers:
+            self._shutdown_pool()
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_extract_worker,
+                initargs=(self.concept_patterns,),
+            )
+            self._pool_workers = workers
+        return self._pool
+    
+    def _shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
+    
+    def close(self):
+        """Shut down the extract_many process pool and close the cache"""
+        self._shutdown_pool()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def extract_entities_multipass(self, text: str) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Reference implementation: one re.finditer scan per concept pattern.
+        
+        Kept for parity checks and benchmarks against extract_entities.
+        """
+        text_lower = text.lower()
         entities = {}
         
         for concept_type, patterns in self.concept_patterns.items():
@@ -95,7 +355,7 @@ class EntityExtractor:
         
         # Stage normalization
         if concept_type == 'Stage':
-            stage_match = re.search(r'stage\s+([I1234]{1,3}[AB]?)', entity_text, re.IGNORECASE)
+            stage_match = STAGE_PATTERN.search(entity_text)
             if stage_match:
                 return stage_match.group(1).upper()
         
@@ -149,6 +409,22 @@ class EntityExtractor:
         return scores
 
 
+# Per-process extractor used by EntityExtractor.extract_many workers
+_worker_extractor = None
+
+
+def _init_extract_worker(concept_patterns: Dict[str, List[str]]):
+    global _worker_extractor
+    _worker_extractor = EntityExtractor(None, None, None)
+    _worker_extractor.concept_patterns = concept_patterns
+    _worker_extractor._matcher, _worker_extractor._group_types = \
+        _worker_extractor._compile_matcher(concept_patterns)
+
+
+def _extract_batch(texts: List[str]) -> List[Dict[str, List[Tuple[str, str]]]]:
+    return [_worker_extractor.extract_entities(text) for text in texts]
+
+
 class GCPNLPIntegration:
     """
     Optional GCP NLP API integration
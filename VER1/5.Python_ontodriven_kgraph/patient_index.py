@@ -0,0 +1,301 @@
+"""
+Patient-Centric In-Memory Index
+
+Every query in run_sparql_queries.py is a star around `?patient a :Patient`
+with one or two hops over :hasStage, :testedForBiomarker,
+:receivedTherapy/:usesDrug, :hasOutcome and :hasHistology. PatientIndex
+precomputes exactly that shape once at load time:
+
+- every RDF term is interned to an integer id
+- each predicate is a CSR adjacency (offsets/targets numpy arrays over term ids)
+- age, sex and smokingPackYears are columns aligned with the patient array
+
+answer() evaluates Q1-Q9 directly on those arrays and returns the same rows
+(rdflib terms, same bag semantics, same ORDER BY) as the SPARQL text, or
+None when the graph has a shape the fast path does not cover (e.g. a
+patient with two ages), in which case callers fall back to SPARQL.
+validate() checks a fast path against the SPARQL result.
+"""
+
+from collections import Counter
+from itertools import product
+
+import numpy as np
+from rdflib import Literal, Namespace
+from rdflib.namespace import RDF, RDFS
+
+ONT = Namespace("http://lungkg.org/ontology#")
+
+# Predicates indexed as adjacency lists
+INDEXED_PREDICATES = {
+    "label": RDFS.label,
+    "name": ONT.name,
+    "age": ONT.age,
+    "sex": ONT.sex,
+    "smokingPackYears": ONT.smokingPackYears,
+    "hasStage": ONT.hasStage,
+    "hasHistology": ONT.hasHistology,
+    "testedForBiomarker": ONT.testedForBiomarker,
+    "receivedTherapy": ONT.receivedTherapy,
+    "usesDrug": ONT.usesDrug,
+    "hasOutcome": ONT.hasOutcome,
+}
+
+# Per-patient columns (single-valued in the ETL output)
+COLUMNS = ("age", "sex", "smokingPackYears")
+
+
+class Adjacency:
+    """CSR adjacency: neighbours of term id i are targets[offsets[i]:offsets[i + 1]]"""
+
+    def __init__(self, subjects, objects, n_terms):
+        subjects = np.asarray(subjects, dtype=np.int64)
+        objects = np.asarray(objects, dtype=np.int64)
+        order = np.argsort(subjects, kind="stable")
+        self.targets = objects[order]
+        self.offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(subjects, minlength=n_terms), out=self.offsets[1:])
+
+    def __call__(self, term_id):
+        return self.targets[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def degree(self, term_ids):
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        return self.offsets[term_ids + 1] - self.offsets[term_ids]
+
+
+class PatientIndex:
+    """Integer-interned, array-backed view of the patient star"""
+
+    def __init__(self, terms, adjacency, patients):
+        self.terms = terms
+        self.ids = {term: i for i, term in enumerate(terms)}
+        self.adjacency = adjacency
+        self.patients = patients
+
+        # Columns: literal term id (-1 if missing) plus numeric values (NaN if missing)
+        self.columnar = True
+        self.columns = {}
+        self.numeric = {}
+        for name in COLUMNS:
+            degree = adjacency[name].degree(patients)
+            if (degree > 1).any():
+                self.columnar = False
+            ids = np.full(len(patients), -1, dtype=np.int64)
+            has_value = degree > 0
+            ids[has_value] = adjacency[name].targets[adjacency[name].offsets[patients[has_value]]]
+            self.columns[name] = ids
+            self.numeric[name] = np.array(
+                [_number(terms[i]) if i >= 0 else np.nan for i in ids], dtype=np.float64)
+
+    @classmethod
+    def build(cls, g):
+        """Intern the graph's terms and index the patient-centric predicates"""
+        terms = []
+        ids = {}
+
+        def intern(term):
+            term_id = ids.get(term)
+            if term_id is None:
+                term_id = ids[term] = len(terms)
+                terms.append(term)
+            return term_id
+
+        edges = {name: ([], []) for name in INDEXED_PREDICATES}
+        for name, predicate in INDEXED_PREDICATES.items():
+            subjects, objects = edges[name]
+            for s, o in g.subject_objects(predicate):
+                subjects.append(intern(s))
+                objects.append(intern(o))
+
+        patients = sorted({intern(s) for s in g.subjects(RDF.type, ONT.Patient)})
+        adjacency = {name: Adjacency(s, o, len(terms)) for name, (s, o) in edges.items()}
+        return cls(terms, adjacency, np.asarray(patients, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.patients)
+
+    ########################################
+    # Helpers
+    ########################################
+
+    def values(self, name, term_id):
+        return self.adjacency[name](term_id)
+
+    def term(self, term_id):
+        return self.terms[term_id]
+
+    def _row_values(self, patient_row, name):
+        """Column value as a 1-tuple (or empty when missing) so it joins like a pattern"""
+        term_id = self.columns[name][patient_row]
+        return () if term_id < 0 else (term_id,)
+
+    def _stage_matches(self, stage_name):
+        """Per patient, how many (stage, name) pairs match stage_name (the join multiplicity)"""
+        stage_name_id = self.ids.get(Literal(stage_name))
+        if stage_name_id is None:
+            return np.zeros(len(self.patients), dtype=np.int64)
+        return np.array([
+            sum(int(np.count_nonzero(self.values("name", stage) == stage_name_id))
+                for stage in self.values("hasStage", p))
+            for p in self.patients
+        ], dtype=np.int64)
+
+    def _therapy_drug_labels(self, patient):
+        for therapy in self.values("receivedTherapy", patient):
+            for drug in self.values("usesDrug", therapy):
+                yield from self.values("label", drug)
+
+    def _grouped_counts(self, hop, attribute):
+        """COUNT(?patient) grouped by the attribute of the node reached through hop"""
+        counts = Counter()
+        for p in self.patients:
+            for node in self.values(hop, p):
+                for value in self.values(attribute, node):
+                    counts[value] += 1
+        return [(self.term(value), Literal(count)) for value, count in counts.items()]
+
+    ########################################
+    # Q1-Q9
+    ########################################
+
+    def q1(self, parameters):
+        return [(self.term(label), self.term(age), self.term(sex))
+                for row, p in enumerate(self.patients)
+                for label, age, sex in product(self.values("label", p), self._row_values(row, "age"),
+                                               self._row_values(row, "sex"))]
+
+    def q2(self, parameters):
+        matches = self._stage_matches(parameters["targetStage"])
+        rows = []
+        for row in np.flatnonzero((matches > 0) & (self.columns["age"] >= 0)):
+            age = self.term(self.columns["age"][row])
+            for label in self.values("label", self.patients[row]):
+                rows.extend([(self.term(label), age)] * matches[row])
+        return rows
+
+    def q3(self, parameters):
+        return [(self.term(label), self.term(drug_label))
+                for p in self.patients
+                for label in self.values("label", p)
+                for drug_label in self._therapy_drug_labels(p)]
+
+    def q4(self, parameters):
+        return self._grouped_counts("testedForBiomarker", "label")
+
+    def q5(self, parameters):
+        rows = []
+        for p in self.patients:
+            outcome_labels = [label for outcome in self.values("hasOutcome", p)
+                              for label in self.values("label", outcome)]
+            for label, drug_label, outcome_label in product(self.values("label", p),
+                                                            self._therapy_drug_labels(p),
+                                                            outcome_labels):
+                rows.append((self.term(label), self.term(drug_label), self.term(outcome_label)))
+        return rows
+
+    def q6(self, parameters):
+        return self._grouped_counts("hasStage", "name")
+
+    def q7(self, parameters):
+        needle = str(parameters["targetBiomarker"])
+        rows = []
+        for row, p in enumerate(self.patients):
+            n_matches = sum(needle in str(self.term(label))
+                            for biomarker in self.values("testedForBiomarker", p)
+                            for label in self.values("label", biomarker))
+            if not n_matches:
+                continue
+            for label, age, drug_label in product(self.values("label", p), self._row_values(row, "age"),
+                                                  self._therapy_drug_labels(p)):
+                rows.extend([(self.term(label), self.term(age), self.term(drug_label))] * n_matches)
+        return rows
+
+    def q8(self, parameters):
+        matches = self._stage_matches(parameters["targetStage"])
+        with np.errstate(invalid="ignore"):
+            mask = (self.numeric["smokingPackYears"] > float(parameters["minPackYears"]))
+        mask &= (matches > 0) & (self.columns["age"] >= 0)
+        rows = []
+        for row in np.flatnonzero(mask):
+            age = self.term(self.columns["age"][row])
+            pack_years = self.term(self.columns["smokingPackYears"][row])
+            for label in self.values("label", self.patients[row]):
+                rows.extend([(self.term(label), age, pack_years)] * matches[row])
+        return rows
+
+    def q9(self, parameters):
+        return self._grouped_counts("hasHistology", "label")
+
+    def answer(self, query_id, parameters):
+        """
+        Rows for query_id ("Q1".."Q9") in ORDER BY order, or None when the
+        fast path cannot answer (unknown query or a graph shape the columns
+        do not represent).
+        """
+        fast_path = getattr(self, query_id.lower(), None)
+        if fast_path is None or query_id not in ORDER_BY or not self.columnar:
+            return None
+        key, reverse = ORDER_BY[query_id]
+        return sorted(fast_path(parameters), key=key, reverse=reverse)
+
+
+########################################
+# Ordering and validation
+########################################
+
+def _number(term):
+    value = term.toPython() if isinstance(term, Literal) else term
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _text(term):
+    return str(term)
+
+
+def _count(term):
+    return term.toPython()
+
+
+# ORDER BY of each query as (sort key on a result row, descending)
+ORDER_BY = {
+    "Q1": (lambda row: _number(row[1]), False),
+    "Q2": (lambda row: _number(row[1]), False),
+    "Q3": (lambda row: _text(row[0]), False),
+    "Q4": (lambda row: _count(row[1]), True),
+    "Q5": (lambda row: _text(row[0]), False),
+    "Q6": (lambda row: _text(row[0]), False),
+    "Q7": (lambda row: _number(row[1]), False),
+    "Q8": (lambda row: _number(row[2]), True),
+    "Q9": (lambda row: _count(row[1]), True),
+}
+
+
+def _row_key(row):
+    return tuple(term.n3() for term in row)
+
+
+def validate(query_id, fast_rows, sparql_rows):
+    """
+    Check fast-path rows against SPARQL rows.
+
+    Rows must be the same bag and come out in the same ORDER BY sequence;
+    rows with equal sort keys may be swapped, since SPARQL leaves tie order
+    unspecified.
+
+    Returns:
+        (ok, message)
+    """
+    fast_rows = [tuple(row) for row in fast_rows]
+    sparql_rows = [tuple(row) for row in sparql_rows]
+    if Counter(map(_row_key, fast_rows)) != Counter(map(_row_key, sparql_rows)):
+        return False, f"different rows ({len(fast_rows)} fast vs {len(sparql_rows)} SPARQL)"
+
+    key, _ = ORDER_BY[query_id]
+    for position, (fast, sparql) in enumerate(zip(fast_rows, sparql_rows)):
+        if key(fast) != key(sparql):
+            return False, f"different order at row {position + 1}"
+    return True, f"{len(fast_rows)} rows identical"
@@ -4,9 +4,19 @@ SPARQL Query Executor for Lung Cancer Knowledge Graph
 This script allows you to run SPARQL queries against the lung cancer RDF data.
 """
 
-from rdflib import Graph, Namespace
+from collections import OrderedDict
+from rdflib import Graph, Literal, Namespace
+from rdflib.plugins.sparql import prepareQuery
 from pathlib import Path
+import argparse
+import contextlib
+import re
 import sys
+import threading
+import time
+
+from graph_snapshot import load_graph_snapshot, sources_fingerprint
+from patient_index import PatientIndex, validate as validate_fast_path
 
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
@@ -19,224 +29,584 @@ DATA_FILE = SCRIPT_DIR / "ouput" / "lung_cancer_instances_out.ttl"
 ONT = Namespace("http://lungkg.org/ontology#")
 RES = Namespace("http://lungkg.org/resource/")
 
+# Result cache defaults
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 3600  # seconds
+
+# Prepared queries kept; bounded because sparql_server.py prepares
+# arbitrary client query texts for as long as it runs
+PREPARED_CACHE_SIZE = 512
+
+
+# Query parameters (?variable -> default), passed as initBindings and
+# overridable from the command line
+DEFAULT_PARAMETERS = {
+    "targetStage": "IV",
+    "targetBiomarker": "EGFR",
+    "minPackYears": 20,
+}
 
-def load_knowledge_graph():
-    """Load the knowledge graph from files"""
-    print("Loading knowledge graph...")
+QUERIES = {
+    "Q1: List All Patients": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?label ?age ?sex
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?label ;
+                   :age ?age ;
+                   :sex ?sex .
+        }
+        ORDER BY ?age
+    """,
     
-    g = Graph()
-    g.bind("ont", ONT)
-    g.bind("res", RES)
+    "Q2: Stage IV Patients": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?patientLabel ?age
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?patientLabel ;
+                   :age ?age ;
+                   :hasStage ?stage .
+          
+          ?stage :name ?targetStage .
+        }
+        ORDER BY ?age
+    """,
     
-    # Load ontology
-    if ONTOLOGY_FILE.exists():
-        print(f"  Loading ontology: {ONTOLOGY_FILE}")
-        g.parse(ONTOLOGY_FILE)
+    "Q3: Patients with Treatments & Drugs": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?patientLabel ?drugLabel
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?patientLabel ;
+                   :receivedTherapy ?therapy .
+          
+          ?therapy :usesDrug ?drug .
+          ?drug rdfs:label ?drugLabel .
+        }
+        ORDER BY ?patientLabel
+    """,
+    
+    "Q4: Biomarker Test Summary": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?biomarkerLabel (COUNT(?patient) AS ?patientCount)
+        WHERE {
+          ?patient a :Patient ;
+                   :testedForBiomarker ?biomarker .
+          
+          ?biomarker rdfs:label ?biomarkerLabel .
+        }
+        GROUP BY ?biomarkerLabel
+        ORDER BY DESC(?patientCount)
+    """,
+    
+    "Q5: Treatment Outcomes": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?patientLabel ?drugLabel ?outcomeLabel
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?patientLabel ;
+                   :receivedTherapy ?therapy ;
+                   :hasOutcome ?outcome .
+          
+          ?therapy :usesDrug ?drug .
+          ?drug rdfs:label ?drugLabel .
+          ?outcome rdfs:label ?outcomeLabel .
+        }
+        ORDER BY ?patientLabel
+    """,
+    
+    "Q6: Patients by Stage (Distribution)": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?stageName (COUNT(?patient) AS ?count)
+        WHERE {
+          ?patient a :Patient ;
+                   :hasStage ?stage .
+          
+          ?stage :name ?stageName .
+        }
+        GROUP BY ?stageName
+        ORDER BY ?stageName
+    """,
+    
+    "Q7: EGFR+ Patients": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?patientLabel ?age ?drugLabel
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?patientLabel ;
+                   :age ?age ;
+                   :testedForBiomarker ?biomarker ;
+                   :receivedTherapy ?therapy .
+          
+          ?biomarker rdfs:label ?biomarkerLabel .
+          FILTER(CONTAINS(?biomarkerLabel, ?targetBiomarker))
+          
+          ?therapy :usesDrug ?drug .
+          ?drug rdfs:label ?drugLabel .
+        }
+        ORDER BY ?age
+    """,
     
+    "Q8: High-Risk Patients (Stage IV + Heavy Smoking)": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?patientLabel ?age ?smokingPackYears
+        WHERE {
+          ?patient a :Patient ;
+                   rdfs:label ?patientLabel ;
+                   :age ?age ;
+                   :smokingPackYears ?smokingPackYears ;
+                   :hasStage ?stage .
+          
+          ?stage :name ?targetStage .
+          
+          FILTER(?smokingPackYears > ?minPackYears)
+        }
+        ORDER BY DESC(?smokingPackYears)
+    """,
+    
+    "Q9: Histology Distribution": """
+        PREFIX : <http://lungkg.org/ontology#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT ?histologyLabel (COUNT(?patient) AS ?patientCount)
+        WHERE {
+          ?patient a :Patient ;
+                   :hasHistology ?histology .
+          
+          ?histology rdfs:label ?histologyLabel .
+        }
+        GROUP BY ?histologyLabel
+        ORDER BY DESC(?patientCount)
+    """,
+}
+
+
+# Prepared (parsed + algebrized) queries keyed by query text, least recently used first
+_prepared_queries = OrderedDict()
+_prepared_lock = threading.Lock()
+
+
+def prepare(query_string):
+    """
+    Parse and algebrize a query once per distinct text, keeping the
+    PREPARED_CACHE_SIZE most recently used.
+
+    Returns:
+        (prepared_query, parse_seconds, cached)
+    """
+    with _prepared_lock:
+        prepared = _prepared_queries.get(query_string)
+        if prepared is not None:
+            _prepared_queries.move_to_end(query_string)
+            return prepared, 0.0, True
+
+    start = time.perf_counter()
+    prepared = prepareQuery(query_string)
+    parse_seconds = time.perf_counter() - start
+    with _prepared_lock:
+        _prepared_queries[query_string] = prepared
+        _prepared_queries.move_to_end(query_string)
+        while len(_prepared_queries) > PREPARED_CACHE_SIZE:
+            _prepared_queries.popitem(last=False)
+    return prepared, parse_seconds, False
+
+
+def query_bindings(query_string, parameters):
+    """initBindings for the parameters a query actually references"""
+    return {
+        name: Literal(value)
+        for name, value in parameters.items()
+        if re.search(rf"[?$]{name}\b", query_string)
+    }
+
+
+class QueryResultCache:
+    """
+    LRU + TTL cache of query results.
+
+    Keys are (query text, bindings, graph-version fingerprint), so a new
+    nightly load changes the fingerprint and old results are never served;
+    they simply age out of the LRU. The TTL bounds staleness for anything
+    the fingerprint cannot see.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(query_string, bindings, fingerprint):
+        return (query_string,
+                tuple(sorted((name, value.n3()) for name, value in bindings.items())),
+                fingerprint)
+
+    def get(self, key):
+        """Cached rows for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, rows = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def put(self, key, rows):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, tuple(rows))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def load_knowledge_graph(use_snapshot=True, rebuild_snapshot=False, verbose=True):
+    """
+    Load the knowledge graph from files.
+
+    By default the parsed graph is kept as a snapshot (see graph_snapshot.py)
+    and the Turtle files are only re-parsed when they change.
+
+    Args:
+        verbose: False skips the progress messages (errors are still printed)
+
+    Returns:
+        (graph, fingerprint): fingerprint identifies the loaded file versions
+    """
+    if verbose:
+        print("Loading knowledge graph...")
+
     # Load instance data
-    if DATA_FILE.exists():
-        print(f"  Loading instances: {DATA_FILE}")
-        g.parse(DATA_FILE)
-    else:
+    if not DATA_FILE.exists():
         print(f"\n❌ Error: Instance data file not found: {DATA_FILE}")
         print("\n💡 Run this first:")
         print(f"   python {SCRIPT_DIR / 'lung_cancer_etl_engine.py'}")
         sys.exit(1)
-    
-    print(f"  ✓ Loaded {len(g)} triples\n")
-    return g
+
+    # Load ontology
+    sources = [ONTOLOGY_FILE] if ONTOLOGY_FILE.exists() else []
+    sources.append(DATA_FILE)
+    if verbose:
+        for source in sources:
+            print(f"  Source: {source}")
+
+    start = time.perf_counter()
+    if use_snapshot:
+        g, fingerprint, from_snapshot = load_graph_snapshot(sources, "sparql",
+                                                            namespaces={"ont": ONT, "res": RES},
+                                                            rebuild=rebuild_snapshot)
+        how = "from snapshot" if from_snapshot else "parsed, snapshot saved"
+    else:
+        g = Graph()
+        g.bind("ont", ONT)
+        g.bind("res", RES)
+        for source in sources:
+            g.parse(source)
+        fingerprint = sources_fingerprint(sources)
+        how = "parsed"
+
+    if verbose:
+        print(f"  ✓ Loaded {len(g)} triples ({how}, {time.perf_counter() - start:.3f}s)")
+        print(f"  Graph version: {fingerprint}\n")
+    return g, fingerprint
+
+
+def query_id(query_name):
+    """Short id of a named query ("Q4: Biomarker Test Summary" -> "Q4")"""
+    return query_name.split(":")[0].strip()
 
 
-def run_query(g, query_name, query_string):
-    """Execute a SPARQL query and display results"""
+def _normalize_query(query_string):
+    return " ".join(query_string.split())
+
+
+# Fast paths are keyed by query text: a name alone (e.g. a Q4.rq file in
+# --queries-dir) does not say which query it holds
+_FAST_PATH_IDS = {_normalize_query(text): query_id(name) for name, text in QUERIES.items()}
+
+
+def fast_path_id(query_string):
+    """Patient index fast path id ("Q1".."Q9") for one of the QUERIES texts, else None"""
+    return _FAST_PATH_IDS.get(_normalize_query(query_string))
+
+
+def execute_query(g, query_name, query_string, parameters=None, cache=None, fingerprint=None, index=None):
+    """
+    Evaluate one query without printing: result cache, then the patient
+    index fast path, then prepared SPARQL.
+
+    Args:
+        parameters: {variable: value} passed as initBindings (DEFAULT_PARAMETERS if None)
+        cache: Optional QueryResultCache (needs the graph fingerprint)
+        index: Optional patient_index.PatientIndex for the Q1-Q9 fast paths,
+            used only when query_string is one of the QUERIES texts
+
+    Returns:
+        (rows, info): info has source ("cache", "fast path" or "sparql"),
+        bindings, parse_seconds, parse_cached and eval_seconds
+    """
+    parameters = DEFAULT_PARAMETERS if parameters is None else parameters
+    bindings = query_bindings(query_string, parameters)
+    info = {"source": "cache", "bindings": bindings, "parse_seconds": 0.0,
+            "parse_cached": True, "eval_seconds": 0.0}
+
+    key = cache.make_key(query_string, bindings, fingerprint) if cache is not None else None
+    rows = cache.get(key) if cache is not None else None
+    if rows is not None:
+        return list(rows), info
+
+    start = time.perf_counter()
+    fast_path = fast_path_id(query_string) if index is not None else None
+    rows = index.answer(fast_path, parameters) if fast_path else None
+    if rows is not None:
+        info["source"] = "fast path"
+    else:
+        prepared, info["parse_seconds"], info["parse_cached"] = prepare(query_string)
+        info["source"] = "sparql"
+        start = time.perf_counter()
+        rows = list(g.query(prepared, initBindings=bindings))
+    info["eval_seconds"] = time.perf_counter() - start
+
+    if cache is not None:
+        cache.put(key, rows)
+    return rows, info
+
+
+def run_query(g, query_name, query_string, parameters=None, timings=None, cache=None, fingerprint=None,
+              index=None):
+    """
+    Execute a SPARQL query and display results.
+
+    Args:
+        parameters: {variable: value} passed as initBindings (DEFAULT_PARAMETERS if None)
+        timings: Optional dict accumulating "parse" and "eval" seconds
+        cache: Optional QueryResultCache (needs the graph fingerprint)
+        index: Optional PatientIndex answering Q1-Q9 without SPARQL
+
+    Returns:
+        List of result rows (empty on error)
+    """
     print(f"\n{'='*70}")
     print(f"Query: {query_name}")
     print(f"{'='*70}")
     
     try:
-        results = g.query(query_string)
-        
+        rows, info = execute_query(g, query_name, query_string, parameters, cache, fingerprint, index)
+
         # Print results
-        if results:
-            row_count = 0
-            for row in results:
-                row_count += 1
-                print(f"{row_count}. {' | '.join(str(val) for val in row)}")
-            
-            if row_count == 0:
-                print("  (No results)")
-            else:
-                print(f"\n  Total results: {row_count}")
-        else:
+        for row_count, row in enumerate(rows, 1):
+            print(f"{row_count}. {' | '.join(str(val) for val in row)}")
+
+        if not rows:
             print("  (No results)")
+        else:
+            print(f"\n  Total results: {len(rows)}")
+
+        if info["bindings"]:
+            print(f"  Bindings: {', '.join(f'?{k}={v}' for k, v in info['bindings'].items())}")
+        if info["source"] == "cache":
+            print("  ⏱  result cache hit")
+        elif info["source"] == "fast path":
+            print(f"  ⏱  patient index fast path {info['eval_seconds'] * 1000:.1f} ms")
+        else:
+            parse_text = "cached" if info["parse_cached"] else f"{info['parse_seconds'] * 1000:.1f} ms"
+            print(f"  ⏱  parse {parse_text} | eval {info['eval_seconds'] * 1000:.1f} ms")
+
+        if timings is not None:
+            timings["parse"] = timings.get("parse", 0.0) + info["parse_seconds"]
+            timings["eval"] = timings.get("eval", 0.0) + info["eval_seconds"]
+        return rows
     
     except Exception as e:
         print(f"\n❌ Query error: {e}")
+        return []
+
+
+def validate_fast_paths(g, index, parameters):
+    """Compare every fast path with its SPARQL query; returns True if all match"""
+    print(f"\n{'='*70}")
+    print("Patient index fast path vs SPARQL")
+    print(f"{'='*70}")
+
+    all_ok = True
+    for query_name, query_string in QUERIES.items():
+        start = time.perf_counter()
+        fast_rows = index.answer(query_id(query_name), parameters)
+        fast_seconds = time.perf_counter() - start
+        if fast_rows is None:
+            print(f"  - {query_name}: no fast path")
+            continue
+
+        prepared, _, _ = prepare(query_string)
+        start = time.perf_counter()
+        sparql_rows = list(g.query(prepared, initBindings=query_bindings(query_string, parameters)))
+        sparql_seconds = time.perf_counter() - start
+
+        ok, message = validate_fast_path(query_id(query_name), fast_rows, sparql_rows)
+        all_ok &= ok
+        print(f"  {'✓' if ok else '✗'} {query_name}: {message} "
+              f"(fast {fast_seconds * 1000:.1f} ms, SPARQL {sparql_seconds * 1000:.1f} ms)")
+    return all_ok
 
 
 def main():
-    print("\n" + "="*70)
-    print("LUNG CANCER KNOWLEDGE GRAPH - SPARQL QUERY EXECUTOR")
-    print("="*70 + "\n")
-    
-    # Load graph
-    g = load_knowledge_graph()
-    
-    # Define queries
-    queries = {
-        "Q1: List All Patients": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?label ?age ?sex
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?label ;
-                       :age ?age ;
-                       :sex ?sex .
-            }
-            ORDER BY ?age
-        """,
-        
-        "Q2: Stage IV Patients": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?patientLabel ?age
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?patientLabel ;
-                       :age ?age ;
-                       :hasStage ?stage .
-              
-              ?stage :name "IV" .
-            }
-            ORDER BY ?age
-        """,
-        
-        "Q3: Patients with Treatments & Drugs": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?patientLabel ?drugLabel
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?patientLabel ;
-                       :receivedTherapy ?therapy .
-              
-              ?therapy :usesDrug ?drug .
-              ?drug rdfs:label ?drugLabel .
-            }
-            ORDER BY ?patientLabel
-        """,
-        
-        "Q4: Biomarker Test Summary": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?biomarkerLabel (COUNT(?patient) AS ?patientCount)
-            WHERE {
-              ?patient a :Patient ;
-                       :testedForBiomarker ?biomarker .
-              
-              ?biomarker rdfs:label ?biomarkerLabel .
-            }
-            GROUP BY ?biomarkerLabel
-            ORDER BY DESC(?patientCount)
-        """,
-        
-        "Q5: Treatment Outcomes": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?patientLabel ?drugLabel ?outcomeLabel
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?patientLabel ;
-                       :receivedTherapy ?therapy ;
-                       :hasOutcome ?outcome .
-              
-              ?therapy :usesDrug ?drug .
-              ?drug rdfs:label ?drugLabel .
-              ?outcome rdfs:label ?outcomeLabel .
-            }
-            ORDER BY ?patientLabel
-        """,
-        
-        "Q6: Patients by Stage (Distribution)": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?stageName (COUNT(?patient) AS ?count)
-            WHERE {
-              ?patient a :Patient ;
-                       :hasStage ?stage .
-              
-              ?stage :name ?stageName .
-            }
-            GROUP BY ?stageName
-            ORDER BY ?stageName
-        """,
-        
-        "Q7: EGFR+ Patients": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?patientLabel ?age ?drugLabel
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?patientLabel ;
-                       :age ?age ;
-                       :testedForBiomarker ?biomarker ;
-                       :receivedTherapy ?therapy .
-              
-              ?biomarker rdfs:label ?biomarkerLabel .
-              FILTER(CONTAINS(?biomarkerLabel, "EGFR"))
-              
-              ?therapy :usesDrug ?drug .
-              ?drug rdfs:label ?drugLabel .
-            }
-            ORDER BY ?age
-        """,
-        
-        "Q8: High-Risk Patients (Stage IV + Heavy Smoking)": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?patientLabel ?age ?smokingPackYears
-            WHERE {
-              ?patient a :Patient ;
-                       rdfs:label ?patientLabel ;
-                       :age ?age ;
-                       :smokingPackYears ?smokingPackYears ;
-                       :hasStage ?stage .
-              
-              ?stage :name "IV" .
-              
-              FILTER(?smokingPackYears > 20)
-            }
-            ORDER BY DESC(?smokingPackYears)
-        """,
-        
-        "Q9: Histology Distribution": """
-            PREFIX : <http://lungkg.org/ontology#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT ?histologyLabel (COUNT(?patient) AS ?patientCount)
-            WHERE {
-              ?patient a :Patient ;
-                       :hasHistology ?histology .
-              
-              ?histology rdfs:label ?histologyLabel .
-            }
-            GROUP BY ?histologyLabel
-            ORDER BY DESC(?patientCount)
-        """,
+    parser = argparse.ArgumentParser(description="Run the lung cancer SPARQL queries")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the Turtle files instead of using the graph snapshot")
+    parser.add_argument("--rebuild-snapshot", action="store_true",
+                        help="re-parse the Turtle files and rewrite the snapshot")
+    parser.add_argument("--stage", default=DEFAULT_PARAMETERS["targetStage"],
+                        help="stage name for Q2/Q8 (default: %(default)s)")
+    parser.add_argument("--biomarker", default=DEFAULT_PARAMETERS["targetBiomarker"],
+                        help="biomarker label substring for Q7 (default: %(default)s)")
+    parser.add_argument("--min-pack-years", type=int, default=DEFAULT_PARAMETERS["minPackYears"],
+                        help="smoking threshold for Q8 (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="run the query set N times (later passes reuse the prepared queries)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always evaluate instead of serving repeats from the result cache")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="result cache entries (LRU)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL,
+                        help="result cache time-to-live in seconds")
+    parser.add_argument("--fast-path", action="store_true",
+                        help="answer Q1-Q9 from the precomputed patient index instead of SPARQL")
+    parser.add_argument("--validate-fast-path", action="store_true",
+                        help="check every patient index fast path against its SPARQL query and exit")
+    parser.add_argument("--batch", action="store_true",
+                        help="run the queries concurrently and write a structured report (see sparql_batch.py)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent queries in --batch mode")
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="--batch pool: threads, or forked processes sharing the loaded graph")
+    parser.add_argument("--queries-dir", type=Path, default=None,
+                        help="add every *.rq / *.sparql file in this directory to the batch")
+    parser.add_argument("--report", type=Path, default=None,
+                        help="--batch report path (default: ouput/sparql_batch_report.json)")
+    parser.add_argument("--keep-rows", action="store_true",
+                        help="include result rows in the --batch report")
+    parser.add_argument("--query", nargs="+", metavar="ID", default=None,
+                        help="only run these queries (e.g. Q4 Q6 Q9)")
+    parser.add_argument("--export", choices=["csv", "jsonl", "parquet"], default=None,
+                        help="stream results to files instead of printing them (see sparql_results.py)")
+    parser.add_argument("--export-dir", default=str(SCRIPT_DIR / "ouput" / "query_results"),
+                        help="directory for --export files, or - to stream a single query to stdout")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="--export at most N rows per query")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="--export: skip the first N rows (pagination)")
+    parser.add_argument("--parquet-typed", action="store_true",
+                        help="--export parquet: typed columns (long/double/date/...) instead of strings")
+    args = parser.parse_args()
+    parameters = {
+        "targetStage": args.stage,
+        "targetBiomarker": args.biomarker,
+        "minPackYears": args.min_pack_years,
     }
+
+    # Keep stdout clean when it carries exported results
+    to_stdout = args.export is not None and args.export_dir == "-"
+    with contextlib.redirect_stdout(sys.stderr) if to_stdout else contextlib.nullcontext():
+        print("\n" + "="*70)
+        print("LUNG CANCER KNOWLEDGE GRAPH - SPARQL QUERY EXECUTOR")
+        print("="*70 + "\n")
+    
+        # Load graph
+        g, fingerprint = load_knowledge_graph(use_snapshot=not args.no_snapshot,
+                                              rebuild_snapshot=args.rebuild_snapshot)
+    cache = None if args.no_cache else QueryResultCache(args.cache_size, args.cache_ttl)
+
+    index = None
+    if args.fast_path or args.validate_fast_path:
+        start = time.perf_counter()
+        index = PatientIndex.build(g)
+        print(f"✓ Patient index: {len(index)} patients, {len(index.terms)} terms "
+              f"({time.perf_counter() - start:.3f}s)")
+
+    if args.validate_fast_path:
+        sys.exit(0 if validate_fast_paths(g, index, parameters) else 1)
+
+    queries = QUERIES
+    if args.query:
+        wanted = {query.upper() for query in args.query}
+        queries = {name: text for name, text in QUERIES.items() if query_id(name) in wanted}
+
+    if args.export:
+        import sparql_results
+        if args.export_dir == "-":
+            if len(queries) != 1 or args.export == "parquet":
+                print("❌ --export-dir - needs a single --query and csv or jsonl")
+                sys.exit(2)
+            query_name, query_string = next(iter(queries.items()))
+            result = g.query(prepare(query_string)[0], initBindings=query_bindings(query_string, parameters))
+            sparql_results.write_results(result, args.export, limit=args.limit, offset=args.offset)
+        else:
+            try:
+                sparql_results.export_queries(g, queries, args.export, args.export_dir, parameters,
+                                              limit=args.limit, offset=args.offset,
+                                              parquet_typed=args.parquet_typed)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+        return
+
+    if args.batch:
+        import sparql_batch
+        queries = dict(queries)
+        if args.queries_dir:
+            queries.update(sparql_batch.load_query_files(args.queries_dir))
+        report = sparql_batch.run_batch(g, queries, parameters, workers=args.workers,
+                                        executor=args.executor, index=index,
+                                        fingerprint=fingerprint, keep_rows=args.keep_rows)
+        sparql_batch.print_batch_report(report)
+        sparql_batch.save_batch_report(report, args.report or sparql_batch.DEFAULT_REPORT)
+        sys.exit(1 if report["errors"] else 0)
     
     # Run all queries
-    for query_name, query_string in queries.items():
-        run_query(g, query_name, query_string)
+    timings = {}
+    for _ in range(args.repeat):
+        for query_name, query_string in queries.items():
+            run_query(g, query_name, query_string, parameters, timings, cache, fingerprint, index)
+
+    print(f"\n⏱  Total parse {timings.get('parse', 0.0) * 1000:.1f} ms | "
+          f"eval {timings.get('eval', 0.0) * 1000:.1f} ms")
+    if cache is not None:
+        print(f"   Result cache: {cache.hits} hits, {cache.misses} misses")
     
     print("\n" + "="*70)
     print("✅ All queries completed!")
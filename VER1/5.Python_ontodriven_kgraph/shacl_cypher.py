@@ -0,0 +1,718 @@
+"""
+SHACL Shapes Compiled to Cypher Checks
+
+Validating a Neo4j-resident graph with pyshacl means exporting it to RDF
+first. This module instead compiles lung_cancer_shacl_shapes.ttl into
+Cypher predicates over the property graph and evaluates them inside Neo4j:
+
+- every shape's sh:targetClass (plus its rdfs:subClassOf descendants)
+  becomes one or more node labels to scan
+- property shapes become per-node predicates: sh:minCount / sh:maxCount,
+  sh:class, sh:datatype, sh:pattern, sh:in, sh:hasValue, value ranges and
+  string lengths
+- sh:sparql SELECT constraints made of basic graph patterns, equality
+  FILTERs and FILTER (NOT) EXISTS become EXISTS { MATCH ... } subqueries;
+  anything else is reported as skipped
+- the checks of every label run together in keyset-paginated batches
+  (ORDER BY the unique id key, so each batch is an index range seek),
+  returning only violation counts and a few samples per check
+
+Checks target the ETL's property-graph layout (etl_writers: label = class
+local name, relationship type = upper-cased local name, key `id`) or the
+n10s import layout (--mapping n10s: ns0__ names, key `uri`).
+
+Counts are focus nodes per check. pyshacl reports one result per value
+node, so counts differ only where a node has several failing values.
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from rdflib import Graph, Literal, URIRef, Variable
+from rdflib.collection import Collection
+from rdflib.namespace import OWL, RDF, RDFS, SH, XSD
+from rdflib.plugins.sparql import prepareQuery
+
+from etl_writers import cypher_literal, cypher_name, local_name, property_name, property_value
+from etl_writers import relationship_type as etl_relationship_type
+from shacl_inference import RdfsClosure
+from shacl_results import SEVERITIES, shape_names
+
+# Neo4j connection details (as in neo4j_import_labels.py)
+NEO4J_URI = "bolt://localhost:7687"
+NEO4J_USER = "neo4j"
+NEO4J_PASSWORD = "your_password_here"  # UPDATE THIS
+
+SCRIPT_DIR = Path(__file__).parent
+ONTOLOGY_FILE = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_kg_schema.ttl"
+SHACL_FILE = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_shacl_shapes.ttl"
+CHECKS_FILE = SCRIPT_DIR / "ouput" / "shacl_checks.cypher"
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_SAMPLES = 10
+
+# Cypher value types for sh:datatype (Neo4j 5 type predicate expressions)
+DATATYPE_TYPES = {
+    XSD.string: "STRING",
+    XSD.integer: "INTEGER",
+    XSD.int: "INTEGER",
+    XSD.long: "INTEGER",
+    XSD.nonNegativeInteger: "INTEGER",
+    XSD.float: "FLOAT",
+    XSD.double: "FLOAT",
+    XSD.decimal: "FLOAT",
+    XSD.boolean: "BOOLEAN",
+    XSD.date: "DATE",
+    XSD.dateTime: "LOCAL DATETIME | ZONED DATETIME",
+}
+
+RANGE_OPERATORS = {
+    SH.minInclusive: (">=", "MinInclusive"),
+    SH.maxInclusive: ("<=", "MaxInclusive"),
+    SH.minExclusive: (">", "MinExclusive"),
+    SH.maxExclusive: ("<", "MaxExclusive"),
+}
+
+# Shape parameters handled here; other sh: parameters on a shape are reported as skipped
+SHAPE_KEYWORDS = {
+    SH.path, SH.name, SH.description, SH.message, SH.severity, SH.order, SH.group,
+    SH.minCount, SH.maxCount, SH["class"], SH.datatype, SH.pattern, SH.flags, SH["in"],
+    SH.hasValue, SH.minLength, SH.maxLength, SH.deactivated, SH.targetClass, SH.property,
+    SH.sparql, *RANGE_OPERATORS,
+}
+
+
+class Untranslatable(ValueError):
+    """A shape construct with no Cypher translation"""
+
+
+########################################
+# Property-graph layouts
+########################################
+
+class EtlMapping:
+    """Layout written by etl_writers (UNWIND / neo4j-admin import)"""
+
+    name = "etl"
+    key = "id"
+    base_label = None
+
+    def label(self, cls_):
+        return local_name(cls_)
+
+    def property(self, predicate):
+        return property_name(predicate)
+
+    def relationship(self, predicate):
+        return etl_relationship_type(predicate)
+
+    def key_value(self, uri):
+        return local_name(uri)
+
+
+class N10sMapping:
+    """Layout of neo4j_import_labels.py's n10s import (handleVocabUris: "MAP")"""
+
+    name = "n10s"
+    key = "uri"
+    base_label = "Resource"
+
+    def __init__(self, prefix="ns0"):
+        self.prefix = prefix
+
+    def _mapped(self, uri):
+        if uri == RDFS.label:
+            return "rdfs__label"
+        return f"{self.prefix}__{local_name(uri)}"
+
+    def label(self, cls_):
+        return self._mapped(cls_)
+
+    def property(self, predicate):
+        return self._mapped(predicate)
+
+    def relationship(self, predicate):
+        return self._mapped(predicate)
+
+    def key_value(self, uri):
+        return str(uri)
+
+
+MAPPINGS = ("etl", "n10s")
+
+
+def make_mapping(name, n10s_prefix="ns0"):
+    return N10sMapping(n10s_prefix) if name == "n10s" else EtlMapping()
+
+
+########################################
+# Compiled checks
+########################################
+
+class CypherCheck:
+    """
+    One constraint as a Cypher predicate over the focus node `n`.
+
+    value is an expression for the offending value(s), returned with samples.
+    """
+
+    def __init__(self, shape, path, constraint, severity, message, labels, predicate, value="null"):
+        self.shape = shape
+        self.path = path
+        self.constraint = constraint
+        self.severity = severity
+        self.message = message
+        self.labels = labels
+        self.predicate = predicate
+        self.value = value
+
+    @property
+    def name(self):
+        return " ".join(part for part in (self.shape, self.path, self.constraint) if part)
+
+    def statement(self, mapping, samples=DEFAULT_SAMPLES):
+        """Standalone full-scan statement returning this check's count and samples"""
+        labels = " OR ".join(f"n:{cypher_name(label)}" for label in self.labels)
+        return (f"MATCH (n) WHERE ({labels}) AND {self.predicate}\n"
+                f"RETURN {cypher_literal(self.name)} AS check, count(n) AS violations, "
+                f"collect({{focus: n.{cypher_name(mapping.key)}, value: {self.value}}})[..{samples}] AS samples")
+
+
+def values_of(variable, key):
+    """Property values as a list: [] when missing, the list itself for n10s multivalued properties"""
+    prop = f"{variable}.{cypher_name(key)}"
+    return f"CASE WHEN {prop} IS NULL THEN [] WHEN {prop} IS :: LIST<ANY> THEN {prop} ELSE [{prop}] END"
+
+
+def cypher_value(term):
+    """Cypher literal for an RDF literal, typed as the ETL stores it"""
+    return cypher_literal(property_value(term))
+
+
+def label_test(variable, labels):
+    return "(" + " OR ".join(f"{variable}:{cypher_name(label)}" for label in labels) + ")"
+
+
+def is_relationship(path, ontology_graph, shapes_graph, property_shape):
+    """Object properties map to relationships, datatype properties (and rdfs:label) to properties"""
+    if path == RDFS.label:
+        return False
+    if ontology_graph is not None:
+        if (path, RDF.type, OWL.ObjectProperty) in ontology_graph:
+            return True
+        if (path, RDF.type, OWL.DatatypeProperty) in ontology_graph:
+            return False
+    if property_shape is None:
+        return False
+    return any(shapes_graph.value(property_shape, keyword) is not None
+               for keyword in (SH["class"], SH.node, SH.nodeKind))
+
+
+class ShapeCompiler:
+    """Translate the shapes of one shapes graph into CypherChecks"""
+
+    def __init__(self, shapes_graph, ontology_graph=None, closure=None, mapping=None):
+        self.shapes_graph = shapes_graph
+        self.ontology_graph = ontology_graph
+        self.closure = closure or RdfsClosure.from_graph(ontology_graph)
+        self.mapping = mapping or EtlMapping()
+        self.names = shape_names(shapes_graph)
+        self.skipped = []
+
+        # rdfs:subClassOf descendants, for targets and sh:class
+        self.descendants = defaultdict(set)
+        for cls_, ancestors in self.closure.ancestors.items():
+            for ancestor in ancestors:
+                self.descendants[ancestor].add(cls_)
+
+    def labels(self, cls_):
+        return sorted({self.mapping.label(c) for c in self.descendants.get(cls_, set()) | {cls_}})
+
+    def compile(self):
+        """
+        Returns:
+            List of CypherChecks; untranslatable constraints are collected in self.skipped
+        """
+        checks = []
+        for shape in sorted(set(self.shapes_graph.subjects(RDF.type, SH.NodeShape))):
+            if self.shapes_graph.value(shape, SH.deactivated) == Literal(True):
+                continue
+            name = self.names.get(shape, local_name(shape))
+            targets = list(self.shapes_graph.objects(shape, SH.targetClass))
+            if not targets:
+                self.skip(name, "", "target", "only sh:targetClass targets are compiled")
+                continue
+            labels = sorted({label for target in targets for label in self.labels(target)})
+
+            for property_shape in self.shapes_graph.objects(shape, SH.property):
+                checks.extend(self.compile_property(name, labels, property_shape))
+            for sparql in self.shapes_graph.objects(shape, SH.sparql):
+                check = self.compile_sparql(name, labels, sparql)
+                if check is not None:
+                    checks.append(check)
+            self.skip_unknown(name, "", shape)
+        return checks
+
+    def skip(self, shape, path, constraint, reason):
+        self.skipped.append((shape, path, constraint, reason))
+
+    def skip_unknown(self, name, path, node):
+        for predicate in set(self.shapes_graph.predicates(node)):
+            if str(predicate).startswith(str(SH)) and predicate not in SHAPE_KEYWORDS:
+                self.skip(name, path, local_name(predicate), "no Cypher translation")
+
+    def severity(self, node):
+        return local_name(self.shapes_graph.value(node, SH.severity) or SH.Violation)
+
+    def compile_property(self, name, labels, property_shape):
+        g = self.shapes_graph
+        path = g.value(property_shape, SH.path)
+        if not isinstance(path, URIRef):
+            self.skip(name, "", "path", "only single-predicate sh:path is compiled")
+            return []
+
+        path_name = path.n3(g.namespace_manager)
+        severity = self.severity(property_shape)
+        message = str(g.value(property_shape, SH.message) or "")
+
+        def check(constraint, predicate, value="null"):
+            return CypherCheck(name, path_name, constraint, severity, message, labels, predicate, value)
+
+        checks = []
+        min_count = g.value(property_shape, SH.minCount)
+        max_count = g.value(property_shape, SH.maxCount)
+
+        if is_relationship(path, self.ontology_graph, g, property_shape):
+            rel = f"(n)-[:{cypher_name(self.mapping.relationship(path))}]->"
+            key = cypher_name(self.mapping.key)
+            if min_count is not None:
+                checks.append(check("MinCount", f"COUNT {{ {rel}() }} < {int(min_count)}"))
+            if max_count is not None:
+                checks.append(check("MaxCount", f"COUNT {{ {rel}() }} > {int(max_count)}"))
+            cls_ = g.value(property_shape, SH["class"])
+            if cls_ is not None:
+                wrong = f"NOT {label_test('m', self.labels(cls_))}"
+                checks.append(check("Class", f"EXISTS {{ MATCH {rel}(m) WHERE {wrong} }}",
+                                    f"[{rel}(m) WHERE {wrong} | m.{key}]"))
+            for keyword in (SH.datatype, SH.pattern, SH["in"], SH.hasValue, SH.minLength, SH.maxLength,
+                            *RANGE_OPERATORS):
+                if g.value(property_shape, keyword) is not None:
+                    self.skip(name, path_name, local_name(keyword), "literal constraint on a relationship")
+            self.skip_unknown(name, path_name, property_shape)
+            return checks
+
+        values = values_of("n", self.mapping.property(path))
+
+        def each(constraint, failing):
+            """Check failing(v) over every value of the property"""
+            return check(constraint, f"any(v IN {values} WHERE {failing})",
+                         f"[v IN {values} WHERE {failing}]")
+
+        if min_count is not None:
+            checks.append(check("MinCount", f"size({values}) < {int(min_count)}"))
+        if max_count is not None:
+            checks.append(check("MaxCount", f"size({values}) > {int(max_count)}", values))
+
+        datatype = g.value(property_shape, SH.datatype)
+        if datatype is not None:
+            if datatype in DATATYPE_TYPES:
+                checks.append(each("Datatype", f"NOT v IS :: {DATATYPE_TYPES[datatype]}"))
+            else:
+                self.skip(name, path_name, "Datatype", f"no Cypher type for {datatype.n3(g.namespace_manager)}")
+
+        pattern = g.value(property_shape, SH.pattern)
+        if pattern is not None:
+            flags = str(g.value(property_shape, SH.flags) or "")
+            if set(flags) - set("imsx"):
+                self.skip(name, path_name, "Pattern", f"unsupported regex flags {flags!r}")
+            else:
+                # SHACL patterns match anywhere in the value; Cypher =~ must match all of it
+                inline = f"(?{flags})" if flags else ""
+                regex = f"{inline}(?s).*(?:{pattern}).*"
+                checks.append(each("Pattern", f"NOT toString(v) =~ {cypher_literal(regex)}"))
+
+        members = g.value(property_shape, SH["in"])
+        if members is not None:
+            allowed = "[" + ", ".join(cypher_value(term) for term in Collection(g, members)) + "]"
+            checks.append(each("In", f"NOT v IN {allowed}"))
+
+        has_value = g.value(property_shape, SH.hasValue)
+        if has_value is not None:
+            checks.append(check("HasValue", f"NOT {cypher_value(has_value)} IN {values}"))
+
+        for keyword, operator, constraint in ((SH.minLength, "<", "MinLength"), (SH.maxLength, ">", "MaxLength")):
+            length = g.value(property_shape, keyword)
+            if length is not None:
+                checks.append(each(constraint, f"size(toString(v)) {operator} {int(length)}"))
+
+        for keyword, (operator, constraint) in RANGE_OPERATORS.items():
+            bound = g.value(property_shape, keyword)
+            if bound is not None:
+                # Values that are not comparable (null comparison) fail, as in SHACL
+                checks.append(each(constraint, f"NOT coalesce(v {operator} {cypher_value(bound)}, false)"))
+
+        if g.value(property_shape, SH["class"]) is not None:
+            self.skip(name, path_name, "Class", "sh:class on a literal property")
+        self.skip_unknown(name, path_name, property_shape)
+        return checks
+
+    def compile_sparql(self, name, labels, sparql):
+        g = self.shapes_graph
+        select = g.value(sparql, SH.select)
+        if select is None:
+            self.skip(name, "", "SPARQL", "only sh:select constraints are compiled")
+            return None
+        try:
+            predicate = SparqlTranslator(self, g).translate(str(select))
+        except Untranslatable as e:
+            self.skip(name, "", "SPARQL", str(e))
+            return None
+        return CypherCheck(name, "", "SPARQL", self.severity(sparql), str(g.value(sparql, SH.message) or ""),
+                           labels, predicate)
+
+
+class SparqlTranslator:
+    """
+    Translate a SELECT $this ... constraint into a Cypher predicate on `n`.
+
+    Supported: triple patterns whose predicates are IRIs (rdf:type, object
+    properties as relationships, datatype properties matched against a
+    literal or an otherwise unused variable), FILTER (NOT) EXISTS, and
+    FILTER with = / != between variables-bound-to-properties and literals
+    combined with &&.
+    """
+
+    def __init__(self, compiler, shapes_graph):
+        self.compiler = compiler
+        self.mapping = compiler.mapping
+        self.namespaces = dict(shapes_graph.namespaces())
+
+    def translate(self, select):
+        try:
+            query = prepareQuery(select, initNs=self.namespaces)
+        except Exception as e:
+            raise Untranslatable(f"cannot parse query: {e}")
+        algebra = query.algebra
+        if algebra.name != "SelectQuery" or [str(v) for v in algebra.PV] != ["this"]:
+            raise Untranslatable("query must be SELECT $this")
+        node = algebra.p
+        if node.name == "Project":
+            node = node.p
+        return self.group(node, bound={"this"}) or "true"
+
+    @staticmethod
+    def variable(term):
+        return "n" if str(term) == "this" else cypher_name("v_" + str(term))
+
+    def flatten(self, node):
+        """(triples, filter expressions) of a BGP / Join / Filter tree"""
+        if node.name == "BGP":
+            return list(node.triples), []
+        if node.name == "Join":
+            left, right = self.flatten(node.p1), self.flatten(node.p2)
+            return left[0] + right[0], left[1] + right[1]
+        if node.name == "Filter":
+            triples, filters = self.flatten(node.p)
+            return triples, filters + [node.expr]
+        raise Untranslatable(f"unsupported pattern {node.name}")
+
+    def group(self, node, bound):
+        """Cypher predicate that some binding of the group's new variables exists"""
+        triples, filters = self.flatten(node)
+        variables = [term for triple in triples for term in triple if isinstance(term, Variable)]
+        bound = set(bound)
+        patterns, conditions, property_variables = [], [], set()
+
+        for s, p, o in triples:
+            if not isinstance(s, Variable):
+                raise Untranslatable("subjects must be variables")
+            subject = self.variable(s)
+            if not isinstance(p, URIRef):
+                raise Untranslatable("predicates must be IRIs")
+
+            if p == RDF.type:
+                if not isinstance(o, URIRef):
+                    raise Untranslatable("rdf:type objects must be IRIs")
+                conditions.append(label_test(subject, self.compiler.labels(o)))
+            elif is_relationship(p, self.compiler.ontology_graph, self.compiler.shapes_graph, None):
+                rel = cypher_name(self.mapping.relationship(p))
+                if isinstance(o, Variable):
+                    patterns.append(f"({subject})-[:{rel}]->({self.variable(o)})")
+                elif isinstance(o, URIRef):
+                    key = cypher_name(self.mapping.key)
+                    patterns.append(f"({subject})-[:{rel}]->({{{key}: {cypher_literal(self.mapping.key_value(o))}}})")
+                else:
+                    raise Untranslatable("relationship objects must be variables or IRIs")
+            else:
+                values = values_of(subject, self.mapping.property(p))
+                if isinstance(o, Literal):
+                    conditions.append(f"{cypher_value(o)} IN {values}")
+                elif isinstance(o, Variable) and variables.count(o) == 1 and str(o) not in bound:
+                    conditions.append(f"size({values}) > 0")
+                    property_variables.add(str(o))
+                else:
+                    raise Untranslatable("property values must be literals or unused variables")
+
+        # Variables standing for property values have no node to refer to in FILTERs
+        bound |= {str(v) for v in variables} - property_variables
+        conditions.extend(self.expression(expr, bound) for expr in filters)
+
+        if not patterns:
+            return " AND ".join(conditions)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"EXISTS {{ MATCH {', '.join(patterns)}{where} }}"
+
+    def expression(self, expr, bound):
+        if isinstance(expr, Literal):
+            return cypher_value(expr)
+        if isinstance(expr, Variable):
+            if str(expr) not in bound:
+                raise Untranslatable(f"unbound variable ?{expr}")
+            return self.variable(expr) + "." + cypher_name(self.mapping.key)
+        if isinstance(expr, URIRef):
+            return cypher_literal(self.mapping.key_value(expr))
+
+        name = getattr(expr, "name", None)
+        if name == "Builtin_NOTEXISTS":
+            return f"NOT {self.group(expr.graph, bound)}"
+        if name == "Builtin_EXISTS":
+            return self.group(expr.graph, bound)
+        if name == "ConditionalAndExpression":
+            return "(" + " AND ".join(self.expression(e, bound) for e in [expr.expr] + list(expr.other)) + ")"
+        if name == "RelationalExpression" and expr.op in ("=", "!="):
+            operator = "=" if expr.op == "=" else "<>"
+            return f"{self.expression(expr.expr, bound)} {operator} {self.expression(expr.other, bound)}"
+        raise Untranslatable(f"unsupported FILTER expression {name or expr!r}")
+
+
+def compile_shapes(shapes_graph, ontology_graph=None, closure=None, mapping=None):
+    """
+    Returns:
+        (checks, skipped) where skipped lists (shape, path, constraint, reason)
+    """
+    compiler = ShapeCompiler(shapes_graph, ontology_graph, closure, mapping)
+    checks = compiler.compile()
+    return checks, compiler.skipped
+
+
+def write_checks(checks, mapping, output=CHECKS_FILE, samples=DEFAULT_SAMPLES):
+    """Write one standalone statement per check, for cypher-shell or Neo4j Browser"""
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(f"// SHACL checks compiled from {SHACL_FILE.name} ({mapping.name} layout)\n\n")
+        for check in checks:
+            f.write(f"// [{check.severity}] {check.name}: {check.message}\n")
+            f.write(check.statement(mapping, samples) + ";\n\n")
+
+
+########################################
+# Batched evaluation in Neo4j
+########################################
+
+def scan_plan(checks):
+    """
+    {label: [(check index, predicate)]}: one keyset scan per label.
+
+    A node carrying several of a check's labels (n10s with inferred types)
+    is only counted in the scan of the first one.
+    """
+    plan = defaultdict(list)
+    for index, check in enumerate(checks):
+        for i, label in enumerate(check.labels):
+            predicate = check.predicate
+            if i:
+                predicate = f"NOT {label_test('n', check.labels[:i])} AND {predicate}"
+            plan[label].append((index, predicate))
+    return plan
+
+
+def batch_statement(label, entries, checks, mapping):
+    """Keyset-paginated statement evaluating all checks of one label over one batch"""
+    key = cypher_name(mapping.key)
+    labels = cypher_name(label)
+    if mapping.base_label:
+        labels = f"{cypher_name(mapping.base_label)}:{labels}"
+    found = ",\n     ".join(
+        f"[n IN nodes WHERE {predicate} | {{focus: n.{key}, value: {checks[index].value}}}] AS c{i}"
+        for i, (index, predicate) in enumerate(entries))
+    return (f"MATCH (n:{labels}) WHERE n.{key} > $after\n"
+            f"WITH n ORDER BY n.{key} LIMIT $batchSize\n"
+            f"WITH collect(n) AS nodes\n"
+            f"WITH nodes,\n     {found}\n"
+            f"RETURN size(nodes) AS scanned, nodes[-1].{key} AS last,\n"
+            f"       [{', '.join(f'size(c{i})' for i in range(len(entries)))}] AS counts,\n"
+            f"       [{', '.join(f'c{i}[..$samples]' for i in range(len(entries)))}] AS samples")
+
+
+class CheckResult:
+    def __init__(self, check):
+        self.check = check
+        self.count = 0
+        self.samples = []
+
+
+class CypherValidator:
+    def __init__(self, uri, user, password, driver=None, database=None):
+        """
+        Args:
+            driver: Pre-built driver (e.g. a fake one in tests); uri/user/password are then ignored
+            database: Database to validate (server default if None)
+        """
+        if driver is None:
+            from neo4j import GraphDatabase
+            driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = driver
+        self.database = database
+
+    def close(self):
+        self.driver.close()
+
+    @staticmethod
+    def _read_batch(tx, statement, after, batch_size, samples):
+        return tx.run(statement, after=after, batchSize=batch_size, samples=samples).single()
+
+    def validate(self, checks, mapping, batch_size=DEFAULT_BATCH_SIZE, samples=DEFAULT_SAMPLES):
+        """
+        Run every label's checks batch by batch in read transactions.
+
+        Returns:
+            ([CheckResult] in check order, {label: nodes scanned})
+        """
+        results = [CheckResult(check) for check in checks]
+        scanned = {}
+        with self.driver.session(database=self.database) as session:
+            for label, entries in scan_plan(checks).items():
+                statement = batch_statement(label, entries, checks, mapping)
+                after, scanned[label] = "", 0
+                while True:
+                    record = session.execute_read(self._read_batch, statement, after, batch_size, samples)
+                    if record is None or not record["scanned"]:
+                        break
+                    scanned[label] += record["scanned"]
+                    for (index, _), count, found in zip(entries, record["counts"], record["samples"]):
+                        result = results[index]
+                        result.count += count
+                        result.samples.extend(found[:samples - len(result.samples)])
+                    if record["scanned"] < batch_size:
+                        break
+                    after = record["last"]
+        return results, scanned
+
+
+########################################
+# Reporting
+########################################
+
+def print_compiled(checks, skipped):
+    labels = {label for check in checks for label in check.labels}
+    print(f"  ✓ {len(checks)} checks over {len(labels)} labels")
+    for shape, path, constraint, reason in skipped:
+        where = " ".join(part for part in (shape, path) if part)
+        print(f"  ⚠ Skipped {constraint} ({where}): {reason}")
+
+
+def print_results(results, scanned):
+    """
+    Print counts per check, then samples.
+
+    Returns:
+        (conforms, {severity: count})
+    """
+    print("\n" + "="*60)
+    print("CYPHER VALIDATION SUMMARY")
+    print("="*60)
+    print(f"\n📊 Scanned {sum(scanned.values())} nodes in {len(scanned)} labels")
+
+    totals = {severity: 0 for severity in SEVERITIES}
+    for result in results:
+        totals[result.check.severity] = totals.get(result.check.severity, 0) + result.count
+    conforms = not any(totals.values())
+    print("✅ VALIDATION PASSED - All constraints satisfied!" if conforms
+          else "❌ VALIDATION FAILED - Constraint violations detected")
+    print(f"  🔴 Violations: {totals['Violation']}")
+    print(f"  ⚠️  Warnings:   {totals['Warning']}")
+    print(f"  ℹ️  Info:       {totals['Info']}")
+
+    failing = sorted((result for result in results if result.count),
+                     key=lambda result: (SEVERITIES.index(result.check.severity)
+                                         if result.check.severity in SEVERITIES else len(SEVERITIES),
+                                         -result.count))
+    if failing:
+        print(f"\n📊 By check:")
+        for result in failing:
+            print(f"  {result.count:>6}  {result.check.severity:<9} {result.check.name}")
+    for result in failing:
+        print(f"\n--- {result.check.severity}: {result.check.name} ---")
+        if result.check.message:
+            print(f"  Message: {result.check.message}")
+        for sample in result.samples:
+            value = sample.get("value")
+            print(f"  Focus Node: {sample['focus']}" + (f"  Value: {value}" if value not in (None, []) else ""))
+    return conforms, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the lung cancer KG in Neo4j with SHACL shapes compiled to Cypher")
+    parser.add_argument("--uri", default=NEO4J_URI)
+    parser.add_argument("--user", default=NEO4J_USER)
+    parser.add_argument("--password", default=NEO4J_PASSWORD)
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--shapes", type=Path, default=SHACL_FILE)
+    parser.add_argument("--mapping", choices=MAPPINGS, default="etl",
+                        help="etl: layout written by the ETL's UNWIND/admin-import writers; n10s: neosemantics import")
+    parser.add_argument("--n10s-prefix", default="ns0",
+                        help="namespace prefix n10s assigned to the ontology namespace")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="nodes per read transaction")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                        help="offending focus nodes kept per check")
+    parser.add_argument("--output", type=Path, default=CHECKS_FILE,
+                        help="where to write the compiled standalone Cypher checks")
+    parser.add_argument("--compile-only", action="store_true",
+                        help="write the Cypher checks without connecting to Neo4j")
+    args = parser.parse_args()
+
+    print("=== SHACL to Cypher Validation ===\n")
+    if not args.shapes.exists():
+        print(f"❌ Error: SHACL shapes file not found: {args.shapes}")
+        sys.exit(1)
+
+    shapes_graph = Graph()
+    shapes_graph.parse(args.shapes)
+    ontology_graph = None
+    if ONTOLOGY_FILE.exists():
+        ontology_graph = Graph()
+        ontology_graph.parse(ONTOLOGY_FILE)
+
+    mapping = make_mapping(args.mapping, args.n10s_prefix)
+    checks, skipped = compile_shapes(shapes_graph, ontology_graph, mapping=mapping)
+    print_compiled(checks, skipped)
+    write_checks(checks, mapping, args.output, args.samples)
+    print(f"💾 Cypher checks saved to: {args.output}")
+    if args.compile_only:
+        return
+
+    validator = CypherValidator(args.uri, args.user, args.password, database=args.database)
+    try:
+        start = time.perf_counter()
+        results, scanned = validator.validate(checks, mapping, args.batch_size, args.samples)
+        conforms, totals = print_results(results, scanned)
+        print(f"\n⏱ Validated in Neo4j in {time.perf_counter() - start:.3f}s")
+    except Exception as e:
+        print(f"\n✗ Error during validation: {e}")
+        sys.exit(1)
+    finally:
+        validator.close()
+
+    if totals["Violation"]:
+        print("\n❌ Exiting with error code due to violations")
+        sys.exit(1)
+    print("\n✅ Validation complete!")
+
+
+if __name__ == "__main__":
+    main()
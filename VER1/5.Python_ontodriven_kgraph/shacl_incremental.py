@@ -0,0 +1,199 @@
+"""
+Shape-Targeted Incremental SHACL Validation
+
+A full validate_shacl.py run checks every node against every shape with
+RDFS inference over the whole graph. After a small ETL change only a few
+focus nodes can have different results, so an incremental run:
+
+1. takes the changed triples, either by diffing the previous instance file
+   against the current one or from etl_incremental.py's
+   delta_added.nt / delta_removed.nt
+2. collects the changed nodes (subjects and resource objects of those
+   triples) plus their in-neighbours, since a shape on a node that points to
+   a changed node (sh:class on :hasStage, a SPARQL constraint reading
+   ?stage :name) can change result too
+3. keeps the nodes that are, after RDFS entailment from rdf:type,
+   rdfs:domain/rdfs:range and rdfs:subClassOf, instances of some
+   shape's sh:targetClass (the affected shapes)
+4. validates only those focus nodes with pyshacl, over the subgraph of
+   their own triples, incoming triples and their neighbours' outgoing
+   triples
+
+The result covers the affected focus nodes only; nodes untouched by the
+change keep their result from the last full run.
+"""
+
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from rdflib import BNode, Graph, URIRef
+from rdflib.namespace import RDF, RDFS, SH
+
+from shacl_inference import RdfsClosure, run_validation
+
+DELTA_ADDED = "delta_added.nt"
+DELTA_REMOVED = "delta_removed.nt"
+
+
+########################################
+# Changes
+########################################
+
+def load_delta(previous, data_graph):
+    """
+    Changed triples between a previous state and the current data graph.
+
+    Args:
+        previous: A previous instance file (any RDF format), or a directory
+            holding delta_added.nt / delta_removed.nt from an incremental ETL run
+        data_graph: Current instance graph
+
+    Returns:
+        (added Graph, removed Graph)
+    """
+    previous = Path(previous)
+    if previous.is_dir():
+        added, removed = Graph(), Graph()
+        for graph, name in ((added, DELTA_ADDED), (removed, DELTA_REMOVED)):
+            if (previous / name).exists():
+                graph.parse(previous / name, format="nt")
+        return added, removed
+
+    old_graph = Graph()
+    old_graph.parse(previous)
+    return data_graph - old_graph, old_graph - data_graph
+
+
+def changed_nodes(*graphs):
+    """Subjects and resource objects of the changed triples"""
+    nodes = set()
+    for graph in graphs:
+        for s, _, o in graph:
+            nodes.add(s)
+            if isinstance(o, (URIRef, BNode)):
+                nodes.add(o)
+    return nodes
+
+
+########################################
+# Shapes and entailment
+########################################
+
+def shape_targets(shapes_graph):
+    """
+    {shape: target classes}. Shapes with other kinds of targets
+    (sh:targetNode, sh:targetSubjectsOf, ...) map to None: always affected.
+    """
+    targets = {}
+    for shape in set(shapes_graph.subjects(RDF.type, SH.NodeShape)):
+        classes = set(shapes_graph.objects(shape, SH.targetClass))
+        other = any(shapes_graph.value(shape, predicate) is not None for predicate in
+                    (SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf, SH.target))
+        if (shape, RDF.type, RDFS.Class) in shapes_graph:
+            classes.add(shape)  # implicit class target
+        targets[shape] = None if other else classes
+    return targets
+
+
+def targeting_shapes(data_graph, candidates, shapes_graph, closure):
+    """{candidate IRI: frozenset of the shapes that target it} for targeted candidates"""
+    targets = shape_targets(shapes_graph)
+    targeted = {}
+    for node in candidates:
+        if not isinstance(node, URIRef):
+            continue
+        types = closure.types(data_graph, node)
+        shapes = frozenset(shape for shape, classes in targets.items() if classes is None or classes & types)
+        if shapes:
+            targeted[node] = shapes
+    return targeted
+
+
+def affected_focus_nodes(data_graph, nodes, shapes_graph, closure):
+    """
+    Focus nodes (the changed nodes and their in-neighbours) targeted by some shape.
+
+    Returns:
+        (focus nodes, {shape: number of focus nodes it targets})
+    """
+    candidates = set(nodes)
+    for node in nodes:
+        candidates.update(s for s in data_graph.subjects(None, node) if isinstance(s, URIRef))
+
+    targeted = targeting_shapes(data_graph, candidates, shapes_graph, closure)
+    affected = defaultdict(int)
+    for shapes in targeted.values():
+        for shape in shapes:
+            affected[shape] += 1
+    return set(targeted), dict(affected)
+
+
+def neighbourhood(data_graph, focus):
+    """Triples of the focus nodes, triples pointing at them, and their neighbours' triples"""
+    subgraph = Graph()
+    for prefix, namespace in data_graph.namespaces():
+        subgraph.bind(prefix, namespace)
+
+    neighbours = set()
+    for node in focus:
+        for p, o in data_graph.predicate_objects(node):
+            subgraph.add((node, p, o))
+            if isinstance(o, (URIRef, BNode)):
+                neighbours.add(o)
+        for s, p in data_graph.subject_predicates(node):
+            subgraph.add((s, p, node))
+    for node in neighbours.difference(focus):
+        for p, o in data_graph.predicate_objects(node):
+            subgraph.add((node, p, o))
+    return subgraph
+
+
+########################################
+# Validation
+########################################
+
+def validate_incremental(data_graph, shapes_graph, ontology_graph, previous, inference="rdfs", closure=None):
+    """
+    Validate only the focus nodes affected by the change since `previous`.
+
+    inference / closure select pyshacl's RDFS inference or the precomputed
+    closure (see shacl_inference.run_validation).
+
+    Returns:
+        (conforms, results_graph, results_text, stats)
+    """
+    start = time.perf_counter()
+    added, removed = load_delta(previous, data_graph)
+    nodes = changed_nodes(added, removed)
+    closure = closure or RdfsClosure.from_graph(ontology_graph)
+    focus, affected = affected_focus_nodes(data_graph, nodes, shapes_graph, closure)
+    stats = {
+        "added": len(added),
+        "removed": len(removed),
+        "changed_nodes": len(nodes),
+        "focus_nodes": len(focus),
+        "affected_shapes": affected,
+        "delta_seconds": time.perf_counter() - start,
+    }
+
+    if not focus:
+        return True, Graph(), "Validation Report\nConforms: True\n", stats
+
+    subgraph = neighbourhood(data_graph, focus)
+    stats["subgraph_triples"] = len(subgraph)
+    conforms, results_graph, results_text = run_validation(
+        subgraph, shapes_graph, ontology_graph, inference, closure, focus_nodes=sorted(focus))
+    stats["seconds"] = time.perf_counter() - start
+    return conforms, results_graph, results_text, stats
+
+
+def print_incremental_stats(stats):
+    print(f"  ✓ Delta: +{stats['added']} / -{stats['removed']} triples, "
+          f"{stats['changed_nodes']} changed nodes")
+    print(f"  ✓ {stats['focus_nodes']} focus nodes across {len(stats['affected_shapes'])} affected shapes")
+    for shape, count in sorted(stats["affected_shapes"].items()):
+        print(f"      {shape.split('#')[-1]}: {count}")
+    if "subgraph_triples" in stats:
+        print(f"  ✓ Validated a {stats['subgraph_triples']}-triple neighbourhood "
+              f"in {stats['seconds']:.3f}s")
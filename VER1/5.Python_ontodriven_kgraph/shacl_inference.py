@@ -0,0 +1,221 @@
+"""
+Precomputed RDFS Closure for SHACL Validation
+
+pyshacl's inference='rdfs' mixes the ontology into a copy of the data graph
+and expands every RDFS entailment on every run. The shapes only look at
+rdf:type (sh:targetClass, sh:class) and at their sh:path properties, and
+the ontology rarely changes, so the "closure" mode instead:
+
+- computes the class and property hierarchy closure once (rdfs:subClassOf,
+  rdfs:subPropertyOf, with rdfs:domain / rdfs:range lifted through both)
+  and caches it as JSON next to the graph snapshots, keyed by the
+  ontology's sha256
+- adds to the data graph only the rdf:type triples for classes the shapes
+  mention, plus super-property triples for shape paths
+- runs pyshacl in place without inference or an ontology graph, then
+  removes the added triples again
+
+No copy of the data graph is made; memory grows only by the added triples.
+"""
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from pyshacl import validate
+from rdflib import BNode, Graph, URIRef
+from rdflib.namespace import RDF, RDFS, SH
+
+from graph_snapshot import SNAPSHOT_DIR, file_hash
+
+# Bump when the cached closure layout changes
+CLOSURE_VERSION = 1
+
+INFERENCE_MODES = ("rdfs", "closure")
+
+
+def _transitive(edges):
+    """{node: node plus everything reachable over edges}"""
+    closure = {}
+
+    def visit(node, path=()):
+        if node not in closure:
+            reachable = {node}
+            for parent in edges.get(node, ()):
+                if parent not in path:  # tolerate subClassOf cycles
+                    reachable |= visit(parent, path + (node,))
+            closure[node] = reachable
+        return closure[node]
+
+    for node in list(edges):
+        visit(node)
+    return closure
+
+
+class RdfsClosure:
+    """Class/property hierarchy closure with domains and ranges lifted through it"""
+
+    def __init__(self, ancestors, super_properties, domains, ranges):
+        self.ancestors = ancestors
+        self.super_properties = super_properties
+        self.domains = domains
+        self.ranges = ranges
+
+    @classmethod
+    def from_graph(cls, ontology_graph):
+        sub_class, sub_property = defaultdict(set), defaultdict(set)
+        direct_domains, direct_ranges = defaultdict(set), defaultdict(set)
+        if ontology_graph is not None:
+            for child, parent in ontology_graph.subject_objects(RDFS.subClassOf):
+                sub_class[child].add(parent)
+            for child, parent in ontology_graph.subject_objects(RDFS.subPropertyOf):
+                sub_property[child].add(parent)
+            for prop, domain in ontology_graph.subject_objects(RDFS.domain):
+                direct_domains[prop].add(domain)
+            for prop, range_ in ontology_graph.subject_objects(RDFS.range):
+                direct_ranges[prop].add(range_)
+
+        ancestors = _transitive(sub_class)
+        super_properties = _transitive(sub_property)
+
+        def lift(direct):
+            lifted = {}
+            for prop in set(direct) | set(super_properties):
+                classes = set()
+                for super_property in super_properties.get(prop, {prop}):
+                    for cls_ in direct.get(super_property, ()):
+                        classes |= ancestors.get(cls_, {cls_})
+                if classes:
+                    lifted[prop] = classes
+            return lifted
+
+        return cls(ancestors, super_properties, lift(direct_domains), lift(direct_ranges))
+
+    def to_json(self):
+        def dump(mapping):
+            return {str(key): sorted(str(value) for value in values) for key, values in mapping.items()}
+        return {"ancestors": dump(self.ancestors), "super_properties": dump(self.super_properties),
+                "domains": dump(self.domains), "ranges": dump(self.ranges)}
+
+    @classmethod
+    def from_json(cls, data):
+        def load(mapping):
+            return {URIRef(key): {URIRef(value) for value in values} for key, values in mapping.items()}
+        return cls(load(data["ancestors"]), load(data["super_properties"]),
+                   load(data["domains"]), load(data["ranges"]))
+
+    def classes(self, cls_):
+        return self.ancestors.get(cls_, {cls_})
+
+    def types(self, graph, node):
+        """Asserted and RDFS-entailed classes of node in graph"""
+        types = set()
+        for p, o in graph.predicate_objects(node):
+            if p == RDF.type:
+                types |= self.classes(o)
+            types |= self.domains.get(p, set())
+        for p in graph.predicates(None, node):
+            types |= self.ranges.get(p, set())
+        return types
+
+
+def load_closure(ontology_path, ontology_graph=None, cache_dir=SNAPSHOT_DIR):
+    """
+    RDFS closure of an ontology file, from the JSON cache when the file is unchanged.
+
+    Returns:
+        (RdfsClosure, from_cache)
+    """
+    ontology_path = Path(ontology_path)
+    cache_path = Path(cache_dir) / f"{ontology_path.stem}.rdfs_closure.json"
+    sha256 = file_hash(ontology_path)
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("version") == CLOSURE_VERSION and cached.get("sha256") == sha256:
+            return RdfsClosure.from_json(cached["closure"]), True
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if ontology_graph is None:
+        ontology_graph = Graph()
+        ontology_graph.parse(ontology_path)
+    closure = RdfsClosure.from_graph(ontology_graph)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CLOSURE_VERSION, "sha256": sha256, "closure": closure.to_json()}, f)
+    os.replace(tmp, cache_path)
+    return closure, False
+
+
+########################################
+# Targeted materialization
+########################################
+
+def shape_vocabulary(shapes_graph):
+    """(classes, properties) the shapes refer to: target/sh:class classes and sh:path IRIs"""
+    classes = set(shapes_graph.objects(None, SH.targetClass)) | set(shapes_graph.objects(None, SH["class"]))
+    properties = {path for path in shapes_graph.objects(None, SH.path) if isinstance(path, URIRef)}
+    return classes, properties
+
+
+def materialize(graph, closure, shapes_graph, nodes=None):
+    """
+    Add the entailments the shapes can observe to graph.
+
+    Args:
+        nodes: Only type these nodes (default: every resource in graph)
+
+    Returns:
+        The added triples (none of them were asserted before)
+    """
+    classes, properties = shape_vocabulary(shapes_graph)
+    added = []
+
+    # rdfs7: (s sub o) -> (s super o) for super-properties used as shape paths
+    for prop, super_properties in closure.super_properties.items():
+        for super_property in (super_properties & properties) - {prop}:
+            for s, o in list(graph.subject_objects(prop)):
+                if (s, super_property, o) not in graph:
+                    added.append((s, super_property, o))
+    for triple in added:
+        graph.add(triple)
+
+    # rdf:type from rdf:type + subClassOf, domain and range, for shape classes only
+    if nodes is None:
+        nodes = {node for node in graph.all_nodes() if isinstance(node, (URIRef, BNode))}
+    types = []
+    for node in nodes:
+        for cls_ in closure.types(graph, node) & classes:
+            if (node, RDF.type, cls_) not in graph:
+                types.append((node, RDF.type, cls_))
+    for triple in types:
+        graph.add(triple)
+    return added + types
+
+
+def run_validation(data_graph, shapes_graph, ontology_graph=None, inference="rdfs", closure=None,
+                   focus_nodes=None):
+    """
+    One pyshacl run with either full RDFS inference or the precomputed closure.
+
+    Returns:
+        (conforms, results_graph, results_text)
+    """
+    options = dict(abort_on_first=False, meta_shacl=False, advanced=True, js=False,
+                   focus_nodes=focus_nodes)
+    if inference == "rdfs":
+        return validate(data_graph, shacl_graph=shapes_graph, ont_graph=ontology_graph,
+                        inference='rdfs', **options)
+
+    if closure is None:
+        closure = RdfsClosure.from_graph(ontology_graph)
+    added = materialize(data_graph, closure, shapes_graph)
+    try:
+        return validate(data_graph, shacl_graph=shapes_graph, inference=None, inplace=True, **options)
+    finally:
+        for triple in added:
+            data_graph.remove(triple)
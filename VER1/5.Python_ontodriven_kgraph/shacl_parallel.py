@@ -0,0 +1,195 @@
+"""
+Partitioned Parallel SHACL Validation
+
+The shapes in lung_cancer_shacl_shapes.ttl target independent classes, so
+one large pyshacl run can be split up:
+
+- every node targeted by some shape (after RDFS entailment, see
+  shacl_inference.RdfsClosure) is grouped by the set of shapes targeting it,
+  e.g. all Patients together, all Drugs together
+- large groups are cut into focus-node partitions of `partition_size`
+- each partition is validated in a fork-based process pool, running
+  pyshacl with focus_nodes over the partition's neighbourhood subgraph
+- the partitions' results_graph triples are merged under one
+  sh:ValidationReport, and the text report is rendered from the merged
+  records (shacl_results.py)
+
+Workers inherit the loaded data, shapes and ontology graphs copy-on-write,
+so only the focus lists go out and result triples come back.
+merged_equals_single() checks the merged report against a single-process run.
+
+Each partition is a separate pyshacl run with a fixed cost (in rdfs mode a
+full RDFS expansion of the ontology), so the pool only pays off when every
+worker gets at least one full partition; smaller graphs are validated in
+one process instead.
+"""
+
+import multiprocessing
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, SH, XSD
+
+from shacl_incremental import neighbourhood, targeting_shapes
+from shacl_inference import RdfsClosure, run_validation
+from shacl_results import format_records, iter_records
+
+DEFAULT_PARTITION_SIZE = 500
+
+# Graphs shared with forked workers (set before the pool starts)
+_validation_state = {}
+
+
+def partition_focus_nodes(data_graph, shapes_graph, closure, partition_size=DEFAULT_PARTITION_SIZE):
+    """
+    Split all targeted nodes into partitions of nodes with the same shapes.
+
+    Returns:
+        List of (shape names, sorted focus node list)
+    """
+    candidates = {node for node in data_graph.all_nodes() if isinstance(node, URIRef)}
+    targeted = targeting_shapes(data_graph, candidates, shapes_graph, closure)
+
+    groups = defaultdict(list)
+    for node, shapes in targeted.items():
+        groups[shapes].append(node)
+
+    partitions = []
+    for shapes, nodes in sorted(groups.items(), key=lambda item: -len(item[1])):
+        names = sorted(shape.split("#")[-1] for shape in shapes)
+        nodes.sort()
+        for i in range(0, len(nodes), partition_size):
+            partitions.append((names, nodes[i:i + partition_size]))
+    return partitions
+
+
+def _validate_partition(focus):
+    """Validate one focus-node partition against the shared graphs"""
+    start = time.perf_counter()
+    subgraph = neighbourhood(_validation_state["data"], focus)
+    conforms, results_graph, _ = run_validation(
+        subgraph, _validation_state["shapes"], _validation_state["ontology"],
+        _validation_state["inference"], _validation_state["closure"], focus_nodes=focus)
+    return conforms, list(results_graph), time.perf_counter() - start
+
+
+def merge_reports(partials, shapes_graph=None, namespace_manager=None):
+    """
+    Merge partition results into one report.
+
+    Args:
+        partials: (conforms, results_graph triples) per partition
+        shapes_graph, namespace_manager: For naming shapes and terms in the text report
+
+    Returns:
+        (conforms, results_graph, results_text)
+    """
+    results_graph = Graph()
+    results_graph.bind("sh", SH)
+    report = BNode()
+    conforms = all(partial[0] for partial in partials)
+    results_graph.add((report, RDF.type, SH.ValidationReport))
+    results_graph.add((report, SH.conforms, Literal(conforms, datatype=XSD.boolean)))
+
+    for _, triples in partials:
+        for s, p, o in triples:
+            if p == SH.conforms or (p == RDF.type and o == SH.ValidationReport):
+                continue
+            if p == SH.result:
+                results_graph.add((report, SH.result, o))
+            else:
+                results_graph.add((s, p, o))
+
+    results_text = format_records(
+        conforms, list(iter_records(results_graph, shapes_graph, namespace_manager)))
+    return conforms, results_graph, results_text
+
+
+def _make_pool(workers):
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    print("⚠ fork is not available on this platform, using threads")
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def validate_parallel(data_graph, shapes_graph, ontology_graph=None, workers=4,
+                      partition_size=DEFAULT_PARTITION_SIZE, inference="rdfs", closure=None):
+    """
+    Validate focus-node partitions in a process pool and merge the reports.
+
+    inference / closure are passed to shacl_inference.run_validation for
+    each partition. With fewer than workers * partition_size focus nodes
+    the graph is validated in one process (stats["workers"] is then 1 and
+    stats["partitions"] empty).
+
+    Returns:
+        (conforms, results_graph, results_text, stats)
+    """
+    start = time.perf_counter()
+    closure = closure or RdfsClosure.from_graph(ontology_graph)
+    partitions = partition_focus_nodes(data_graph, shapes_graph, closure, partition_size)
+    _validation_state.update(data=data_graph, shapes=shapes_graph, ontology=ontology_graph,
+                             inference=inference, closure=closure)
+
+    focus_nodes = sum(len(focus) for _, focus in partitions)
+    if focus_nodes < workers * partition_size:
+        # Too small to give every worker a full partition: one pyshacl run
+        conforms, results_graph, _ = run_validation(data_graph, shapes_graph, ontology_graph, inference, closure)
+        results_text = format_records(
+            conforms, list(iter_records(results_graph, shapes_graph, data_graph.namespace_manager)))
+        workers, partitions = 1, []
+    else:
+        partials = []
+        with _make_pool(workers) as pool:
+            for conforms, triples, seconds in pool.map(
+                    _validate_partition, [focus for _, focus in partitions]):
+                partials.append((conforms, triples))
+        conforms, results_graph, results_text = merge_reports(partials, shapes_graph, data_graph.namespace_manager)
+
+    stats = {
+        "workers": workers,
+        "partitions": [(shapes, len(focus)) for shapes, focus in partitions],
+        "focus_nodes": focus_nodes,
+        "seconds": time.perf_counter() - start,
+    }
+    return conforms, results_graph, results_text, stats
+
+
+########################################
+# Comparing reports
+########################################
+
+RESULT_FIELDS = (SH.focusNode, SH.resultPath, SH.value, SH.resultSeverity,
+                 SH.sourceConstraintComponent, SH.resultMessage)
+
+
+def report_signature(results_graph):
+    """
+    Multiset of results, each as the n3() of its RESULT_FIELDS.
+
+    sh:sourceShape is left out: property shapes are blank nodes whose
+    labels are not comparable across runs.
+    """
+    signature = Counter()
+    for result in results_graph.objects(None, SH.result):
+        signature[tuple(
+            "" if results_graph.value(result, field) is None else results_graph.value(result, field).n3()
+            for field in RESULT_FIELDS
+        )] += 1
+    return signature
+
+
+def merged_equals_single(merged_graph, single_graph):
+    """
+    Returns:
+        (equal, message)
+    """
+    merged = report_signature(merged_graph)
+    single = report_signature(single_graph)
+    if merged == single:
+        return True, f"{sum(single.values())} results identical"
+    missing = sum((single - merged).values())
+    extra = sum((merged - single).values())
+    return False, f"{missing} results missing, {extra} extra in the merged report"
@@ -0,0 +1,190 @@
+"""
+Structured SHACL Validation Results
+
+Reads pyshacl's results_graph directly instead of re-parsing the
+human-readable results_text:
+
+- iter_records() walks the report's sh:result nodes once, turning each
+  sh:ValidationResult into a ValidationRecord
+- ResultSummary counts records by severity and by (shape, path, severity)
+  as they stream past
+- RecordWriter streams records to JSON Lines or CSV
+- format_records() renders the text report from the same records
+
+Property shapes are blank nodes, so records name them by the node shape
+that declares them (e.g. PatientShape) plus their sh:path.
+"""
+
+import csv
+import json
+from collections import Counter
+from pathlib import Path
+
+from rdflib import BNode, URIRef
+from rdflib.namespace import RDF, SH
+
+SEVERITIES = ("Violation", "Warning", "Info")
+
+RECORD_FIELDS = ("severity", "focus_node", "result_path", "value", "message", "shape", "constraint")
+
+
+class ValidationRecord:
+    """One sh:ValidationResult, with terms rendered as short names"""
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, severity, focus_node, result_path, value, message, shape, constraint):
+        self.severity = severity
+        self.focus_node = focus_node
+        self.result_path = result_path
+        self.value = value
+        self.message = message
+        self.shape = shape
+        self.constraint = constraint
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+
+def local_name(uri):
+    text = str(uri)
+    return text.rsplit("#", 1)[-1].rsplit("/", 1)[-1]
+
+
+def shape_names(shapes_graph):
+    """{shape node: name}, naming property shapes after the node shape declaring them"""
+    names = {}
+    if shapes_graph is None:
+        return names
+    for node_shape, property_shape in shapes_graph.subject_objects(SH.property):
+        names[property_shape] = local_name(node_shape)
+    for shape in shapes_graph.subjects(RDF.type, SH.NodeShape):
+        names[shape] = local_name(shape)
+    return names
+
+
+def iter_records(results_graph, shapes_graph=None, namespace_manager=None):
+    """
+    Stream ValidationRecords from a pyshacl results_graph.
+
+    Args:
+        results_graph: The results_graph returned by pyshacl.validate
+        shapes_graph: Shapes graph, used to name blank-node property shapes
+        namespace_manager: Prefixes for short names (default: the results graph's)
+    """
+    names = shape_names(shapes_graph)
+    namespace_manager = namespace_manager or results_graph.namespace_manager
+
+    def short(term):
+        if term is None:
+            return ""
+        if isinstance(term, URIRef):
+            return term.n3(namespace_manager)
+        if isinstance(term, BNode):
+            return "[]"
+        return str(term)
+
+    for result in results_graph.objects(None, SH.result):
+        fields = {}
+        for p, o in results_graph.predicate_objects(result):
+            fields.setdefault(p, o)
+
+        shape = fields.get(SH.sourceShape)
+        yield ValidationRecord(
+            severity=local_name(fields.get(SH.resultSeverity, SH.Violation)),
+            focus_node=short(fields.get(SH.focusNode)),
+            result_path=short(fields.get(SH.resultPath)),
+            value=short(fields.get(SH.value)),
+            message=str(fields.get(SH.resultMessage, "")),
+            shape=names.get(shape) or (local_name(shape) if isinstance(shape, URIRef) else ""),
+            constraint=local_name(fields.get(SH.sourceConstraintComponent, "")).replace("ConstraintComponent", ""),
+        )
+
+
+class ResultSummary:
+    """One-pass counts by severity and by (shape, path, severity)"""
+
+    def __init__(self):
+        self.by_severity = Counter()
+        self.by_shape_path = Counter()
+
+    def add(self, record):
+        self.by_severity[record.severity] += 1
+        self.by_shape_path[(record.shape, record.result_path, record.severity)] += 1
+
+    def count(self, severity):
+        return self.by_severity[severity]
+
+    @property
+    def total(self):
+        return sum(self.by_severity.values())
+
+    def as_dict(self):
+        return {
+            "by_severity": {severity: self.by_severity[severity] for severity in SEVERITIES},
+            "by_shape_path": [
+                {"shape": shape, "path": path, "severity": severity, "count": count}
+                for (shape, path, severity), count in self.by_shape_path.most_common()
+            ],
+        }
+
+
+class RecordWriter:
+    """Stream records to .jsonl or .csv (chosen by the file suffix)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.suffix not in (".jsonl", ".csv"):
+            raise ValueError(f"Unsupported results format: {self.path.suffix} (use .jsonl or .csv)")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._csv = None
+        if self.path.suffix == ".csv":
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(RECORD_FIELDS)
+
+    def write(self, record):
+        if self._csv is not None:
+            self._csv.writerow([getattr(record, field) for field in RECORD_FIELDS])
+        else:
+            self._file.write(json.dumps(record.as_dict(), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def collect_records(results_graph, shapes_graph=None, namespace_manager=None, writers=()):
+    """
+    Walk the results once: group records by severity, aggregate and stream them.
+
+    Returns:
+        ({severity: [records]}, ResultSummary)
+    """
+    grouped = {severity: [] for severity in SEVERITIES}
+    summary = ResultSummary()
+    for record in iter_records(results_graph, shapes_graph, namespace_manager):
+        grouped.setdefault(record.severity, []).append(record)
+        summary.add(record)
+        for writer in writers:
+            writer.write(record)
+    for records in grouped.values():
+        records.sort(key=lambda record: (record.shape, record.result_path, record.focus_node))
+    return grouped, summary
+
+
+def format_record(record):
+    lines = [f"{record.severity} in {record.constraint} ({record.shape}):"]
+    for label, value in (("Focus Node", record.focus_node), ("Result Path", record.result_path),
+                         ("Value Node", record.value), ("Message", record.message)):
+        if value:
+            lines.append(f"\t{label}: {value}")
+    return "\n".join(lines)
+
+
+def format_records(conforms, records):
+    """Text report in the layout of pyshacl's results_text"""
+    parts = ["Validation Report", f"Conforms: {conforms}"]
+    if records:
+        parts.append(f"Results ({len(records)}):")
+        parts.extend(format_record(record) for record in records)
+    return "\n".join(parts) + "\n"
@@ -0,0 +1,163 @@
+"""
+Concurrent Batch Execution for the SPARQL Query Executor
+
+Runs a set of named queries concurrently over one shared, read-only graph
+and collects rows, timings and errors into a structured report instead of
+printing as it goes:
+
+- executor "thread": a thread pool over the in-process graph (cheap to start;
+  rdflib evaluation holds the GIL, so this mainly overlaps I/O-bound work)
+- executor "process": a fork-based process pool; workers inherit the
+  preloaded graph and patient index copy-on-write, so nothing is re-parsed
+  or pickled and evaluation escapes the GIL
+
+Query files (*.rq / *.sparql) from a directory can be added to Q1-Q9 to run
+a regression suite; each entry in the report carries a hash of its rows so
+two reports can be diffed.
+
+Usage:
+    python run_sparql_queries.py --batch --workers 8 --executor process \
+        --queries-dir regression_queries/ --report ouput/sparql_batch_report.json
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import run_sparql_queries as executor_module
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_REPORT = SCRIPT_DIR / "ouput" / "sparql_batch_report.json"
+QUERY_FILE_SUFFIXES = (".rq", ".sparql")
+
+# Graph and index shared with forked workers (set before the pool starts)
+_batch_state = {}
+
+
+def load_query_files(directory):
+    """Named queries from *.rq / *.sparql files, keyed by file stem"""
+    return {
+        path.stem: path.read_text(encoding="utf-8")
+        for path in sorted(Path(directory).iterdir())
+        if path.suffix in QUERY_FILE_SUFFIXES
+    }
+
+
+def result_hash(rows):
+    """Order-insensitive sha256 of result rows, for comparing runs"""
+    digest = hashlib.sha256()
+    for line in sorted(" ".join(term.n3() if term is not None else "UNDEF" for term in row)
+                       for row in rows):
+        digest.update(line.encode("utf-8") + b"\n")
+    return digest.hexdigest()[:16]
+
+
+def _run_one(query_name, query_string, parameters, keep_rows):
+    """Evaluate one query against the shared state; never raises"""
+    entry = {"name": query_name, "status": "ok", "pid": os.getpid()}
+    start = time.perf_counter()
+    try:
+        rows, info = executor_module.execute_query(
+            _batch_state["graph"], query_name, query_string, parameters, index=_batch_state.get("index"))
+        entry.update({
+            "rows": len(rows),
+            "result_sha256": result_hash(rows),
+            "source": info["source"],
+            "parse_seconds": info["parse_seconds"],
+            "eval_seconds": info["eval_seconds"],
+        })
+        if keep_rows:
+            entry["results"] = [[str(term) if term is not None else None for term in row] for row in rows]
+    except Exception as e:
+        entry.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    entry["seconds"] = time.perf_counter() - start
+    return entry
+
+
+def _make_pool(executor, workers):
+    if executor == "process":
+        if "fork" in multiprocessing.get_all_start_methods():
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        print("⚠ fork is not available on this platform, using threads")
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def run_batch(g, queries, parameters=None, workers=4, executor="thread", index=None,
+              fingerprint=None, keep_rows=False):
+    """
+    Run named queries concurrently and return a structured report.
+
+    Args:
+        g: Loaded graph (treated as read-only)
+        queries: {name: query text}
+        parameters: initBindings values (run_sparql_queries.DEFAULT_PARAMETERS if None)
+        workers: Pool size
+        executor: "thread" or "process"
+        index: Optional PatientIndex for the Q1-Q9 fast paths
+        fingerprint: Graph version recorded in the report
+        keep_rows: Include the result rows (as strings) in the report
+
+    Returns:
+        Report dict; "queries" keeps the input order
+    """
+    _batch_state["graph"] = g
+    _batch_state["index"] = index
+
+    # Parse once up front so forked workers inherit the prepared queries
+    for query_string in queries.values():
+        try:
+            executor_module.prepare(query_string)
+        except Exception:
+            pass  # reported per query by the worker
+
+    start = time.perf_counter()
+    entries = {}
+    with _make_pool(executor, workers) as pool:
+        futures = {pool.submit(_run_one, name, text, parameters, keep_rows): name
+                   for name, text in queries.items()}
+        for future in as_completed(futures):
+            entries[futures[future]] = future.result()
+    wall_seconds = time.perf_counter() - start
+
+    results = [entries[name] for name in queries]
+    query_seconds = sum(entry["seconds"] for entry in results)
+    return {
+        "graph_version": fingerprint,
+        "executor": executor,
+        "workers": workers,
+        "queries_run": len(results),
+        "errors": sum(entry["status"] == "error" for entry in results),
+        "wall_seconds": wall_seconds,
+        "query_seconds": query_seconds,
+        "speedup": query_seconds / wall_seconds if wall_seconds else 0.0,
+        "queries": results,
+    }
+
+
+def print_batch_report(report):
+    print(f"\n{'='*70}")
+    print(f"BATCH: {report['queries_run']} queries, {report['executor']} x {report['workers']}")
+    print(f"{'='*70}")
+    for entry in report["queries"]:
+        if entry["status"] == "ok":
+            print(f"  ✓ {entry['name']}: {entry['rows']} rows, {entry['seconds'] * 1000:.1f} ms "
+                  f"({entry['source']})")
+        else:
+            print(f"  ✗ {entry['name']}: {entry['error']}")
+
+    print(f"\n⏱  Wall {report['wall_seconds']:.3f}s | summed query time {report['query_seconds']:.3f}s "
+          f"| {report['speedup']:.2f}x summed/wall")
+    if report["errors"]:
+        print(f"❌ {report['errors']} queries failed")
+
+
+def save_batch_report(report, path=DEFAULT_REPORT):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Batch report saved to: {path}")
@@ -0,0 +1,287 @@
+"""
+Streaming SPARQL Result Writers
+
+Writes query solutions to CSV, JSON Lines or Parquet as rdflib produces
+them, instead of collecting and pretty-printing every row:
+
+- CSV: one header row of variable names, then lexical values
+- JSON Lines: one {"var": value} object per solution; numbers and booleans
+  stay typed, dates become ISO strings, unbound variables are omitted
+- Parquet (optional, needs pyarrow): rows buffered in record batches of
+  `batch_size` and written one row group at a time, under a schema fixed
+  before the first row group (all string columns, or typed columns with
+  --parquet-typed)
+
+--limit / --offset page through the solution stream without materializing
+the rows before the page.
+"""
+
+import csv
+import json
+import sys
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from itertools import islice
+from pathlib import Path
+from rdflib import Literal
+
+# Rows per Parquet record batch
+DEFAULT_PARQUET_BATCH_SIZE = 10_000
+
+
+def iter_solutions(result):
+    """
+    Stream rows (tuples of terms, None for unbound) from an rdflib SELECT result.
+
+    Iterating a Result directly also appends every solution to
+    result.bindings, so for large result sets the underlying solution
+    generator is consumed instead when rdflib exposes one.
+    """
+    variables = result.vars
+    solutions = getattr(result, "_genbindings", None)
+    if solutions is None:
+        solutions = result.bindings
+    for solution in solutions:
+        if solution:  # rdflib drops empty solutions too (e.g. an aggregate over no groups)
+            yield tuple(solution.get(variable) for variable in variables)
+
+
+def paginate(rows, limit=None, offset=0):
+    """Lazily skip `offset` rows and stop after `limit`"""
+    return islice(rows, offset or 0, None if limit is None else (offset or 0) + limit)
+
+
+def json_value(term):
+    """Plain JSON value for a term: typed for numbers/booleans, ISO for dates, else a string"""
+    if isinstance(term, Literal):
+        value = term.toPython()
+        if isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, (date, datetime, dt_time)):
+            return value.isoformat()
+    return str(term)
+
+
+class CsvResultWriter:
+    suffix = ".csv"
+
+    def __init__(self, stream, variables):
+        self._writer = csv.writer(stream)
+        self._writer.writerow(variables)
+
+    def write_rows(self, rows):
+        self._writer.writerows(["" if term is None else str(term) for term in row] for row in rows)
+
+    def close(self):
+        pass
+
+
+class JsonlResultWriter:
+    suffix = ".jsonl"
+
+    def __init__(self, stream, variables):
+        self._stream = stream
+        self._variables = variables
+
+    def write_rows(self, rows):
+        for row in rows:
+            record = {name: json_value(term) for name, term in zip(self._variables, row) if term is not None}
+            self._stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        pass
+
+
+# Typed Parquet column for each Python value type. Integers are stored as
+# double so a later batch with decimals still fits; other mixes become string.
+PARQUET_TYPES = [(bool, "bool"), (int, "double"), (float, "double"),
+                 (datetime, "timestamp"), (date, "date")]
+
+
+def parquet_type(value):
+    for python_type, name in PARQUET_TYPES:
+        if isinstance(value, python_type):
+            return name
+    return "string"
+
+
+def promote_parquet_types(seen):
+    """One column type for the value types seen in it (no values: string)"""
+    if len(seen) == 1:
+        return next(iter(seen))
+    if seen == {"date", "timestamp"}:
+        return "timestamp"
+    return "string"
+
+
+def _python_value(term):
+    value = term.toPython() if isinstance(term, Literal) else str(term)
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def parquet_value(term, column_type):
+    """
+    Value of a term for a column type.
+
+    Returns:
+        (value, fits): fits is False when a typed column cannot hold the value
+    """
+    if term is None:
+        return None, True
+    if column_type == "string":
+        return str(term), True
+    value = _python_value(term)
+    kind = parquet_type(value)
+    if kind == "date" and column_type == "timestamp":
+        return datetime.combine(value, dt_time()), True
+    if kind != column_type:
+        return None, False
+    return (float(value) if column_type == "double" else value), True
+
+
+class ParquetResultWriter:
+    """
+    Parquet with one column per variable (requires pyarrow).
+
+    The file schema is declared before the first row group is written, so
+    every batch has the same column types: by default all columns are
+    strings (lexical values). With typed=True each column gets a type from
+    the first batch's values (see PARQUET_TYPES); mixed or only unbound
+    columns become string. Values in later batches are converted to their
+    column type; a value the type cannot hold is written as null and
+    counted in `mismatched`.
+    """
+    suffix = ".parquet"
+
+    def __init__(self, path, variables, batch_size=DEFAULT_PARQUET_BATCH_SIZE, typed=False):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        self._path = path
+        self._variables = variables
+        self._batch_size = batch_size
+        self._typed = typed
+        self._buffer = []
+        self._writer = None
+        self._column_types = None
+        self.mismatched = 0
+        if not typed:
+            self._open(["string"] * len(variables))
+
+    def _open(self, column_types):
+        arrow_types = {"bool": self._pa.bool_(), "double": self._pa.float64(),
+                       "timestamp": self._pa.timestamp("us"), "date": self._pa.date32(),
+                       "string": self._pa.string()}
+        self._column_types = column_types
+        self._schema = self._pa.schema([(name, arrow_types[column_type])
+                                        for name, column_type in zip(self._variables, column_types)])
+        self._writer = self._pq.ParquetWriter(self._path, self._schema)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._buffer.append(row)
+            if len(self._buffer) >= self._batch_size:
+                self._flush()
+
+    def _flush(self):
+        if self._writer is None:
+            self._open([
+                promote_parquet_types({parquet_type(_python_value(row[i]))
+                                       for row in self._buffer if row[i] is not None})
+                for i in range(len(self._variables))
+            ])
+        arrays = []
+        for i, (field, column_type) in enumerate(zip(self._schema, self._column_types)):
+            values = []
+            for row in self._buffer:
+                value, fits = parquet_value(row[i], column_type)
+                if not fits:
+                    self.mismatched += 1
+                values.append(value)
+            arrays.append(self._pa.array(values, type=field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+        self._buffer = []
+
+    def close(self):
+        if self._buffer or self._writer is None:
+            self._flush()
+        self._writer.close()
+        if self.mismatched:
+            print(f"⚠ {self.mismatched} values did not fit their Parquet column type and were written "
+                  f"as null; export without --parquet-typed to keep them as strings", file=sys.stderr)
+
+
+RESULT_FORMATS = {
+    "csv": CsvResultWriter,
+    "jsonl": JsonlResultWriter,
+    "parquet": ParquetResultWriter,
+}
+
+
+def write_results(result, output_format, path=None, limit=None, offset=0, chunk_size=1000,
+                  parquet_typed=False):
+    """
+    Stream a SELECT result to a file (or stdout for CSV/JSONL when path is None).
+
+    parquet_typed selects typed instead of string Parquet columns.
+
+    Returns:
+        Number of rows written
+    """
+    variables = [str(variable) for variable in result.vars]
+    rows = paginate(iter_solutions(result), limit, offset)
+    writer_class = RESULT_FORMATS[output_format]
+
+    if writer_class is ParquetResultWriter:
+        if path is None:
+            raise ValueError("Parquet output needs a file path")
+        writer = ParquetResultWriter(path, variables, typed=parquet_typed)
+        stream = None
+    else:
+        stream = open(path, "w", newline="", encoding="utf-8") if path else sys.stdout
+        writer = writer_class(stream, variables)
+
+    written = 0
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            writer.write_rows(chunk)
+            written += len(chunk)
+    finally:
+        writer.close()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+    return written
+
+
+def export_queries(g, queries, output_format, output_dir, parameters=None, limit=None, offset=0,
+                   parquet_typed=False):
+    """
+    Run named queries and stream each result set to <output_dir>/<query id>.<format>.
+
+    Returns:
+        {query name: rows written}
+    """
+    import run_sparql_queries as executor_module
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    parameters = executor_module.DEFAULT_PARAMETERS if parameters is None else parameters
+
+    written = {}
+    for query_name, query_string in queries.items():
+        prepared, _, _ = executor_module.prepare(query_string)
+        result = g.query(prepared, initBindings=executor_module.query_bindings(query_string, parameters))
+        path = output_dir / (executor_module.query_id(query_name) + RESULT_FORMATS[output_format].suffix)
+        written[query_name] = write_results(result, output_format, path, limit=limit, offset=offset,
+                                            parquet_typed=parquet_typed)
+        print(f"  ✓ {query_name}: {written[query_name]} rows -> {path}")
+    return written
@@ -0,0 +1,418 @@
+"""
+Local SPARQL HTTP Endpoint for the Lung Cancer Knowledge Graph
+
+Loads the knowledge graph once (through the graph snapshot) and serves the
+SPARQL 1.1 protocol on localhost, so consumers stop paying the load cost
+of run_sparql_queries.py on every call:
+
+- GET /sparql?query=...            (query in the URL)
+- POST /sparql                     (form-encoded query=... or application/sparql-query body)
+- GET /status                      (triples, graph version, in-flight queries)
+
+SELECT/ASK answer as application/sparql-results+json (default) or text/csv;
+CONSTRUCT/DESCRIBE as text/turtle or application/n-triples. The endpoint is
+read-only: SPARQL Update is rejected.
+
+Queries are evaluated behind a semaphore (--max-concurrent) with a
+per-query timeout (--timeout), each in a worker process forked from the
+server, so the loaded graph is shared copy-on-write. A query that runs past
+its timeout (an aggregate or join never yields a row to check) answers 503
+and its worker is killed before the slot is freed; the next query forks a
+fresh one. Without fork (Windows) queries run in threads and the timeout is
+advisory: the 503 is sent at once, but the thread keeps its slot until the
+next row check or the end of evaluation. When the ETL rewrites the instance
+or ontology TTL, the graph is reloaded in the background and swapped in
+atomically; in-flight queries finish on the old graph and the idle workers
+holding it are retired.
+
+Usage:
+    python sparql_server.py --port 7878 --max-concurrent 4 --timeout 30
+    curl 'http://127.0.0.1:7878/sparql' --data-urlencode 'query=SELECT * WHERE { ?s ?p ?o } LIMIT 5'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from aiohttp import web
+from rdflib import BNode, Literal, URIRef
+
+import run_sparql_queries as executor_module
+from sparql_results import CsvResultWriter, iter_solutions
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_TIMEOUT = 30.0  # seconds
+DEFAULT_RELOAD_INTERVAL = 2.0  # seconds between TTL mtime checks
+
+# Rows evaluated between deadline checks
+DEADLINE_CHECK_ROWS = 1000
+
+SPARQL_JSON = "application/sparql-results+json"
+GRAPH_FORMATS = {"text/turtle": "turtle", "application/n-triples": "nt"}
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class QueryError(Exception):
+    pass
+
+
+class Endpoint:
+    """Mutable server state (aiohttp freezes the app mapping once started)"""
+
+    def __init__(self, state, max_concurrent, timeout, reload_interval):
+        self.state = state
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.reload_interval = reload_interval
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        # Threads evaluate queries (no fork) or wait on worker processes
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="sparql")
+        self.fork = "fork" in multiprocessing.get_all_start_methods()
+        self.idle = []
+        self.in_flight = 0
+        self.killed = 0
+        self.watcher = None
+        if not self.fork:
+            print("⚠ fork is not available on this platform, query timeouts are advisory")
+
+    def checkout(self, state):
+        """An idle worker process for a graph version, forking one if needed"""
+        while self.idle:
+            worker = self.idle.pop()
+            if worker.state is state:
+                return worker
+            worker.stop()
+        return QueryWorker(state)
+
+    def checkin(self, worker):
+        if worker.state is self.state and worker.process.is_alive():
+            self.idle.append(worker)
+        else:
+            worker.stop()
+
+    def release(self):
+        """Free a query slot taken in handle_sparql"""
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def close(self):
+        for worker in self.idle:
+            worker.stop()
+        self.idle = []
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class GraphState:
+    """One loaded graph version; replaced as a whole on reload"""
+
+    def __init__(self, graph, fingerprint, mtimes):
+        self.graph = graph
+        self.fingerprint = fingerprint
+        self.mtimes = mtimes
+        self.loaded_at = datetime.now().isoformat(timespec="seconds")
+
+
+class QueryWorker:
+    """
+    A forked process evaluating queries against one graph version.
+
+    run() blocks (call it in a thread); a query still running at its
+    timeout raises QueryTimeout and the worker must then be stopped.
+    """
+
+    def __init__(self, state):
+        context = multiprocessing.get_context("fork")
+        self.state = state
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(state, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def run(self, query_string, accept, timeout):
+        """
+        Returns:
+            (body bytes, content type)
+        """
+        self.conn.send((query_string, accept))
+        if not self.conn.poll(timeout):
+            raise QueryTimeout()
+        ok, result = self.conn.recv()
+        if not ok:
+            raise QueryError(result)
+        return result
+
+    def stop(self):
+        self.process.kill()
+        self.process.join()
+
+
+def _worker_loop(state, conn):
+    # Ctrl-C reaches the whole process group; the server stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            query_string, accept = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, evaluate(state, query_string, accept)))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+def source_mtimes():
+    return {path: path.stat().st_mtime_ns
+            for path in (executor_module.ONTOLOGY_FILE, executor_module.DATA_FILE) if path.exists()}
+
+
+def load_state():
+    # Quiet: reloads run in a worker thread while requests are being logged
+    mtimes = source_mtimes()
+    graph, fingerprint = executor_module.load_knowledge_graph(verbose=False)
+    return GraphState(graph, fingerprint, mtimes)
+
+
+########################################
+# Result serialization
+########################################
+
+def term_json(term):
+    """SPARQL 1.1 JSON results encoding of one RDF term"""
+    if isinstance(term, URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    value = {"type": "literal", "value": str(term)}
+    if isinstance(term, Literal):
+        if term.language:
+            value["xml:lang"] = term.language
+        elif term.datatype:
+            value["datatype"] = str(term.datatype)
+    return value
+
+
+def negotiate(accept, options, default):
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip()
+        if media_type in options:
+            return media_type
+    return default
+
+
+def evaluate(state, query_string, accept, deadline=None):
+    """
+    Run one query against a graph version (worker process or thread).
+
+    deadline (time.monotonic()) is checked every DEADLINE_CHECK_ROWS rows;
+    worker processes are killed instead and pass None.
+
+    Returns:
+        (body bytes, content type)
+    """
+    prepared, _, _ = executor_module.prepare(query_string)
+    result = state.graph.query(prepared)
+
+    if result.type == "ASK":
+        return json.dumps({"head": {}, "boolean": bool(result.askAnswer)}).encode(), SPARQL_JSON
+
+    if result.type in ("CONSTRUCT", "DESCRIBE"):
+        content_type = negotiate(accept, GRAPH_FORMATS, "text/turtle")
+        return result.graph.serialize(format=GRAPH_FORMATS[content_type]).encode(), content_type
+
+    rows = []
+    for row in iter_solutions(result):
+        if deadline is not None and len(rows) % DEADLINE_CHECK_ROWS == 0 and time.monotonic() > deadline:
+            raise QueryTimeout()
+        rows.append(row)
+
+    variables = [str(variable) for variable in result.vars]
+    if negotiate(accept, (SPARQL_JSON, "application/json", "text/csv"), SPARQL_JSON) == "text/csv":
+        buffer = io.StringIO()
+        CsvResultWriter(buffer, variables).write_rows(rows)
+        return buffer.getvalue().encode(), "text/csv"
+
+    bindings = [{name: term_json(term) for name, term in zip(variables, row) if term is not None}
+                for row in rows]
+    body = {"head": {"vars": variables}, "results": {"bindings": bindings}}
+    return json.dumps(body).encode(), SPARQL_JSON
+
+
+########################################
+# HTTP handlers
+########################################
+
+async def read_query(request):
+    if request.method == "GET":
+        return request.query.get("query")
+    if request.content_type == "application/sparql-query":
+        return await request.text()
+    if request.content_type == "application/sparql-update" or "update" in (await request.post()):
+        raise web.HTTPBadRequest(text="This endpoint is read-only: SPARQL Update is not supported\n")
+    return (await request.post()).get("query")
+
+
+async def evaluate_in_process(endpoint, state, query_string, accept, deadline):
+    """Evaluate in a worker process; one that times out is killed before returning"""
+    loop = asyncio.get_running_loop()
+    worker = endpoint.checkout(state)
+    try:
+        result = await loop.run_in_executor(endpoint.pool, worker.run, query_string, accept,
+                                            max(0.0, deadline - time.monotonic()))
+    except QueryError:
+        endpoint.checkin(worker)
+        raise
+    except BaseException:
+        # Timed out, crashed, or the request was cancelled mid-query
+        worker.stop()
+        endpoint.killed += 1
+        raise
+    endpoint.checkin(worker)
+    return result
+
+
+async def evaluate_in_thread(endpoint, state, query_string, accept, deadline):
+    """Evaluate in a thread; the slot is released when the thread ends, even after a timeout"""
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(endpoint.pool, evaluate, state, query_string, accept, deadline)
+    future.add_done_callback(lambda _: endpoint.release())
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+    except (asyncio.TimeoutError, QueryTimeout):
+        raise QueryTimeout()
+    except Exception as e:
+        raise QueryError(str(e))
+
+
+async def handle_sparql(request):
+    endpoint = request.app["endpoint"]
+    query_string = await read_query(request)
+    if not query_string:
+        raise web.HTTPBadRequest(text="Missing 'query' parameter\n")
+
+    state = endpoint.state
+    timeout = endpoint.timeout
+    deadline = time.monotonic() + timeout
+
+    try:
+        await asyncio.wait_for(endpoint.semaphore.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise web.HTTPServiceUnavailable(text=f"Query not started within {timeout:.0f}s (server busy)\n")
+
+    endpoint.in_flight += 1
+    accept = request.headers.get("Accept")
+    try:
+        if endpoint.fork:
+            try:
+                body, content_type = await evaluate_in_process(endpoint, state, query_string, accept, deadline)
+            finally:
+                endpoint.release()
+        else:
+            body, content_type = await evaluate_in_thread(endpoint, state, query_string, accept, deadline)
+    except QueryTimeout:
+        raise web.HTTPServiceUnavailable(text=f"Query exceeded the {timeout:.0f}s timeout\n")
+    except QueryError as e:
+        raise web.HTTPBadRequest(text=f"Query error: {e}\n")
+
+    return web.Response(body=body, content_type=content_type.split(";")[0],
+                        headers={"X-Graph-Version": state.fingerprint or ""})
+
+
+async def handle_status(request):
+    endpoint = request.app["endpoint"]
+    state = endpoint.state
+    return web.json_response({
+        "triples": len(state.graph),
+        "graph_version": state.fingerprint,
+        "loaded_at": state.loaded_at,
+        "in_flight": endpoint.in_flight,
+        "max_concurrent": endpoint.max_concurrent,
+        "timeout": endpoint.timeout,
+        "timeout_enforced": endpoint.fork,
+        "workers_killed": endpoint.killed,
+    })
+
+
+async def watch_sources(endpoint):
+    """Reload when the TTL files change and have stopped changing for one interval"""
+    interval = endpoint.reload_interval
+    loop = asyncio.get_running_loop()
+    previous = source_mtimes()
+    while True:
+        await asyncio.sleep(interval)
+        current = source_mtimes()
+        if current != endpoint.state.mtimes and current == previous:
+            try:
+                state = await loop.run_in_executor(None, load_state)
+            except (Exception, SystemExit) as e:  # load_knowledge_graph exits on a missing file
+                print(f"✗ Reload failed, still serving {endpoint.state.fingerprint}: {e}")
+            else:
+                endpoint.state = state
+                print(f"✓ Reloaded graph: {len(state.graph)} triples, version {state.fingerprint}")
+        previous = current
+
+
+async def start_watcher(app):
+    endpoint = app["endpoint"]
+    if endpoint.reload_interval > 0:
+        endpoint.watcher = asyncio.create_task(watch_sources(endpoint))
+
+
+async def stop_endpoint(app):
+    endpoint = app["endpoint"]
+    if endpoint.watcher is not None:
+        endpoint.watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await endpoint.watcher
+    endpoint.close()
+
+
+def make_app(state, max_concurrent=DEFAULT_MAX_CONCURRENT, timeout=DEFAULT_TIMEOUT,
+             reload_interval=DEFAULT_RELOAD_INTERVAL):
+    app = web.Application()
+    app["endpoint"] = Endpoint(state, max_concurrent, timeout, reload_interval)
+
+    app.router.add_route("GET", "/sparql", handle_sparql)
+    app.router.add_route("POST", "/sparql", handle_sparql)
+    app.router.add_get("/status", handle_status)
+    app.on_startup.append(start_watcher)
+    app.on_cleanup.append(stop_endpoint)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the lung cancer KG over the SPARQL 1.1 protocol")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-concurrent", type=int, default=DEFAULT_MAX_CONCURRENT,
+                        help="queries evaluated at the same time")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="per-query timeout in seconds (including time queued); "
+                             "the query's worker process is killed")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="seconds between TTL change checks (0 disables hot reload)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    state = load_state()
+    print(f"✓ Loaded {len(state.graph)} triples, version {state.fingerprint} "
+          f"({time.perf_counter() - start:.2f}s)")
+    print(f"🌐 SPARQL endpoint: http://{args.host}:{args.port}/sparql")
+
+    app = make_app(state, args.max_concurrent, args.timeout, args.reload_interval)
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
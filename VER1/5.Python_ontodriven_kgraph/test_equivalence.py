@@ -0,0 +1,213 @@
+"""
+Equivalence tests: every fast path must give the reference path's output
+
+- columnar vs row-by-row ETL, on the sample CSVs and on blank cells
+- chunked vs whole-file CSV reads
+- single-pass vs multipass NLP entity extraction
+- incremental ETL manifest reference counts
+- SHACL closure / partitioned validation vs pyshacl's inference='rdfs'
+- etl_inference.Reasoner vs owlrl's RDFS closure
+
+Run with: python -m pytest -q test_equivalence.py
+"""
+
+import pandas as pd
+import pytest
+from rdflib import Graph, Literal
+from rdflib.namespace import RDF, RDFS
+
+import etl_incremental
+import lung_cancer_etl_engine as etl
+from etl_writers import nt_lines
+from nlp_processor import EntityExtractor
+
+PATIENTS_WITH_BLANKS = """patient_id,age,sex,smoking_pack_years,stage,histology
+P001,67,M,45,IV,Adenocarcinoma
+P002,58,F,,III,Squamous
+P003,,M,60,,Adenocarcinoma
+P004,49,F,12,IV,
+"""
+
+
+def patients_config(csv_path):
+    """mapping_config with only the patients section, reading csv_path"""
+    return {"patients": dict(etl.load_mapping()["patients"], file=str(csv_path))}
+
+
+def assert_same_output(a, b):
+    assert set(a.graph) == set(b.graph)
+    assert a.cypher_lines == b.cypher_lines
+
+
+@pytest.fixture(scope="module")
+def sample_run():
+    return etl.run_etl(etl.load_mapping())
+
+
+########################################
+# ETL
+########################################
+
+def test_columnar_matches_row_mode(sample_run):
+    assert_same_output(etl.run_etl(etl.load_mapping(), mode="row"), sample_run)
+
+
+def test_columnar_matches_row_mode_with_blank_cells(tmp_path):
+    csv_path = tmp_path / "patients.csv"
+    csv_path.write_text(PATIENTS_WITH_BLANKS)
+    config = patients_config(csv_path)
+
+    assert_same_output(etl.run_etl(config, mode="row"), etl.run_etl(config, mode="columnar"))
+
+
+def test_chunked_matches_unchunked(tmp_path):
+    # The blank smoking_pack_years cell is in the second chunk only
+    csv_path = tmp_path / "patients.csv"
+    csv_path.write_text(PATIENTS_WITH_BLANKS)
+    config = patients_config(csv_path)
+    config["patients"]["object_links"] = dict(config["patients"]["object_links"],
+                                              hasPackYears="PackYears_{smoking_pack_years}")
+
+    whole = etl.run_etl(config, chunksize=None)
+    for mode in ("row", "columnar"):
+        assert_same_output(whole, etl.run_etl(config, mode=mode, chunksize=1))
+
+
+########################################
+# NLP
+########################################
+
+def test_single_pass_matches_multipass_extraction():
+    articles = pd.read_csv(etl.SCRIPT_DIR / "ttl_shacl_data" / "LungcancerArticle.csv")
+    extractor = EntityExtractor(None, etl.ONT, etl.BASE)
+
+    def normalized(entities):
+        return {concept_type: sorted(found) for concept_type, found in entities.items()}
+
+    for body in articles["body"].dropna().astype(str):
+        assert normalized(extractor.extract_entities(body)) == normalized(
+            extractor.extract_entities_multipass(body))
+
+
+########################################
+# Incremental ETL manifest
+########################################
+
+def test_manifest_keeps_shared_triples(tmp_path):
+    csv_path = tmp_path / "patients.csv"
+    config = patients_config(csv_path)
+
+    def run(csv_text):
+        csv_path.write_text(csv_text)
+        return etl_incremental.run_incremental(config, tmp_path / "manifest.sqlite", tmp_path / "out")
+
+    def full_run():
+        return set(nt_lines(etl.run_etl(config).graph))
+
+    added, removed = run(PATIENTS_WITH_BLANKS)
+    before = full_run()
+    assert set(added) == before
+    assert removed == []
+
+    # P004 goes: Stage_IV is still produced by P001, so only P004's own triples go
+    added, removed = run(PATIENTS_WITH_BLANKS.replace("P004,49,F,12,IV,\n", ""))
+    after = full_run()
+    assert added == []
+    assert set(removed) == before - after
+    assert any("Stage_IV> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type>" in line for line in after)
+
+    # An unchanged source gives an empty delta
+    assert run(PATIENTS_WITH_BLANKS.replace("P004,49,F,12,IV,\n", "")) == ([], [])
+
+
+def test_manifest_refcounts(tmp_path):
+    manifest = etl_incremental.Manifest(tmp_path / "manifest.sqlite")
+    try:
+        assert manifest.apply_refcounts({"a": 2, "b": 1}) == (["a", "b"], [])
+        assert manifest.apply_refcounts({"a": -1, "b": -1}) == ([], ["b"])
+        assert manifest.apply_refcounts({"a": -1}) == ([], ["a"])
+    finally:
+        manifest.close()
+
+
+########################################
+# SHACL
+########################################
+
+@pytest.fixture(scope="module")
+def shacl_graphs(sample_run):
+    import validate_shacl
+    shapes_graph = Graph().parse(validate_shacl.SHACL_FILE)
+    ontology_graph = Graph().parse(validate_shacl.ONTOLOGY_FILE)
+    return sample_run.graph, shapes_graph, ontology_graph
+
+
+@pytest.fixture(scope="module")
+def rdfs_report(shacl_graphs):
+    from shacl_inference import run_validation
+    conforms, results_graph, _ = run_validation(*shacl_graphs, inference="rdfs")
+    return conforms, results_graph
+
+
+def test_closure_validation_matches_rdfs(shacl_graphs, rdfs_report):
+    from shacl_inference import run_validation
+    from shacl_parallel import merged_equals_single
+
+    data_graph = shacl_graphs[0]
+    triples = len(data_graph)
+    conforms, results_graph, _ = run_validation(*shacl_graphs, inference="closure")
+
+    assert conforms == rdfs_report[0]
+    assert merged_equals_single(results_graph, rdfs_report[1])[0]
+    assert len(data_graph) == triples
+
+
+@pytest.mark.parametrize("inference", ["rdfs", "closure"])
+def test_partitioned_validation_matches_single_run(shacl_graphs, rdfs_report, inference):
+    from shacl_parallel import merged_equals_single, validate_parallel
+
+    conforms, results_graph, _, stats = validate_parallel(*shacl_graphs, workers=2, partition_size=5,
+                                                          inference=inference)
+    assert stats["partitions"]
+    assert conforms == rdfs_report[0]
+    assert merged_equals_single(results_graph, rdfs_report[1])[0]
+
+
+########################################
+# Inference
+########################################
+
+def test_reasoner_matches_owlrl_rdfs(sample_run):
+    import owlrl
+    from etl_inference import Reasoner
+
+    data_graph = sample_run.graph
+    ontology_graph = Graph().parse(etl.ONTOLOGY)
+    reasoner = Reasoner(ontology_graph)
+    reasoner.add_data(data_graph)
+    reasoner.run(True)
+    inferred = set(reasoner.inferred())
+
+    # owlrl's instance-level results, minus the trivial (x rdf:type rdfs:Resource)
+    instances = set(data_graph.subjects()) | {
+        o for p, o in data_graph.predicate_objects() if p != RDF.type and not isinstance(o, Literal)}
+    graph = Graph()
+    graph += ontology_graph
+    graph += data_graph
+    owlrl.DeductiveClosure(owlrl.RDFS_Semantics).expand(graph)
+    theirs = {t for t in graph if t[0] in instances and t not in data_graph
+              and t not in ontology_graph and t[1:] != (RDF.type, RDFS.Resource)}
+
+    assert inferred == theirs
+
+
+def test_semi_naive_matches_naive(sample_run):
+    from etl_inference import Reasoner
+
+    def inferred(semi_naive):
+        reasoner = Reasoner(Graph().parse(etl.ONTOLOGY))
+        reasoner.add_data(sample_run.graph)
+        reasoner.run(semi_naive)
+        return set(reasoner.inferred())
+
+    assert inferred(True) == inferred(False)
@@ -0,0 +1,56 @@
+"""
+Tests for sparql_server.py: query timeouts must free their slot
+
+Run with: python -m pytest -q test_sparql_server.py
+"""
+
+import asyncio
+import multiprocessing
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from rdflib import Graph, Literal, Namespace
+
+import sparql_server
+
+EX = Namespace("http://example.org/")
+
+# A triple-nested cross join under COUNT yields no row until it is done
+SLOW_AGGREGATE = "SELECT (COUNT(*) AS ?n) WHERE { ?a ?p ?b . ?c ?q ?d . ?e ?r ?f }"
+FAST_QUERY = "ASK { ?s ?p ?o }"
+
+
+def make_state(triples=300):
+    graph = Graph()
+    for i in range(triples):
+        graph.add((EX[f"s{i}"], EX.value, Literal(i)))
+    return sparql_server.GraphState(graph, "test", {})
+
+
+async def run_queries(queries, max_concurrent=1, timeout=1.0):
+    app = sparql_server.make_app(make_state(), max_concurrent, timeout, reload_interval=0)
+    async with TestClient(TestServer(app)) as client:
+        statuses = []
+        for query in queries:
+            response = await client.get("/sparql", params={"query": query})
+            statuses.append(response.status)
+        status = await (await client.get("/status")).json()
+    return statuses, status
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                    reason="timeouts are advisory without fork")
+def test_timed_out_aggregate_frees_its_slot():
+    statuses, status = asyncio.run(run_queries([SLOW_AGGREGATE, FAST_QUERY]))
+
+    assert statuses == [503, 200]
+    assert status["in_flight"] == 0
+    assert status["workers_killed"] == 1
+
+
+def test_query_errors_and_results():
+    statuses, status = asyncio.run(run_queries(["SELECT WHERE {", FAST_QUERY, FAST_QUERY]))
+
+    assert statuses == [400, 200, 200]
+    assert status["in_flight"] == 0
+    assert status["workers_killed"] == 0
@@ -10,38 +10,80 @@ This script validates the lung cancer RDF data against SHACL shapes to ensure:
 from pyshacl import validate
 from rdflib import Graph
 from pathlib import Path
+import argparse
 import sys
+import time
+
+from graph_snapshot import load_graph_snapshot
+from shacl_incremental import validate_incremental, print_incremental_stats
+from shacl_inference import INFERENCE_MODES, load_closure, run_validation
+from shacl_parallel import DEFAULT_PARTITION_SIZE, validate_parallel
+from shacl_results import RecordWriter, collect_records, format_record
 
 # Get the directory where this script is located
-SCRIPT_DIR = Path(__file__).parent.parent
+SCRIPT_DIR = Path(__file__).parent
 
 # File paths
 ONTOLOGY_FILE = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_kg_schema.ttl"
 DATA_FILE = SCRIPT_DIR / "ouput" / "lung_cancer_instances_out.ttl"
 SHACL_FILE = SCRIPT_DIR / "ttl_shacl_data" / "lung_cancer_shacl_shapes.ttl"
 REPORT_FILE = SCRIPT_DIR / "ouput" / "shacl_validation_report.txt"
+INCREMENTAL_REPORT_FILE = SCRIPT_DIR / "ouput" / "shacl_validation_report_incremental.txt"
+
+# Results listed per severity in the console summary
+MAX_LISTED = 50
 
 
-def load_graph(file_path, description="Graph"):
-    """Load an RDF graph from file"""
+def load_graph(file_path, description="Graph", use_snapshot=True, rebuild_snapshot=False):
+    """Load an RDF graph from file (via a pre-parsed snapshot unless use_snapshot is False)"""
     print(f"Loading {description} from: {file_path}")
     try:
-        g = Graph()
-        g.parse(file_path)
-        print(f"  ✓ Loaded {len(g)} triples")
+        start = time.perf_counter()
+        if use_snapshot:
+            g, _, from_snapshot = load_graph_snapshot([file_path], Path(file_path).stem,
+                                                      rebuild=rebuild_snapshot)
+            how = "from snapshot" if from_snapshot else "parsed, snapshot saved"
+        else:
+            g = Graph()
+            g.parse(file_path)
+            how = "parsed"
+        print(f"  ✓ Loaded {len(g)} triples ({how}, {time.perf_counter() - start:.3f}s)")
         return g
     except Exception as e:
         print(f"  ✗ Error loading {description}: {e}")
         sys.exit(1)
 
 
-def validate_data(data_graph, shapes_graph, ontology_graph=None):
-    """Validate data graph against SHACL shapes"""
+def validate_data(data_graph, shapes_graph, ontology_graph=None, workers=1,
+                  partition_size=DEFAULT_PARTITION_SIZE, inference="rdfs", closure=None):
+    """
+    Validate data graph against SHACL shapes
+
+    With workers > 1, focus nodes are partitioned by target shape and
+    validated in a process pool (see shacl_parallel.py); the merged report
+    has the same results as a single pyshacl run. inference="closure"
+    replaces pyshacl's RDFS inference with the precomputed closure
+    (see shacl_inference.py).
+    """
     print("\n" + "="*60)
     print("VALIDATING DATA AGAINST SHACL CONSTRAINTS")
     print("="*60)
     
     try:
+        if workers > 1:
+            conforms, results_graph, results_text, stats = validate_parallel(
+                data_graph, shapes_graph, ontology_graph, workers, partition_size, inference, closure)
+            if stats["workers"] == 1:
+                print(f"  ✓ {stats['focus_nodes']} focus nodes, fewer than {workers} full partitions: "
+                      f"validated in one process ({stats['seconds']:.3f}s)")
+            else:
+                print(f"  ✓ {stats['focus_nodes']} focus nodes in {len(stats['partitions'])} partitions, "
+                      f"{workers} workers ({stats['seconds']:.3f}s)")
+            return conforms, results_graph, results_text
+
+        if inference == "closure":
+            return run_validation(data_graph, shapes_graph, ontology_graph, inference, closure)
+
         # Perform validation with RDFS inference
         conforms, results_graph, results_text = validate(
             data_graph,
@@ -61,49 +103,42 @@ def validate_data(data_graph, shapes_graph, ontology_graph=None):
         sys.exit(1)
 
 
-def parse_validation_results(results_text):
-    """Parse and categorize validation results"""
-    violations = []
-    warnings = []
-    info = []
-    
-    if not results_text or "Validation Report" not in results_text:
-        return violations, warnings, info
-    
-    # Split into individual results
-    lines = results_text.split('\n')
-    current_result = []
-    
-    for line in lines:
-        if line.startswith('Constraint Violation') or line.startswith('Validation Result'):
-            if current_result:
-                result_text = '\n'.join(current_result)
-                
-                if 'Severity: sh:Violation' in result_text:
-                    violations.append(result_text)
-                elif 'Severity: sh:Warning' in result_text:
-                    warnings.append(result_text)
-                elif 'Severity: sh:Info' in result_text:
-                    info.append(result_text)
-                
-                current_result = []
-        
-        current_result.append(line)
-    
-    # Don't forget the last one
-    if current_result:
-        result_text = '\n'.join(current_result)
-        if 'Severity: sh:Violation' in result_text:
-            violations.append(result_text)
-        elif 'Severity: sh:Warning' in result_text:
-            warnings.append(result_text)
-        elif 'Severity: sh:Info' in result_text:
-            info.append(result_text)
-    
-    return violations, warnings, info
+def parse_validation_results(results_graph, shapes_graph=None, namespace_manager=None, results_out=()):
+    """
+    Categorize validation results from pyshacl's results_graph
+
+    Each sh:ValidationResult becomes a ValidationRecord (shacl_results.py);
+    records are counted by shape/path/severity and streamed to the
+    results_out .jsonl/.csv files in the same pass.
+
+    Returns:
+        (violations, warnings, info, summary)
+    """
+    writers = [RecordWriter(path) for path in results_out]
+    try:
+        grouped, summary = collect_records(results_graph, shapes_graph, namespace_manager, writers)
+    finally:
+        for writer in writers:
+            writer.close()
+    for writer in writers:
+        print(f"💾 {summary.total} results saved to: {writer.path}")
+    return grouped["Violation"], grouped["Warning"], grouped["Info"], summary
 
 
-def print_summary(conforms, violations, warnings, info):
+def print_records(records, title, fields):
+    print(f"\n{'='*60}")
+    print(title)
+    print(f"{'='*60}")
+    for i, record in enumerate(records[:MAX_LISTED], 1):
+        print(f"\n--- {record.severity} {i} ---")
+        for label, value in fields(record):
+            if value:
+                print(f"  {label}: {value}")
+    if len(records) > MAX_LISTED:
+        print(f"\n  ... and {len(records) - MAX_LISTED} more (see the saved report)")
+
+
+def print_summary(conforms, violations, warnings, info, summary=None):
     """Print validation summary"""
     print("\n" + "="*60)
     print("VALIDATION SUMMARY")
@@ -118,27 +153,21 @@ def print_summary(conforms, violations, warnings, info):
     print(f"  🔴 Violations: {len(violations)}")
     print(f"  ⚠️  Warnings:   {len(warnings)}")
     print(f"  ℹ️  Info:       {len(info)}")
+
+    if summary is not None and summary.total:
+        print(f"\n📊 By shape and path:")
+        for (shape, path, severity), count in summary.by_shape_path.most_common():
+            print(f"  {count:>6}  {severity:<9} {shape} {path}")
     
     if violations:
-        print(f"\n{'='*60}")
-        print("🔴 VIOLATIONS (Must Fix)")
-        print(f"{'='*60}")
-        for i, violation in enumerate(violations, 1):
-            print(f"\n--- Violation {i} ---")
-            # Extract key information
-            for line in violation.split('\n'):
-                if any(keyword in line for keyword in ['Message', 'Focus Node', 'Result Path', 'Value']):
-                    print(f"  {line.strip()}")
+        print_records(violations, "🔴 VIOLATIONS (Must Fix)", lambda record: [
+            ("Message", record.message), ("Focus Node", record.focus_node),
+            ("Result Path", record.result_path), ("Value Node", record.value)])
     
     if warnings:
-        print(f"\n{'='*60}")
-        print("⚠️  WARNINGS (Should Fix)")
-        print(f"{'='*60}")
-        for i, warning in enumerate(warnings, 1):
-            print(f"\n--- Warning {i} ---")
-            for line in warning.split('\n'):
-                if any(keyword in line for keyword in ['Message', 'Focus Node', 'Result Path']):
-                    print(f"  {line.strip()}")
+        print_records(warnings, "⚠️  WARNINGS (Should Fix)", lambda record: [
+            ("Message", record.message), ("Focus Node", record.focus_node),
+            ("Result Path", record.result_path)])
     
     if info:
         print(f"\n{'='*60}")
@@ -147,10 +176,10 @@ def print_summary(conforms, violations, warnings, info):
         print(f"  {len(info)} informational messages")
 
 
-def save_report(conforms, results_text, violations, warnings, info):
+def save_report(conforms, violations, warnings, info, report_file=REPORT_FILE):
     """Save validation report to file"""
     try:
-        with open(REPORT_FILE, 'w', encoding='utf-8') as f:
+        with open(report_file, 'w', encoding='utf-8') as f:
             f.write("="*80 + "\n")
             f.write("LUNG CANCER KNOWLEDGE GRAPH - SHACL VALIDATION REPORT\n")
             f.write("="*80 + "\n\n")
@@ -163,15 +192,41 @@ def save_report(conforms, results_text, violations, warnings, info):
             f.write("="*80 + "\n")
             f.write("FULL VALIDATION REPORT\n")
             f.write("="*80 + "\n\n")
-            f.write(results_text)
+            # Written record by record rather than as one joined string
+            records = violations + warnings + info
+            f.write(f"Validation Report\nConforms: {conforms}\n")
+            if records:
+                f.write(f"Results ({len(records)}):\n")
+                for record in records:
+                    f.write(format_record(record) + "\n")
         
-        print(f"\n💾 Full report saved to: {REPORT_FILE}")
+        print(f"\n💾 Full report saved to: {report_file}")
     
     except Exception as e:
         print(f"\n⚠️  Could not save report: {e}")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Validate the lung cancer KG against SHACL shapes")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the Turtle files instead of using graph snapshots")
+    parser.add_argument("--rebuild-snapshot", action="store_true",
+                        help="re-parse the Turtle files and rewrite the snapshots")
+    parser.add_argument("--incremental-from", metavar="PATH",
+                        help="only validate focus nodes affected since PATH: the previous instance "
+                             "file, or a directory with delta_added.nt / delta_removed.nt")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="validate focus-node partitions in N processes and merge the reports")
+    parser.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE,
+                        help="max focus nodes per partition with --workers")
+    parser.add_argument("--results-out", nargs="+", default=[], metavar="FILE",
+                        help="also stream every result record to FILE (.jsonl or .csv)")
+    parser.add_argument("--inference", choices=INFERENCE_MODES, default="rdfs",
+                        help="rdfs: pyshacl's RDFS inference over a copy of the graph; closure: cached "
+                             "ontology closure, materializing only the types the shapes check")
+    args = parser.parse_args()
+    snapshot = {"use_snapshot": not args.no_snapshot, "rebuild_snapshot": args.rebuild_snapshot}
+
     print("\n" + "="*60)
     print("LUNG CANCER KG - SHACL VALIDATION")
     print("="*60 + "\n")
@@ -188,25 +243,45 @@ def main():
         sys.exit(1)
     
     # Load graphs
-    data_graph = load_graph(DATA_FILE, "Instance Data")
-    shapes_graph = load_graph(SHACL_FILE, "SHACL Shapes")
-    ontology_graph = load_graph(ONTOLOGY_FILE, "Ontology") if ONTOLOGY_FILE.exists() else None
+    data_graph = load_graph(DATA_FILE, "Instance Data", **snapshot)
+    shapes_graph = load_graph(SHACL_FILE, "SHACL Shapes", **snapshot)
+    ontology_graph = load_graph(ONTOLOGY_FILE, "Ontology", **snapshot) if ONTOLOGY_FILE.exists() else None
+    closure = None
+    if ontology_graph is not None:
+        closure, from_cache = load_closure(ONTOLOGY_FILE, ontology_graph)
+        print(f"  ✓ RDFS closure: {len(closure.ancestors)} classes in subClassOf chains, {len(closure.domains)} properties "
+              f"with domains ({'cached' if from_cache else 'computed, cached'})")
     
     # Validate
-    conforms, results_graph, results_text = validate_data(
-        data_graph, 
-        shapes_graph,
-        ontology_graph
-    )
+    report_file = REPORT_FILE
+    if args.incremental_from:
+        print("\n" + "="*60)
+        print("INCREMENTAL VALIDATION OF AFFECTED FOCUS NODES")
+        print("="*60)
+        conforms, results_graph, results_text, stats = validate_incremental(
+            data_graph, shapes_graph, ontology_graph, args.incremental_from, args.inference, closure)
+        print_incremental_stats(stats)
+        report_file = INCREMENTAL_REPORT_FILE
+    else:
+        conforms, results_graph, results_text = validate_data(
+            data_graph, 
+            shapes_graph,
+            ontology_graph,
+            workers=args.workers,
+            partition_size=args.partition_size,
+            inference=args.inference,
+            closure=closure,
+        )
     
     # Parse results
-    violations, warnings, info = parse_validation_results(results_text)
+    violations, warnings, info, summary = parse_validation_results(
+        results_graph, shapes_graph, data_graph.namespace_manager, args.results_out)
     
     # Print summary
-    print_summary(conforms, violations, warnings, info)
+    print_summary(conforms, violations, warnings, info, summary)
     
     # Save report
-    save_report(conforms, results_text, violations, warnings, info)
+    save_report(conforms, violations, warnings, info, report_file)
     
     # Exit with appropriate code
     if not conforms and violations: